@@ -25,6 +25,7 @@ try:
     # Import application components
     from config import MONGO_URI, MONGO_DB_NAME
     from pymongo import MongoClient
+    from utils.db_utils import bump_data_version, MODULES_VERSION
     
     # Connect to MongoDB
     client = MongoClient(MONGO_URI)
@@ -63,6 +64,10 @@ try:
             if result.inserted_id:
                 logger.info(f"Added module: {module['name']} ({module['code']})")
                 added += 1
+        
+        # Let running servers reload their module catalog
+        if added:
+            bump_data_version(MODULES_VERSION)
             
         return added, skipped
     
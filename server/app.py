@@ -1,15 +1,21 @@
 # Main Flask application
 import os
 import logging
-from flask import Flask, request, jsonify, render_template, redirect, url_for
+from flask import Flask, Response, request, jsonify, render_template, redirect, url_for
 from datetime import datetime
 from bson.objectid import ObjectId
 import threading
+from itertools import chain
 
 # Option 1: Set specific allowed origins
 from flask_cors import CORS
 
+from utils.json_provider import FastJSONProvider
+from utils.compression import init_compression
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+init_compression(app)
 CORS(app, resources={r"/api/*": {"origins": ["http://localhost:5174", "http://localhost:3000"]}})
 
 
@@ -20,15 +26,34 @@ from services.embedding_service import EmbeddingService
 from services.recommendation_service import RecommendationService
 from services.scheduler_service import SchedulerService
 from services.arXiv_service import ArxivService
+from services.cooccurrence_service import CooccurrenceService
+from services.vector_index_service import VectorIndexService
+from services.search_index_service import SearchIndexService
+from services.suggest_service import SuggestService
+from services.module_catalog_service import ModuleCatalogService
+from services.export_service import ExportService, parse_fields, parse_since
+from services.async_ingest_service import AsyncIngestService
+from services.oai_harvest_service import OaiHarvestService
+from services.embedding_pipeline_service import EmbeddingPipelineService
 
 # Import utils
-from utils.db_utils import initialize_database, modules_collection, articles_collection, relevance_collection, users_collection
+from utils.db_utils import (
+    initialize_database, modules_collection, articles_collection, relevance_collection, users_collection,
+    bump_data_version, CORPUS_VERSION, RELEVANCE_VERSION, MODULES_VERSION
+)
+from utils.http_cache import conditional_get
+from utils.pagination import InvalidCursorError, PUBLISHED_SORT, SEARCH_SORT, RELEVANCE_SORT, SCORE_SORT, keyset_filter, next_cursor
+
+from utils.ingest_hooks import register_ingest_listener
+from utils.rate_limit import rate_limit_stats
+from utils.response_cache import get_response_cache
+from utils.quota_budget import quota_stats
 
 # Import blueprints
 from routes.auth_api_routes import auth_api
 
 # Import configuration
-from config import NEWS_API_KEY, DEBUG, SECRET_KEY, SBERT_MODEL_NAME, SESSION_EXPIRY_DAYS, RELEVANCE_THRESHOLD
+from config import NEWS_API_KEY, DEBUG, SECRET_KEY, SBERT_MODEL_NAME, SESSION_EXPIRY_DAYS, RELEVANCE_THRESHOLD, SEARCH_BACKEND, PUBLIC_FEED_MAX_AGE, MODULE_CATALOG_MAX_AGE, ASYNC_INGEST_ENABLED, ARXIV_OAI_ENABLED, EMBEDDING_PIPELINE_ENABLED
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -41,11 +66,36 @@ app.config['DEBUG'] = DEBUG
 
 # Initialize services (do this before starting the scheduler)
 news_service = NewsAPIClientService(api_key=NEWS_API_KEY)
-article_service = ArticleService(news_api_key=NEWS_API_KEY)
+search_index_service = SearchIndexService() if SEARCH_BACKEND == 'bm25' else None
+article_service = ArticleService(news_api_key=NEWS_API_KEY, search_index=search_index_service)
 embedding_service = EmbeddingService(model_name=SBERT_MODEL_NAME)
-recommendation_service = RecommendationService(embedding_service=embedding_service)
+vector_index_service = VectorIndexService()
+recommendation_service = RecommendationService(embedding_service=embedding_service, vector_index=vector_index_service)
 arxiv_service = ArxivService()
-scheduler_service = SchedulerService(article_service=article_service, embedding_service=embedding_service, arxiv_service=arxiv_service)
+cooccurrence_service = CooccurrenceService()
+suggest_service = SuggestService()
+module_catalog_service = ModuleCatalogService(serializer=app.json.dumps)
+export_service = ExportService()
+# Concurrent ingestion needs aiohttp; without it the scheduler fetches serially
+async_ingest_service = AsyncIngestService(article_service=article_service, arxiv_service=arxiv_service) if ASYNC_INGEST_ENABLED and AsyncIngestService.is_available() else None
+oai_harvest_service = OaiHarvestService(arxiv_service=arxiv_service) if ARXIV_OAI_ENABLED else None
+# Embed and score new content as it is stored instead of waiting for the next sweep
+embedding_pipeline_service = EmbeddingPipelineService(embedding_service=embedding_service, vector_index=vector_index_service) if EMBEDDING_PIPELINE_ENABLED else None
+scheduler_service = SchedulerService(article_service=article_service, embedding_service=embedding_service, arxiv_service=arxiv_service, cooccurrence_service=cooccurrence_service, search_index_service=search_index_service, suggest_service=suggest_service, async_ingest_service=async_ingest_service, oai_harvest_service=oai_harvest_service, embedding_pipeline_service=embedding_pipeline_service)
+# A change stream sees every process's writes, so only the scheduler leader may consume it
+if embedding_pipeline_service:
+    embedding_pipeline_service.lease = scheduler_service.lease
+
+# Keep the search index current as articles and papers are stored
+if search_index_service:
+    register_ingest_listener(search_index_service.add_documents)
+register_ingest_listener(suggest_service.add_documents)
+
+def bump_corpus_version(documents):
+    """Invalidate cached article feeds when articles or papers are stored"""
+    bump_data_version(CORPUS_VERSION)
+
+register_ingest_listener(bump_corpus_version)
 
 
 # Store scheduler thread reference
@@ -79,6 +129,17 @@ def setup():
         initialize_database()
         logger.info("Database initialized")
         
+        # Load the search index snapshot (or build it from MongoDB on first run)
+        if search_index_service:
+            search_index_service.load_or_build()
+        
+        # Build typeahead suggestions
+        suggest_service.build()
+        
+        # Start embedding and scoring articles as they are stored
+        if embedding_pipeline_service:
+            embedding_pipeline_service.start()
+        
         # Start scheduler in a separate thread
         # start_scheduler_thread()
         
@@ -109,8 +170,7 @@ def module_detail(module_id):
     """Module detail page route"""
     try:
         # Validate module exists
-        module = modules_collection.find_one({"_id": ObjectId(module_id)})
-        if not module:
+        if not module_catalog_service.get_module(module_id):
             return redirect(url_for('index'))
         return render_template('module.html', module_id=module_id)
     except Exception as e:
@@ -127,32 +187,61 @@ def trending():
     """Trending articles page route"""
     return render_template('index.html', section='trending')
 
+def cached_json_response(body, etag):
+    """Respond with a pre-serialized JSON body, or 304 if the client already has it"""
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+def ndjson_response(items, lines_per_chunk=100):
+    """Stream an iterable of documents as newline-delimited JSON
+
+    Lines are written in small chunks so memory stays flat however many
+    documents the iterable yields. Errors after the first byte cannot change
+    the status code, so they are reported as a final {"error": ...} line.
+    """
+    def generate():
+        chunk = []
+        try:
+            for item in items:
+                chunk.append(app.json.dumps(item))
+                if len(chunk) >= lines_per_chunk:
+                    yield "\n".join(chunk) + "\n"
+                    chunk = []
+        except Exception as e:
+            logger.error(f"Error streaming export: {str(e)}")
+            chunk.append(app.json.dumps({"error": str(e)}))
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
 # API Routes
 @app.route('/api/modules')
+@conditional_get(max_age=MODULE_CATALOG_MAX_AGE)
 def get_modules():
     """Get all CS modules"""
     try:
-        modules = list(modules_collection.find({}, {"vector_embedding": 0}))
+        catalog = module_catalog_service.get_catalog()
+        if catalog is None:
+            return jsonify({"error": "Module catalog unavailable"}), 500
         
-        # Convert ObjectId to string for JSON serialization
-        for module in modules:
-            module["_id"] = str(module["_id"])
-            
-        return jsonify({"modules": modules})
+        body, etag = catalog
+        return cached_json_response(body, etag)
     except Exception as e:
         logger.error(f"Error getting modules: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/modules/<module_id>')
+@conditional_get(max_age=MODULE_CATALOG_MAX_AGE)
 def get_module(module_id):
     """Get a single module by ID"""
     try:
-        module = modules_collection.find_one({"_id": ObjectId(module_id)}, {"vector_embedding": 0})
+        cached = module_catalog_service.get_module(module_id)
         
-        if module:
-            # Convert ObjectId to string
-            module["_id"] = str(module["_id"])
-            return jsonify({"module": module})
+        if cached:
+            _, body, etag = cached
+            return cached_json_response(body, etag)
         else:
             return jsonify({"error": "Module not found"}), 404
     except Exception as e:
@@ -160,26 +249,84 @@ def get_module(module_id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/modules/<module_id>/recommendations')
+@conditional_get(RELEVANCE_VERSION, CORPUS_VERSION, max_age=PUBLIC_FEED_MAX_AGE)
 def get_module_recommendations(module_id):
     """Get article recommendations for a specific module"""
     try:
         limit = int(request.args.get('limit', 10))
-        recommendations = recommendation_service.get_module_recommendations(module_id, limit=limit)
-        return jsonify({"recommendations": recommendations})
+        cursor = request.args.get('cursor')
+        recommendations = recommendation_service.get_module_recommendations(module_id, limit=limit, cursor=cursor)
+        return jsonify({
+            "recommendations": recommendations,
+            "next_cursor": next_cursor(recommendations, RELEVANCE_SORT, limit)
+        })
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting module recommendations: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/modules/<module_id>/relevance/stream')
+def stream_module_relevance(module_id):
+    """Stream a module's full relevance list as NDJSON, best first"""
+    try:
+        min_score = float(request.args.get('min_score', 0))
+        fields = parse_fields(request.args.get('fields'))
+        batch_size = request.args.get('batch_size', type=int)
+        
+        items = export_service.iter_module_relevance(module_id, min_score=min_score, article_fields=fields, batch_size=batch_size)
+        # Run up to the first item so a missing module is still reported with a status code
+        first = next(items, None)
+        if first is None:
+            return ndjson_response([])
+        return ndjson_response(chain([first], items))
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error streaming module relevance: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/export/articles')
+def export_articles():
+    """Stream the article corpus as NDJSON in _id order"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        since = parse_since(request.args.get('since'))
+        batch_size = request.args.get('batch_size', type=int)
+        
+        items = export_service.iter_articles(
+            projection=fields,
+            since=since,
+            content_type=request.args.get('type'),
+            category=request.args.get('category'),
+            batch_size=batch_size
+        )
+        return ndjson_response(items)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error exporting articles: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/articles')
+@conditional_get(CORPUS_VERSION, max_age=PUBLIC_FEED_MAX_AGE)
 def get_articles():
     """Get articles and papers with optional category filter"""
     try:
         category = request.args.get('category')
         limit = int(request.args.get('limit', 20))
         skip = int(request.args.get('skip', 0))
+        cursor = request.args.get('cursor')
         
-        articles = article_service.get_combined_articles(category, limit=limit, skip=skip)
-        return jsonify({"articles": articles})
+        articles = article_service.get_combined_articles(category, limit=limit, skip=skip, cursor=cursor)
+        return jsonify({
+            "articles": articles,
+            "next_cursor": next_cursor(articles, PUBLISHED_SORT, limit)
+        })
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting articles: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -196,82 +343,131 @@ def get_article(article_id):
     except Exception as e:
         logger.error(f"Error getting article: {str(e)}")
         return jsonify({"error": str(e)}), 500
+
+@app.route('/api/articles/<article_id>/also-read')
+def get_also_read(article_id):
+    """Get articles that readers of this article also read"""
+    try:
+        limit = int(request.args.get('limit', 10))
+        articles = cooccurrence_service.get_also_read(article_id, limit=limit)
+        return jsonify({"articles": articles})
+    except Exception as e:
+        logger.error(f"Error getting also-read articles: {str(e)}")
+        return jsonify({"error": str(e)}), 500
     
 
 @app.route('/api/articles/relevant')
+@conditional_get(RELEVANCE_VERSION, CORPUS_VERSION, max_age=PUBLIC_FEED_MAX_AGE)
 def get_relevant_articles():
     """Get articles prioritized by relevance across all modules and sorted by date"""
     try:
         limit = int(request.args.get('limit', 20))
         skip = int(request.args.get('skip', 0))
+        cursor = request.args.get('cursor')
+        
+        # Continue after the previous page's last (published_at, _id) instead of skipping
+        cursor_stages = [{"$match": keyset_filter(PUBLISHED_SORT, cursor)}] if cursor else []
+        skip_stages = [{"$skip": skip}] if skip and not cursor else []
         
-        # Get articles with high relevance scores across all modules
+        # Walk articles newest first on the (published_at, _id) index and keep those with a
+        # high relevance score for any module, so a page costs its own rows, not the whole
+        # relevance collection
         pipeline = [
-            {"$match": {"relevance_score": {"$gte": RELEVANCE_THRESHOLD}}},
-            {"$sort": {"relevance_score": -1}},
-            {"$group": {
-                "_id": "$article_id",
-                "relevance_score": {"$max": "$relevance_score"}
-            }},
+            *cursor_stages,
+            {"$sort": {"published_at": -1, "_id": -1}},
             {"$lookup": {
-                "from": "articles",
-                "localField": "_id",
-                "foreignField": "_id",
-                "as": "article"
+                "from": relevance_collection.name,
+                "let": {"article_id": "$_id"},
+                "pipeline": [
+                    {"$match": {
+                        "$expr": {"$eq": ["$article_id", "$$article_id"]},
+                        "relevance_score": {"$gte": RELEVANCE_THRESHOLD}
+                    }},
+                    {"$sort": {"relevance_score": -1}},
+                    {"$limit": 1},
+                    {"$project": {"_id": 0, "relevance_score": 1}}
+                ],
+                "as": "relevance"
             }},
-            {"$unwind": "$article"},
-            {"$sort": {"article.published_at": -1}},  # Sort by date after filtering by relevance
-            {"$skip": skip},
+            {"$unwind": "$relevance"},
+            *skip_stages,
             {"$limit": limit},
             {"$project": {
-                "_id": "$article._id",
-                "title": "$article.title",
-                "description": "$article.description",
-                "content": "$article.content",
-                "url": "$article.url",
-                "image_url": "$article.image_url",
-                "source_name": "$article.source_name",
-                "published_at": "$article.published_at",
-                "updated_at": "$article.updated_at",
-                "categories": "$article.categories",
-                "authors": "$article.authors",
-                "pdf_url": "$article.pdf_url",
-                "arxiv_id": "$article.arxiv_id",
-                "relevance_score": 1,
-                "type": {"$cond": [{"$eq": ["$article.source_name", "arXiv"]}, "academic", "news"]}
+                "title": 1,
+                "description": 1,
+                "content": 1,
+                "url": 1,
+                "image_url": 1,
+                "source_name": 1,
+                "published_at": 1,
+                "updated_at": 1,
+                "categories": 1,
+                "authors": 1,
+                "pdf_url": 1,
+                "arxiv_id": 1,
+                "relevance_score": "$relevance.relevance_score",
+                "type": {"$ifNull": [
+                    "$type",
+                    {"$cond": [{"$eq": ["$source_name", "arXiv"]}, "academic", "news"]}
+                ]}
             }}
         ]
         
-        relevant_articles = list(relevance_collection.aggregate(pipeline))
-        
-        # Convert ObjectIds to strings
-        for article in relevant_articles:
-            article["_id"] = str(article["_id"])
+        relevant_articles = list(articles_collection.aggregate(pipeline))
         
         logger.info(f"Found {len(relevant_articles)} relevant articles across all modules")
-        return jsonify({"articles": relevant_articles})
+        return jsonify({
+            "articles": relevant_articles,
+            "next_cursor": next_cursor(relevant_articles, PUBLISHED_SORT, limit)
+        })
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting relevant articles: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/search')
+@conditional_get(CORPUS_VERSION, max_age=PUBLIC_FEED_MAX_AGE)
 def search_articles():
     """Search articles and papers by query"""
     try:
         query = request.args.get('q')
         limit = int(request.args.get('limit', 20))
         skip = int(request.args.get('skip', 0))
+        cursor = request.args.get('cursor')
         
         if not query:
             return jsonify({"error": "Query parameter 'q' is required"}), 400
             
-        articles = article_service.search_combined(query, limit=limit, skip=skip)
-        return jsonify({"articles": articles})
+        articles = article_service.search_combined(query, limit=limit, skip=skip, cursor=cursor)
+        return jsonify({
+            "articles": articles,
+            "next_cursor": next_cursor(articles, SEARCH_SORT, limit)
+        })
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error searching articles: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/suggest')
+def suggest():
+    """Typeahead suggestions for modules, keywords, categories and article titles"""
+    try:
+        query = request.args.get('q', '')
+        limit = min(int(request.args.get('limit', 10)), 50)
+        types = request.args.get('types')
+        kinds = [t.strip() for t in types.split(',') if t.strip()] if types else None
+        
+        suggestions = suggest_service.suggest(query, limit=limit, kinds=kinds)
+        return jsonify({"suggestions": suggestions})
+    except Exception as e:
+        logger.error(f"Error getting suggestions: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/trending')
+# Interactions are not stamped, so every view stays one insert; trending lags them by at most one bucket
+@conditional_get(CORPUS_VERSION, max_age=PUBLIC_FEED_MAX_AGE, time_bucket=300)
 def get_trending():
     """Get trending articles based on user interactions"""
     try:
@@ -285,13 +481,20 @@ def get_trending():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/recommendations/<user_id>')
+@conditional_get(RELEVANCE_VERSION, CORPUS_VERSION, MODULES_VERSION, user=lambda user_id: user_id, private=True)
 def get_user_recommendations(user_id):
     """Get personalized recommendations for a user"""
     try:
         limit = int(request.args.get('limit', 20))
+        cursor = request.args.get('cursor')
         
-        recommendations = recommendation_service.get_user_recommendations(user_id, limit=limit)
-        return jsonify({"recommendations": recommendations})
+        recommendations = recommendation_service.get_user_recommendations(user_id, limit=limit, cursor=cursor)
+        return jsonify({
+            "recommendations": recommendations,
+            "next_cursor": next_cursor(recommendations, SCORE_SORT, limit)
+        })
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting user recommendations: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -396,14 +599,66 @@ def scheduler_status():
         if scheduler_thread and scheduler_thread.is_alive():
             is_running = True
             
-        return jsonify({
-            "is_running": is_running,
-            "scheduler_service_running": scheduler_service.is_running
-        })
+        return jsonify(dict(scheduler_service.status(), is_running=is_running))
     except Exception as e:
         logger.error(f"Error getting scheduler status: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/admin/job-runs')
+def job_runs():
+    """Get the most recent background job runs, optionally of one job (?job=)"""
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        runs = scheduler_service.executor.recent_runs(job=request.args.get('job'), limit=limit)
+        return jsonify({"runs": runs})
+    except Exception as e:
+        logger.error(f"Error getting job runs: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/admin/rate-limits')
+def rate_limits():
+    """Get request counts and wait times of the upstream rate limiters"""
+    try:
+        return jsonify({"rate_limits": rate_limit_stats()})
+    except Exception as e:
+        logger.error(f"Error getting rate limit stats: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/admin/embedding-pipeline')
+def embedding_pipeline_stats():
+    """Get the event source, queue depth and latest batch latency of the embedding pipeline"""
+    try:
+        if not embedding_pipeline_service:
+            return jsonify({"enabled": False})
+        return jsonify(dict(embedding_pipeline_service.stats(), enabled=True))
+    except Exception as e:
+        logger.error(f"Error getting embedding pipeline stats: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/admin/quota')
+def quota():
+    """Get today's upstream request budgets: spent and remaining per job, and projected exhaustion"""
+    try:
+        return jsonify({"quotas": quota_stats()})
+    except Exception as e:
+        logger.error(f"Error getting quota stats: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/admin/response-cache', methods=['GET', 'DELETE'])
+def response_cache():
+    """Get the response cache statistics, or clear it (optionally one source via ?source=)"""
+    try:
+        cache = get_response_cache()
+        if cache is None:
+            return jsonify({"enabled": False})
+        if request.method == 'DELETE':
+            deleted = cache.clear(request.args.get('source'))
+            return jsonify({"message": f"Deleted {deleted} cached responses"})
+        return jsonify(dict(cache.stats(), enabled=True))
+    except Exception as e:
+        logger.error(f"Error handling response cache request: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/admin/scheduler/start', methods=['POST'])
 def start_scheduler():
     """Start the scheduler if it's not already running"""
@@ -425,15 +680,16 @@ def update_embeddings():
         source = data.get('source', 'articles')
         
         if source == 'modules':
-            embedding_service.update_all_module_embeddings()
-            return jsonify({"message": "Module embeddings update initiated"})
+            # Through the scheduler's executor, so it never overlaps a scheduled run
+            status = scheduler_service.trigger("update_module_embeddings")
+            return jsonify({"message": "Module embeddings update initiated", "status": status})
         elif source == 'articles':
             days = int(data.get('days', 1))
             embedding_service.update_recent_article_embeddings(days=days)
             return jsonify({"message": f"Article embeddings update initiated for last {days} days"})
         elif source == 'relevance':
-            embedding_service.update_relevance_scores()
-            return jsonify({"message": "Relevance scores update initiated"})
+            status = scheduler_service.trigger("update_relevance_scores")
+            return jsonify({"message": "Relevance scores update initiated", "status": status})
         else:
             return jsonify({"error": "Invalid source. Use 'modules', 'articles', or 'relevance'"}), 400
     except Exception as e:
@@ -472,8 +728,9 @@ def fetch_papers():
 def fetch_targeted_content():
     """Admin endpoint to trigger targeted content fetching for all modules"""
     try:
-        result = scheduler_service.fetch_targeted_content_for_modules()
-        return jsonify({"message": "Targeted content fetching completed", "success": result})
+        # Runs in the background, coalesced with any scheduled run of the same job
+        status = scheduler_service.trigger("fetch_targeted_content_for_modules")
+        return jsonify({"message": "Targeted content fetching started", "success": True, "status": status})
     except Exception as e:
         logger.error(f"Error fetching targeted content: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -493,10 +750,10 @@ def fetch_module_content(module_id):
         # Fetch arXiv papers
         paper_count = arxiv_service.fetch_module_specific_papers(module_id, max_results=20)
         
-        # Update embeddings for the new content
+        # Embed and rescore the new content in the background, through the scheduler's
+        # executor so it never overlaps a scheduled run
         if article_count > 0 or paper_count > 0:
-            embedding_service.update_recent_article_embeddings(days=1)
-            embedding_service.update_relevance_scores()
+            scheduler_service.refresh_scores()
         
         return jsonify({
             "message": f"Fetched {article_count} articles and {paper_count} papers for module",
@@ -524,10 +781,10 @@ def fetch_keyword_content():
         # Fetch arXiv papers
         paper_count = arxiv_service.fetch_targeted_papers(keywords, max_results=count)
         
-        # Update embeddings for the new content
+        # Embed and rescore the new content in the background, through the scheduler's
+        # executor so it never overlaps a scheduled run
         if article_count > 0 or paper_count > 0:
-            embedding_service.update_recent_article_embeddings(days=1)
-            embedding_service.update_relevance_scores()
+            scheduler_service.refresh_scores()
         
         return jsonify({
             "message": f"Fetched {article_count} articles and {paper_count} papers for keywords: {keywords}"
@@ -581,10 +838,10 @@ def reset_database():
         for category in ["technology", "science", "education"]:
             article_service.fetch_and_store_articles(category=category, count=20)
             
-        # Update embeddings
-        embedding_service.update_all_module_embeddings()
-        embedding_service.update_recent_article_embeddings(days=7)
-        embedding_service.update_relevance_scores()
+        # Update embeddings in the background; the module embeddings job rescores
+        # everything once the new module vectors are stored
+        scheduler_service.trigger("update_module_embeddings")
+        scheduler_service.refresh_scores()
         
         return jsonify({"message": "Database reset and initialized with sample data"})
     except Exception as e:
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Script to harvest arXiv papers over OAI-PMH, e.g. to backfill the corpus.
+
+This script will:
+1. Harvest each requested set (default: the configured ARXIV_OAI_SETS) page
+   by page with resumption tokens, storing every page in one bulk write
+2. Checkpoint the resumption token after each page, so an interrupted run
+   continues where it stopped when started again without --from
+3. Advance the set's watermark once its list is exhausted, so the scheduled
+   harvest only asks for records added or revised after that
+
+Example backfill of five years of CS papers:
+    python arxiv-harvest-script.py --set cs --from 2020-01-01 --years-limit 5
+"""
+
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('arxiv_harvest')
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Harvest arXiv papers over OAI-PMH')
+    parser.add_argument('--set', action='append', dest='sets',
+                      help='OAI-PMH set to harvest, e.g. cs (repeatable; default: ARXIV_OAI_SETS)')
+    parser.add_argument('--from', dest='from_date', type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+                      help='Harvest records changed since this date (YYYY-MM-DD) instead of the watermark')
+    parser.add_argument('--max-pages', type=int, default=10000,
+                      help='Stop each set after this many pages (default: 10000)')
+    parser.add_argument('--years-limit', type=int, default=5,
+                      help='Skip papers first submitted more than this many years ago (default: 5, 0 keeps all)')
+    parser.add_argument('--all-categories', action='store_true',
+                      help='Keep papers from every category of the set, not just ARXIV_CS_CATEGORIES')
+    return parser.parse_args()
+
+# Make sure we can import from the application
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    # Import application components
+    from config import ARXIV_OAI_SETS, ARXIV_CS_CATEGORIES
+    from utils.db_utils import create_indexes
+    from services.arXiv_service import ArxivService
+    from services.oai_harvest_service import OaiHarvestService
+
+    def main():
+        """Main function to run the script"""
+        args = parse_args()
+        # The bulk upserts rely on the unique arxiv_id index
+        create_indexes()
+        harvester = OaiHarvestService(
+            arxiv_service=ArxivService(),
+            categories=None if args.all_categories else ARXIV_CS_CATEGORIES,
+            years_limit=args.years_limit
+        )
+
+        start_time = datetime.now()
+        total = 0
+        for set_spec in args.sets or ARXIV_OAI_SETS:
+            count = harvester.harvest(set_spec, from_date=args.from_date, max_pages=args.max_pages)
+            state = harvester.get_state(set_spec)
+            logger.info(f"Set {set_spec}: stored {count} papers; watermark {state.get('watermark')}"
+                        + (", checkpoint saved for the next run" if state.get('resumption_token') else ""))
+            total += count
+
+        duration = (datetime.now() - start_time).total_seconds()
+        logger.info(f"Harvest completed: stored {total} papers in {duration:.2f} seconds")
+        logger.info("Run article-embeddings-script.py or wait for the scheduler to embed and score the new papers")
+
+    if __name__ == "__main__":
+        main()
+
+except ImportError as e:
+    logger.error(f"Import error: {str(e)}")
+    logger.error("Make sure you're running this script from the project root or the correct Python environment")
+    sys.exit(1)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark parsing of arXiv Atom responses.
+
+This script will:
+1. Load recorded arXiv API responses (--feed), or build a synthetic feed
+   shaped like one when no recording is given
+2. Time the previous parser: ElementTree.fromstring over the whole body,
+   namespaced find calls per field and strptime date parsing
+3. Time the streaming lxml iterparse parser used by ArxivService
+4. Report the time and peak memory of each and check they yield the same papers
+
+Record a feed with, for example:
+    curl -o cs_ai.xml "http://export.arxiv.org/api/query?search_query=cat:cs.AI&max_results=2000"
+
+No database connection is needed.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('arxiv_parser_benchmark')
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmark arXiv Atom response parsing')
+    parser.add_argument('--feed', action='append', default=[],
+                      help='Recorded arXiv API response to parse (repeatable)')
+    parser.add_argument('--entries', type=int, default=2000,
+                      help='Entries in the synthetic feed when no --feed is given (default: 2000)')
+    parser.add_argument('--iterations', type=int, default=5,
+                      help='Times each feed is parsed per parser (default: 5)')
+    return parser.parse_args()
+
+# Make sure we can import from the application
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    # Import application components
+    import xml.etree.ElementTree as ET
+    from utils.arxiv_parsing import iter_atom_papers, split_arxiv_id
+
+    NAMESPACE = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom"}
+
+    def build_feed(entries):
+        """Build an Atom feed shaped like an arXiv API response"""
+        published = datetime(2024, 1, 1)
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+            'xmlns:arxiv="http://arxiv.org/schemas/atom">'
+            f'<title>arXiv Query</title><opensearch:totalResults>{entries}</opensearch:totalResults>'
+        ]
+        for i in range(entries):
+            stamp = (published - timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            parts.append(
+                f'<entry><id>http://arxiv.org/abs/2401.{i:05d}v{1 + i % 3}</id>'
+                f'<updated>{stamp}</updated><published>{stamp}</published>'
+                f'<title>Scalable methods for learning problem {i}</title>'
+                '<summary>  We study ' + 'consensus, replication and gradient methods. ' * 25 + '</summary>'
+                '<author><name>Jane Doe</name></author><author><name>John Smith</name>'
+                '<arxiv:affiliation>Example University</arxiv:affiliation></author>'
+                '<arxiv:comment>12 pages, 4 figures</arxiv:comment>'
+                f'<link href="http://arxiv.org/abs/2401.{i:05d}v1" rel="alternate" type="text/html"/>'
+                f'<link title="pdf" href="http://arxiv.org/pdf/2401.{i:05d}v1" rel="related" type="application/pdf"/>'
+                '<arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>'
+                '<category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>'
+                '<category term="cs.DC" scheme="http://arxiv.org/schemas/atom"/>'
+                '</entry>'
+            )
+        parts.append('</feed>')
+        return ''.join(parts).encode('utf-8')
+
+    def previous_parse(content):
+        """The parser ArxivService used before switching to iterparse"""
+        root = ET.fromstring(content)
+        papers = []
+        root.findall("atom:entry", NAMESPACE)  # Counted for logging
+        for entry in root.findall("atom:entry", NAMESPACE):
+            title_elem = entry.find("atom:title", NAMESPACE)
+            summary_elem = entry.find("atom:summary", NAMESPACE)
+            if title_elem is None or summary_elem is None or title_elem.text is None or summary_elem.text is None:
+                continue
+            title = title_elem.text.strip()
+            summary = summary_elem.text.strip()
+            authors = []
+            for author in entry.findall("atom:author", NAMESPACE):
+                name_elem = author.find("atom:name", NAMESPACE)
+                if name_elem is not None and name_elem.text:
+                    authors.append(name_elem.text)
+            id_elem = entry.find("atom:id", NAMESPACE)
+            if id_elem is None or not id_elem.text:
+                continue
+            arxiv_id, arxiv_version = split_arxiv_id(id_elem.text.split("/abs/")[-1])
+            categories = []
+            primary_category = entry.find("arxiv:primary_category", NAMESPACE)
+            if primary_category is not None and primary_category.attrib.get("term"):
+                categories.append(primary_category.attrib["term"])
+            for category in entry.findall("atom:category", NAMESPACE):
+                cat_term = category.attrib.get("term")
+                if cat_term and cat_term not in categories:
+                    categories.append(cat_term)
+            published_elem = entry.find("atom:published", NAMESPACE)
+            try:
+                published_date = datetime.strptime(published_elem.text, "%Y-%m-%dT%H:%M:%SZ")
+            except (AttributeError, TypeError, ValueError):
+                published_date = datetime.utcnow()
+            papers.append({
+                "title": title,
+                "description": summary[:300] + "..." if len(summary) > 300 else summary,
+                "content": summary,
+                "url": f"https://arxiv.org/abs/{arxiv_id}",
+                "pdf_url": f"https://arxiv.org/pdf/{arxiv_id}.pdf",
+                "arxiv_id": arxiv_id,
+                "arxiv_version": arxiv_version,
+                "source_name": "arXiv",
+                "authors": authors,
+                "categories": categories,
+                "published_at": published_date,
+                "source_type": "academic"
+            })
+        return papers
+
+    def streaming_parse(content):
+        """The streaming parser ArxivService uses now"""
+        return list(iter_atom_papers(content))
+
+    def measure(parse, feeds, iterations):
+        """Return (mean ms per feed, peak traced MiB of one pass, papers from the last pass)"""
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for content in feeds:
+                papers = parse(content)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / (iterations * len(feeds))
+
+        tracemalloc.start()
+        for content in feeds:
+            parse(content)
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+        return elapsed_ms, peak, papers
+
+    def main():
+        """Main function to run the script"""
+        args = parse_args()
+        if args.feed:
+            feeds = []
+            for path in args.feed:
+                with open(path, 'rb') as f:
+                    feeds.append(f.read())
+            logger.info(f"Loaded {len(feeds)} recorded feeds")
+        else:
+            feeds = [build_feed(args.entries)]
+            logger.info(f"Built a synthetic feed with {args.entries} entries ({len(feeds[0]) / 1024:.0f} KiB)")
+
+        before_ms, before_peak, before_papers = measure(previous_parse, feeds, args.iterations)
+        after_ms, after_peak, after_papers = measure(streaming_parse, feeds, args.iterations)
+
+        logger.info(f"Before (ElementTree + find + strptime): {before_ms:.1f} ms per feed, peak {before_peak:.1f} MiB")
+        logger.info(f"After (lxml iterparse + fromisoformat):  {after_ms:.1f} ms per feed, peak {after_peak:.1f} MiB")
+        logger.info(f"Speedup: {before_ms / after_ms:.1f}x")
+
+        if before_papers == after_papers:
+            logger.info(f"Both parsers produced the same {len(after_papers)} papers for the last feed")
+        else:
+            logger.warning(f"Parsers disagree on the last feed: {len(before_papers)} vs {len(after_papers)} papers")
+
+    if __name__ == "__main__":
+        main()
+
+except ImportError as e:
+    logger.error(f"Import error: {str(e)}")
+    logger.error("Make sure you're running this script from the project root or the correct Python environment")
+    sys.exit(1)
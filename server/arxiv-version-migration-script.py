@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Script to migrate stored arXiv papers to versionless arXiv ids.
+
+This script will:
+1. Find papers whose arxiv_id still carries a version suffix (e.g. 2401.01234v2)
+2. Keep the newest stored version of each paper and delete the older copies,
+   along with their relevance scores
+3. Rewrite the kept paper's arxiv_id, arxiv_version, url and pdf_url to the
+   versionless form
+4. Create the unique arxiv_id index used by the bulk paper upserts
+
+Run this once after upgrading an existing database; until it has run, papers
+stored under a versioned id are not matched by new fetches and are stored a
+second time under the versionless id.
+"""
+
+import os
+import re
+import sys
+import logging
+import argparse
+from datetime import datetime
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('arxiv_version_migration')
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Migrate arXiv papers to versionless ids')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                      help='Number of papers to update per bulk write (default: 1000)')
+    parser.add_argument('--dry-run', action='store_true',
+                      help='Report what would change without writing')
+    return parser.parse_args()
+
+# Make sure we can import from the application
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+try:
+    # Import application components
+    from config import MONGO_URI, MONGO_DB_NAME
+    from pymongo import MongoClient, UpdateOne, ASCENDING
+
+    # Connect to MongoDB
+    client = MongoClient(MONGO_URI)
+    db = client[MONGO_DB_NAME]
+    articles_collection = db.articles
+    relevance_collection = db.module_article_relevance
+
+    VERSIONED_ID = re.compile(r"^(.+?)v(\d+)$")
+
+    def migrate_papers(batch_size=1000, dry_run=False):
+        """Collapse versioned paper copies and rewrite ids to the versionless form
+
+        Args:
+            batch_size: Number of updates per bulk write
+            dry_run: Whether to only report the changes
+
+        Returns:
+            tuple: (papers rewritten, older copies deleted)
+        """
+        cursor = articles_collection.find(
+            {"arxiv_id": {"$regex": r"v\d+$"}}, {"arxiv_id": 1}
+        ).batch_size(batch_size)
+
+        # Versionless id -> [(version, _id)]
+        papers = {}
+        for paper in cursor:
+            match = VERSIONED_ID.match(paper["arxiv_id"])
+            papers.setdefault(match.group(1), []).append((int(match.group(2)), paper["_id"]))
+        logger.info(f"Found {len(papers)} papers stored with versioned ids")
+
+        # Papers already stored under the versionless id (e.g. by the new ingest path) win over old copies
+        current = {
+            paper["arxiv_id"]: paper["_id"]
+            for paper in articles_collection.find({"arxiv_id": {"$in": list(papers)}}, {"arxiv_id": 1})
+        }
+
+        operations = []
+        superseded = []
+        rewritten = 0
+        for arxiv_id, versions in papers.items():
+            versions.sort(reverse=True)
+            if arxiv_id in current:
+                superseded.extend(paper_id for _, paper_id in versions)
+                continue
+            version, keep_id = versions[0]
+            superseded.extend(paper_id for _, paper_id in versions[1:])
+            operations.append(UpdateOne(
+                {"_id": keep_id},
+                {"$set": {
+                    "arxiv_id": arxiv_id,
+                    "arxiv_version": version,
+                    "url": f"https://arxiv.org/abs/{arxiv_id}",
+                    "pdf_url": f"https://arxiv.org/pdf/{arxiv_id}.pdf"
+                }}
+            ))
+
+        logger.info(f"{len(operations)} papers to rewrite, {len(superseded)} older copies to delete")
+        if dry_run:
+            return len(operations), len(superseded)
+
+        # Delete older copies first so the rewritten urls cannot collide with them
+        for start in range(0, len(superseded), batch_size):
+            batch = superseded[start:start + batch_size]
+            relevance_collection.delete_many({"article_id": {"$in": batch}})
+            articles_collection.delete_many({"_id": {"$in": batch}})
+
+        for start in range(0, len(operations), batch_size):
+            rewritten += articles_collection.bulk_write(operations[start:start + batch_size], ordered=False).modified_count
+            logger.info(f"Progress: {rewritten}/{len(operations)} papers rewritten")
+
+        articles_collection.create_index([("arxiv_id", ASCENDING)], unique=True, sparse=True)
+        logger.info("Created unique arxiv_id index")
+
+        if superseded or rewritten:
+            # Let cached feeds revalidate against the changed corpus
+            for name in ("corpus", "relevance"):
+                db.service_state.update_one(
+                    {"_id": f"version:{name}"},
+                    {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now()}},
+                    upsert=True
+                )
+        return rewritten, len(superseded)
+
+    def main():
+        """Main function to run the script"""
+        args = parse_args()
+        logger.info("Starting arXiv version migration" + (" (dry run)" if args.dry_run else ""))
+
+        try:
+            start_time = datetime.now()
+            rewritten, deleted = migrate_papers(batch_size=args.batch_size, dry_run=args.dry_run)
+            duration = (datetime.now() - start_time).total_seconds()
+            logger.info(f"arXiv version migration completed: rewrote {rewritten} papers and deleted "
+                        f"{deleted} older copies in {duration:.2f} seconds")
+        except Exception as e:
+            logger.error(f"Error during arXiv version migration: {str(e)}")
+        finally:
+            client.close()
+            logger.info("Database connection closed")
+
+    if __name__ == "__main__":
+        main()
+
+except ImportError as e:
+    logger.error(f"Import error: {str(e)}")
+    logger.error("Make sure you're running this script from the project root or the correct Python environment")
+    sys.exit(1)
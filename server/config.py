@@ -11,12 +11,22 @@ MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'cs_articles_recommender')
 
 # News API configuration
 NEWS_API_KEY = os.environ.get('NEWS_API_KEY')
+NEWSAPI_BASE_URL = os.environ.get('NEWSAPI_BASE_URL', 'https://newsapi.org/v2')
+
+# arXiv API endpoint (overridable to point ingestion at a local stub)
+ARXIV_API_URL = os.environ.get('ARXIV_API_URL', 'http://export.arxiv.org/api/query')
 
 # SBERT model configuration
 SBERT_MODEL_NAME = os.environ.get('SBERT_MODEL_NAME', 'all-MiniLM-L6-v2')
 
 # Scheduler configuration
 SCHEDULER_INTERVAL_MINUTES = int(os.environ.get('SCHEDULER_INTERVAL_MINUTES', 5))
+# Scheduled jobs that may run at the same time (each job still runs one at a time)
+SCHEDULER_MAX_WORKERS = int(os.environ.get('SCHEDULER_MAX_WORKERS', 4))
+# Only the process holding the scheduler lease runs jobs; it renews the lease every
+# heartbeat, and another process takes over once it goes a whole lease without one
+SCHEDULER_LEASE_SECONDS = float(os.environ.get('SCHEDULER_LEASE_SECONDS', 15))
+SCHEDULER_HEARTBEAT_SECONDS = float(os.environ.get('SCHEDULER_HEARTBEAT_SECONDS', 5))
 
 # Relevance threshold for recommendations (lowered slightly to include more content)
 RELEVANCE_THRESHOLD = float(os.environ.get('RELEVANCE_THRESHOLD', 0.3))
@@ -91,6 +101,161 @@ MIN_ARTICLES_PER_CATEGORY = 50
 # Batch processing limits for embedding updates
 EMBEDDING_BATCH_SIZE = 500
 
+# Event-driven embedding: stored articles are embedded and scored as they arrive
+EMBEDDING_PIPELINE_ENABLED = os.environ.get('EMBEDDING_PIPELINE_ENABLED', 'True').lower() == 'true'
+# Where article events come from: 'memory' (this process's stores), 'change_stream'
+# (every writer, needs a replica set) or 'auto' (change streams when available)
+EMBEDDING_PIPELINE_SOURCE = os.environ.get('EMBEDDING_PIPELINE_SOURCE', 'auto').lower()
+# Articles embedded per model call, and how long to wait for a batch to fill
+EMBEDDING_PIPELINE_BATCH_SIZE = int(os.environ.get('EMBEDDING_PIPELINE_BATCH_SIZE', 64))
+EMBEDDING_PIPELINE_MAX_WAIT_SECONDS = float(os.environ.get('EMBEDDING_PIPELINE_MAX_WAIT_SECONDS', 1.0))
+
+# Item-item co-occurrence ("readers of this also read") settings
+# Weight of each interaction type when building the user x article matrix
+INTERACTION_WEIGHTS = {"view": 1.0, "like": 3.0, "bookmark": 4.0}
+# Number of neighbours kept per article
+COOCCURRENCE_TOP_K = int(os.environ.get('COOCCURRENCE_TOP_K', 20))
+# Number of articles per block in the chunked sparse product (bounds peak memory)
+COOCCURRENCE_CHUNK_SIZE = int(os.environ.get('COOCCURRENCE_CHUNK_SIZE', 2048))
+# Cursor batch size when streaming interactions out of MongoDB
+COOCCURRENCE_READ_BATCH_SIZE = 10000
+# Incremental updates touching more articles than this fall back to a full rebuild
+COOCCURRENCE_MAX_INCREMENTAL_ARTICLES = 5000
+
+# Personalized ranking settings
+# Half-life of a user's taste vector: older interactions lose half their weight after this many days
+TASTE_HALF_LIFE_DAYS = float(os.environ.get('TASTE_HALF_LIFE_DAYS', 14))
+# Weight of the taste score vs module relevance when ranking a user's recommendations
+TASTE_BLEND_WEIGHT = float(os.environ.get('TASTE_BLEND_WEIGHT', 0.6))
+# How often the in-memory embedding matrices pick up new/changed vectors, and fully reload
+VECTOR_INDEX_REFRESH_SECONDS = int(os.environ.get('VECTOR_INDEX_REFRESH_SECONDS', 300))
+VECTOR_INDEX_FULL_RELOAD_SECONDS = int(os.environ.get('VECTOR_INDEX_FULL_RELOAD_SECONDS', 6 * 3600))
+
+# Search settings
+# 'mongo' uses the $text index; 'bm25' uses the in-process inverted index
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'mongo').lower()
+SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'search_index.pkl'))
+# Per-field weights for BM25F scoring
+SEARCH_FIELD_BOOSTS = {"title": 3.0, "description": 1.5, "content": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Decoded posting lists of recently queried terms are kept up to this size
+SEARCH_POSTINGS_CACHE_MB = int(os.environ.get('SEARCH_POSTINGS_CACHE_MB', 64))
+# How often a changed index is snapshotted to disk
+SEARCH_INDEX_SNAPSHOT_MINUTES = int(os.environ.get('SEARCH_INDEX_SNAPSHOT_MINUTES', 10))
+
+# Typeahead suggestion settings
+# Article titles offered as suggestions: the most interacted-with, topped up with the newest
+SUGGEST_MAX_ARTICLES = int(os.environ.get('SUGGEST_MAX_ARTICLES', 5000))
+SUGGEST_POPULARITY_DAYS = 30
+# Prefixes up to this length answer from precomputed top lists
+SUGGEST_CACHED_PREFIX_LENGTH = 3
+SUGGEST_CACHED_TOP = 50
+# Keys added by ingest before they are merged into the sorted arrays
+SUGGEST_MAX_PENDING = 2000
+# Relative weight of each suggestion type when ranking by popularity
+SUGGEST_KIND_WEIGHTS = {"module": 1.0, "keyword": 0.8, "category": 0.6, "article": 0.5}
+SUGGEST_REBUILD_MINUTES = int(os.environ.get('SUGGEST_REBUILD_MINUTES', 60))
+
+# How often the in-memory module catalog checks the modules version stamp
+MODULE_CATALOG_CHECK_SECONDS = int(os.environ.get('MODULE_CATALOG_CHECK_SECONDS', 5))
+
+# Conditional GET settings
+# How long data version stamps are trusted in-process before re-reading them
+DATA_VERSION_CHECK_SECONDS = int(os.environ.get('DATA_VERSION_CHECK_SECONDS', 2))
+# Cache-Control max-age (seconds) for shared feeds; per-user feeds always revalidate
+PUBLIC_FEED_MAX_AGE = int(os.environ.get('PUBLIC_FEED_MAX_AGE', 30))
+MODULE_CATALOG_MAX_AGE = 300
+
+# Response compression
+# Bodies smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Outbound HTTP settings shared by the NewsAPI and arXiv clients
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 30))
+# Attempts per request (including the first) on 429/5xx or network errors
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 3))
+HTTP_BACKOFF_BASE_SECONDS = 1.0
+HTTP_BACKOFF_MAX_SECONDS = 60.0
+HTTP_POOL_SIZE = 10
+# Consecutive failed attempts before an upstream is skipped, and for how long
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_COOLDOWN_SECONDS = int(os.environ.get('CIRCUIT_COOLDOWN_SECONDS', 120))
+
+# Targeted arXiv searches: module and keyword terms OR-ed together per request
+ARXIV_QUERY_MAX_TERMS = 12
+ARXIV_BATCH_MAX_RESULTS = 200
+# Curated keywords used per module (plus the module name)
+ARXIV_MODULE_MAX_TERMS = 6
+
+# Planned NewsAPI keyword searches: distinct terms from every module and keyword
+# packed into OR queries no longer than NewsAPI accepts for q
+NEWSAPI_QUERY_MAX_LENGTH = 500
+NEWSAPI_MAX_PAGE_SIZE = 100
+
+# Response cache: parsed NewsAPI/arXiv results keyed by request parameters, in a local SQLite file
+# Entries are fresh for their source's TTL and served stale (up to RESPONSE_CACHE_STALE_SECONDS) only if a request fails
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'response_cache.sqlite3'))
+RESPONSE_CACHE_TTLS = {
+    "newsapi": int(os.environ.get('NEWSAPI_CACHE_TTL_SECONDS', 3600)),
+    "arxiv": int(os.environ.get('ARXIV_CACHE_TTL_SECONDS', 6 * 3600))
+}
+RESPONSE_CACHE_STALE_SECONDS = int(os.environ.get('RESPONSE_CACHE_STALE_SECONDS', 7 * 24 * 3600))
+
+# Incremental arXiv harvesting over OAI-PMH
+# When enabled, this replaces the per-category arXiv API listings in the scheduled fetch
+ARXIV_OAI_ENABLED = os.environ.get('ARXIV_OAI_ENABLED', 'True').lower() == 'true'
+ARXIV_OAI_URL = os.environ.get('ARXIV_OAI_URL', 'https://oaipmh.arxiv.org/oai')
+ARXIV_OAI_SETS = ['cs', 'stat']
+# How far back the first harvest of a set reaches (use arxiv-harvest-script.py to backfill further)
+ARXIV_OAI_INITIAL_DAYS = int(os.environ.get('ARXIV_OAI_INITIAL_DAYS', 7))
+# Pages per scheduled run; a longer harvest continues from its checkpoint on the next run
+ARXIV_OAI_MAX_PAGES = int(os.environ.get('ARXIV_OAI_MAX_PAGES', 50))
+ARXIV_OAI_HARVEST_HOURS = int(os.environ.get('ARXIV_OAI_HARVEST_HOURS', 12))
+
+# Upstream request rate limits shared by every caller in the process
+# interval: seconds per request at the sustained rate; burst: back-to-back requests allowed after idling
+# shared: keep the limiter clock in MongoDB so several server processes share one budget
+RATE_LIMITS = {
+    # arXiv asks for no more than one API request every three seconds
+    "arxiv": {
+        "interval": float(os.environ.get('ARXIV_REQUEST_INTERVAL_SECONDS', 3.0)),
+        "burst": 1,
+        "shared": os.environ.get('ARXIV_RATE_LIMIT_SHARED', 'False').lower() == 'true'
+    }
+}
+
+# Daily request quotas, split into guaranteed shares per job type
+# A job past its share may only use budget the other jobs have not reserved
+QUOTA_BUDGETS = {
+    # The NewsAPI developer plan allows 100 requests a day
+    "newsapi": {
+        "daily_limit": int(os.environ.get('NEWSAPI_DAILY_REQUEST_LIMIT', 100)),
+        "reserves": {"categories": 0.2, "modules": 0.5, "keywords": 0.2, "admin": 0.1}
+    }
+}
+# Modules with the fewest relevant articles from the last MODULE_NEED_FRESH_DAYS days are fetched first
+MODULE_NEED_FRESH_DAYS = 7
+
+# Async ingestion settings
+# Concurrent requests for each upstream API (request spacing comes from RATE_LIMITS)
+ASYNC_INGEST_ENABLED = os.environ.get('ASYNC_INGEST_ENABLED', 'True').lower() == 'true'
+ASYNC_INGEST_LIMITS = {
+    "newsapi": {"concurrency": int(os.environ.get('NEWSAPI_CONCURRENCY', 4))},
+    "arxiv": {"concurrency": 1}
+}
+ASYNC_INGEST_TIMEOUT_SECONDS = 30
+# Threads storing fetched items into MongoDB while other requests are in flight
+ASYNC_INGEST_STORE_WORKERS = 4
+
+# Streaming export settings (documents fetched from MongoDB per round trip)
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+EXPORT_MAX_BATCH_SIZE = 5000
+
 # API Paths
 API_PREFIX = '/api'
 AUTH_API_PREFIX = '/api/auth'
@@ -95,6 +95,14 @@ def delete_low_relevance_articles(db, threshold, dry_run=False, categories=None,
             # Then delete the articles
             result = articles_collection.delete_many({"_id": {"$in": articles_to_delete}})
             logger.info(f"Deleted {result.deleted_count} articles with relevance below {threshold}")
+            
+            # Advance the version stamps so running servers drop cached feeds
+            for name in ("corpus", "relevance"):
+                db.service_state.update_one(
+                    {"_id": f"version:{name}"},
+                    {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now()}},
+                    upsert=True
+                )
             return result.deleted_count
         elif dry_run:
             # List articles that would be deleted in dry run mode
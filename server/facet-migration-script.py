@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Script to backfill the ingest-time facet fields on existing articles.
+
+This script will:
+1. Find articles stored before the `type` and `category_facets` fields existed
+2. Compute both fields from `source_name` and `categories`
+3. Write them back in batches of bulk updates
+
+Category pages and the "academic" filter match on these fields only, so run
+this once after upgrading an existing database.
+"""
+
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('facet_migration')
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Backfill type and category facets on articles')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                      help='Number of articles to update per bulk write (default: 1000)')
+    parser.add_argument('--all', action='store_true',
+                      help='Recompute facets for every article, not just those missing them')
+    return parser.parse_args()
+
+# Make sure we can import from the application
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+try:
+    # Import application components
+    from config import MONGO_URI, MONGO_DB_NAME
+    from pymongo import MongoClient, UpdateOne
+    from utils.facet_utils import article_type, category_facets
+
+    # Connect to MongoDB
+    client = MongoClient(MONGO_URI)
+    db = client[MONGO_DB_NAME]
+    articles_collection = db.articles
+
+    def backfill_facets(batch_size=1000, recompute_all=False):
+        """Compute and store facet fields for articles
+
+        Args:
+            batch_size: Number of updates per bulk write
+            recompute_all: Whether to rewrite facets that are already present
+
+        Returns:
+            int: Number of articles updated
+        """
+        query = {} if recompute_all else {
+            "$or": [{"type": {"$exists": False}}, {"category_facets": {"$exists": False}}]
+        }
+        total = articles_collection.count_documents(query)
+        logger.info(f"Found {total} articles to update")
+
+        cursor = articles_collection.find(
+            query, {"source_name": 1, "categories": 1}
+        ).batch_size(batch_size)
+
+        updated = 0
+        operations = []
+        for article in cursor:
+            operations.append(UpdateOne(
+                {"_id": article["_id"]},
+                {"$set": {
+                    "type": article_type(article.get("source_name")),
+                    "category_facets": category_facets(article.get("categories", []))
+                }}
+            ))
+
+            if len(operations) >= batch_size:
+                updated += articles_collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+                logger.info(f"Progress: {updated}/{total} articles updated")
+
+        if operations:
+            updated += articles_collection.bulk_write(operations, ordered=False).modified_count
+
+        return updated
+
+    def main():
+        """Main function to run the script"""
+        args = parse_args()
+        logger.info("Starting facet backfill")
+
+        try:
+            start_time = datetime.now()
+            count = backfill_facets(batch_size=args.batch_size, recompute_all=args.all)
+            duration = (datetime.now() - start_time).total_seconds()
+            logger.info(f"Facet backfill completed: updated {count} articles in {duration:.2f} seconds")
+        except Exception as e:
+            logger.error(f"Error during facet backfill: {str(e)}")
+        finally:
+            client.close()
+            logger.info("Database connection closed")
+
+    if __name__ == "__main__":
+        main()
+
+except ImportError as e:
+    logger.error(f"Import error: {str(e)}")
+    logger.error("Make sure you're running this script from the project root or the correct Python environment")
+    sys.exit(1)
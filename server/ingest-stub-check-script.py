@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Script to check the OAI-PMH harvester and the async ingester against a local stub.
+
+This script will:
+1. Serve the sample upstream responses in fixtures/ from a local HTTP server:
+   NewsAPI /everything, the arXiv Atom query API and two OAI-PMH ListRecords
+   pages linked by a resumptionToken
+2. Point NEWSAPI_BASE_URL, ARXIV_API_URL and ARXIV_OAI_URL at the stub and use a
+   throwaway MongoDB database, so nothing real is called or written
+3. Harvest one page, check the checkpoint, resume from the resumptionToken and
+   check the watermark, then run a concurrent refresh and check what it stored
+4. Drop the throwaway database (unless --keep-db) and exit non-zero on any failure
+
+Example:
+    python ingest-stub-check-script.py --db syllabuzz_stub_check
+"""
+
+import os
+import sys
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('ingest_stub_check')
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+OAI_FIRST_PAGE = 'oai_list_records_page1.xml'
+OAI_PAGES = {'stub-token-page-2': 'oai_list_records_page2.xml'}
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Check harvesting and async ingestion against a local stub')
+    parser.add_argument('--db', default='syllabuzz_stub_check',
+                      help='Throwaway MongoDB database to use (default: syllabuzz_stub_check)')
+    parser.add_argument('--keep-db', action='store_true',
+                      help='Keep the throwaway database for inspection instead of dropping it')
+    return parser.parse_args()
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer NewsAPI, arXiv and OAI-PMH requests from the fixture files"""
+    requests = []
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        StubHandler.requests.append((url.path, params))
+
+        if url.path == '/v2/everything':
+            self._send('newsapi_everything.json', 'application/json')
+        elif url.path == '/api/query':
+            self._send('arxiv_query.xml', 'application/atom+xml')
+        elif url.path == '/oai':
+            token = params.get('resumptionToken')
+            if token and token not in OAI_PAGES:
+                self._send_body(b'<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">'
+                                b'<error code="badResumptionToken">unknown token</error></OAI-PMH>', 'text/xml')
+            else:
+                self._send(OAI_PAGES[token] if token else OAI_FIRST_PAGE, 'text/xml')
+        else:
+            self.send_error(404)
+
+    def _send(self, fixture, content_type):
+        with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+            self._send_body(f.read(), content_type)
+
+    def _send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def start_stub():
+    """Start the stub on a free local port and return its base URL"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+args = parse_args()
+stub_server, base_url = start_stub()
+
+# Configuration is read at import time, so point it at the stub first
+os.environ['MONGO_DB_NAME'] = args.db
+os.environ['NEWS_API_KEY'] = 'stub-key'
+os.environ['NEWSAPI_BASE_URL'] = f"{base_url}/v2"
+os.environ['ARXIV_API_URL'] = f"{base_url}/api/query"
+os.environ['ARXIV_OAI_URL'] = f"{base_url}/oai"
+os.environ['ARXIV_REQUEST_INTERVAL_SECONDS'] = '0'
+os.environ['RESPONSE_CACHE_ENABLED'] = 'False'
+
+# Make sure we can import from the application
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    # Import application components
+    from utils.db_utils import db, client, create_indexes, articles_collection
+    from services.article_service import ArticleService
+    from services.arXiv_service import ArxivService
+    from services.oai_harvest_service import OaiHarvestService
+    from services.async_ingest_service import AsyncIngestService
+
+    failures = []
+
+    def check(condition, message):
+        """Record a failed expectation"""
+        logger.info(f"{'ok  ' if condition else 'FAIL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    def check_harvest(arxiv_service):
+        """Harvest the two stub pages in two runs, resuming from the checkpoint in between"""
+        harvester = OaiHarvestService(arxiv_service=arxiv_service)
+
+        # First run stops after one page and leaves the resumption token behind
+        stored = harvester.harvest('cs', max_pages=1)
+        state = harvester.get_state('cs')
+        check(stored == 2, f"first page stored 2 papers (got {stored})")
+        check(state.get('resumption_token') == 'stub-token-page-2', "checkpoint holds the resumption token")
+        check(state.get('watermark') is None, "watermark not advanced before the list is complete")
+
+        # Second run resumes from the token, skips the deleted record and completes the list
+        StubHandler.requests.clear()
+        stored = harvester.harvest('cs')
+        state = harvester.get_state('cs')
+        oai_requests = [params for path, params in StubHandler.requests if path == '/oai']
+        check(stored == 1, f"resumed harvest stored the 1 live paper of page 2 (got {stored})")
+        check(len(oai_requests) == 1 and oai_requests[0].get('resumptionToken') == 'stub-token-page-2',
+              "resumed harvest asked only for the checkpointed page")
+        check(state.get('resumption_token') is None and state.get('watermark') is not None,
+              "watermark advanced and checkpoint cleared once the list was complete")
+
+        paper = articles_collection.find_one({"arxiv_id": "2609.10001"})
+        check(paper is not None and paper.get("arxiv_version") == 2, "revised paper stored as version 2")
+        check(articles_collection.count_documents({"arxiv_id": "2610.10003"}) == 0, "deleted record skipped")
+
+    def check_refresh(article_service, arxiv_service):
+        """Run a concurrent refresh of categories and keyword searches against the stub"""
+        if not AsyncIngestService.is_available():
+            check(False, "aiohttp is installed for the async ingester")
+            return
+        StubHandler.requests.clear()
+        counts = AsyncIngestService(article_service=article_service, arxiv_service=arxiv_service).refresh(modules=False)
+        news_requests = [params for path, params in StubHandler.requests if path == '/v2/everything']
+        arxiv_requests = [params for path, params in StubHandler.requests if path == '/api/query']
+
+        check(counts["articles"] > 0 and counts["papers"] > 0, f"refresh stored articles and papers ({counts['articles']} articles, {counts['papers']} papers)")
+        check(bool(news_requests) and all(params.get('apiKey') == 'stub-key' for params in news_requests),
+              f"{len(news_requests)} NewsAPI requests went to the stub with the API key")
+        check(bool(arxiv_requests), f"{len(arxiv_requests)} arXiv requests went to the stub")
+        check(articles_collection.count_documents({"url": {"$regex": "^https://news\\.example\\.com/"}}) == 3,
+              "each stub news article stored once")
+        check(articles_collection.count_documents({"url": {"$regex": "^https://arxiv\\.org/abs/2610\\.2000[12]"}}) == 2,
+              "each stub arXiv paper stored once")
+
+    def main():
+        """Main function to run the script"""
+        try:
+            create_indexes()
+            arxiv_service = ArxivService()
+            article_service = ArticleService(news_api_key='stub-key')
+            check_harvest(arxiv_service)
+            check_refresh(article_service, arxiv_service)
+        finally:
+            stub_server.shutdown()
+            if args.keep_db:
+                logger.info(f"Kept database {db.name}")
+            else:
+                client.drop_database(db.name)
+
+        if failures:
+            logger.error(f"{len(failures)} checks failed")
+            sys.exit(1)
+        logger.info("All stub checks passed")
+
+    if __name__ == "__main__":
+        main()
+
+except ImportError as e:
+    logger.error(f"Import error: {str(e)}")
+    logger.error("Make sure you're running this script from the project root or the correct Python environment")
+    sys.exit(1)
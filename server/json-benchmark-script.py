@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark JSON serialization of an article page.
+
+This script will:
+1. Build a synthetic page of article documents shaped like MongoDB returns them
+2. Time the previous approach: stringify ObjectIds in a Python loop, then
+   serialize with Flask's default JSON provider
+3. Time the FastJSONProvider used by the app, which encodes the documents as-is
+4. Report the per-page time of each and the gzip/brotli sizes of the body
+
+No database connection is needed.
+"""
+
+import os
+import sys
+import time
+import gzip
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('json_benchmark')
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialization of article pages')
+    parser.add_argument('--page-size', type=int, default=100,
+                      help='Number of articles per page (default: 100)')
+    parser.add_argument('--iterations', type=int, default=200,
+                      help='Number of pages to serialize per approach (default: 200)')
+    parser.add_argument('--embedding-dim', type=int, default=384,
+                      help='Length of the vector_embedding stored on each article (default: 384, 0 to omit)')
+    return parser.parse_args()
+
+# Make sure we can import from the application
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    # Import application components
+    from bson.objectid import ObjectId
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    from utils.json_provider import FastJSONProvider, orjson
+    import brotli
+
+    def build_page(page_size, embedding_dim):
+        """Build a page of article documents as they come out of MongoDB"""
+        now = datetime.now()
+        articles = []
+        for i in range(page_size):
+            article = {
+                "_id": ObjectId(),
+                "title": f"Advances in distributed systems research, part {i}",
+                "description": "A survey of consensus protocols, replication and fault tolerance. " * 3,
+                "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20,
+                "url": f"https://example.com/articles/{i}",
+                "source_name": "arXiv" if i % 2 else "TechNews",
+                "author": "Jane Doe, John Smith",
+                "categories": ["cs.DC", "cs.NI"],
+                "category_facets": ["cs.dc", "cs", "dc", "cs.ni", "ni"],
+                "type": "academic" if i % 2 else "news",
+                "published_at": now - timedelta(hours=i),
+                "created_at": now,
+                "updated_at": now
+            }
+            if embedding_dim:
+                article["vector_embedding"] = [((i * 31 + j) % 997) / 997.0 for j in range(embedding_dim)]
+            articles.append(article)
+        return articles
+
+    def time_per_page(serialize, pages):
+        """Serialize each page and return the mean milliseconds per page"""
+        started = time.perf_counter()
+        for page in pages:
+            serialize(page)
+        return (time.perf_counter() - started) * 1000 / len(pages)
+
+    def main():
+        """Main function to run the script"""
+        args = parse_args()
+        app = Flask(__name__)
+        default_provider = DefaultJSONProvider(app)
+        fast_provider = FastJSONProvider(app)
+
+        def previous(page):
+            for article in page:
+                article["_id"] = str(article["_id"])
+            return default_provider.dumps({"articles": page})
+
+        def current(page):
+            return fast_provider.dumps({"articles": page})
+
+        # Separate copies so neither approach benefits from the other's work
+        previous_pages = [build_page(args.page_size, args.embedding_dim) for _ in range(args.iterations)]
+        current_pages = [build_page(args.page_size, args.embedding_dim) for _ in range(args.iterations)]
+
+        logger.info(f"Serializing {args.iterations} pages of {args.page_size} articles "
+                    f"(orjson {'available' if orjson else 'NOT installed, using json fallback'})")
+        before = time_per_page(previous, previous_pages)
+        after = time_per_page(current, current_pages)
+
+        logger.info(f"Before (str loop + default provider): {before:.2f} ms per page")
+        logger.info(f"After (FastJSONProvider):             {after:.2f} ms per page")
+        logger.info(f"Speedup: {before / after:.1f}x")
+
+        body = current(current_pages[0]).encode('utf-8')
+        logger.info(f"Body size: {len(body)} bytes, gzip: {len(gzip.compress(body, compresslevel=6))} bytes, "
+                    f"brotli: {len(brotli.compress(body, quality=4))} bytes")
+
+    if __name__ == "__main__":
+        main()
+
+except ImportError as e:
+    logger.error(f"Import error: {str(e)}")
+    logger.error("Make sure you're running this script from the project root or the correct Python environment")
+    sys.exit(1)
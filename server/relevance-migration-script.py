@@ -47,6 +47,7 @@ try:
     from config import MONGO_URI, MONGO_DB_NAME, RELEVANCE_THRESHOLD
     from pymongo import MongoClient
     from bson.objectid import ObjectId
+    from utils.db_utils import bump_data_version, RELEVANCE_VERSION
     
     # Connect to MongoDB
     client = MongoClient(MONGO_URI)
@@ -215,6 +216,9 @@ try:
                     logger.info(f"Estimated time remaining: {remaining_time/60:.1f} minutes")
             
             logger.info(f"Updated {total_processed} relevance scores")
+            
+            # Let running servers drop cached relevance feeds
+            bump_data_version(RELEVANCE_VERSION)
             logger.info(f"Found {high_relevance_count} high-relevance pairs (threshold: {threshold})")
             
             # Verify results
@@ -2,7 +2,6 @@
 from flask import Blueprint, request, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from bson.objectid import ObjectId
 from datetime import datetime, timedelta
 import jwt
 import re
@@ -21,6 +20,8 @@ from utils.db_utils import (
     get_starred_modules,
     is_module_starred
 )
+from utils.pagination import InvalidCursorError, BOOKMARK_SORT, next_cursor
+from utils.http_cache import conditional_get
 from config import SECRET_KEY, JWT_EXPIRY_HOURS
 
 auth_api = Blueprint('auth_api', __name__)
@@ -71,6 +72,13 @@ def get_current_user(token):
         
     return user
 
+def bearer_user_id(**kwargs):
+    """Get the user id from the request's bearer token, or None"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    return validate_jwt_token(auth_header.split(' ')[1])
+
 @auth_api.route('/api/auth/signup', methods=['POST'])
 def signup():
     """Register a new user"""
@@ -323,6 +331,7 @@ def save_article():
         return jsonify({'message': 'Article already bookmarked'}), 200
 
 @auth_api.route('/api/auth/bookmarks', methods=['GET'])
+@conditional_get(user=bearer_user_id, private=True)
 def get_bookmarks():
     """Get user's bookmarked articles"""
     auth_header = request.headers.get('Authorization')
@@ -338,37 +347,18 @@ def get_bookmarks():
         
     limit = int(request.args.get('limit', 20))
     skip = int(request.args.get('skip', 0))
+    cursor = request.args.get('cursor')
     
-    # Get bookmarks using the existing function
-    raw_bookmarks = get_user_bookmarks(user_id, limit=limit, skip=skip)
-    
-    # Create a JSON serializable copy with all ObjectIds converted to strings
-    bookmarks = []
-    for bookmark in raw_bookmarks:
-        # Create a serializable copy of the bookmark
-        serializable_bookmark = {}
-        
-        # Handle nested article data
-        if 'article' in bookmark:
-            serializable_bookmark['article'] = {}
-            for key, value in bookmark['article'].items():
-                if isinstance(value, ObjectId):
-                    serializable_bookmark['article'][key] = str(value)
-                else:
-                    serializable_bookmark['article'][key] = value
-        
-        # Handle other fields
-        for key, value in bookmark.items():
-            if key == 'article':
-                continue  # Already handled
-            elif isinstance(value, ObjectId):
-                serializable_bookmark[key] = str(value)
-            else:
-                serializable_bookmark[key] = value
-        
-        bookmarks.append(serializable_bookmark)
-    
-    return jsonify({'bookmarks': bookmarks}), 200
+    # Get bookmarks using the existing function (the JSON provider encodes their ObjectIds)
+    try:
+        bookmarks = get_user_bookmarks(user_id, limit=limit, skip=skip, cursor=cursor)
+    except InvalidCursorError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({
+        'bookmarks': bookmarks,
+        'next_cursor': next_cursor(bookmarks, BOOKMARK_SORT, limit)
+    }), 200
 
 @auth_api.route('/api/auth/bookmark/<article_id>', methods=['DELETE'])
 def remove_saved_article(article_id):
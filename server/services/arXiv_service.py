@@ -1,193 +1,130 @@
 # Updated arXiv service with simplified, reliable approach
 import logging
-import requests
-import xml.etree.ElementTree as ET
-import time
+from lxml import etree
 from datetime import datetime, timedelta
 from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from utils.db_utils import articles_collection
+from utils.facet_utils import category_facets
+from utils.ingest_hooks import notify_ingested
+from utils.http_client import http_get
+from utils.rate_limit import get_rate_limiter
+from utils.arxiv_parsing import iter_atom_papers
+from utils.query_planner import QueryPlanner
+from utils.response_cache import cached_fetch
+from utils.pagination import InvalidCursorError, PUBLISHED_SORT, keyset_filter
+from config import ARXIV_API_URL, ARXIV_QUERY_MAX_TERMS, ARXIV_BATCH_MAX_RESULTS, ARXIV_MODULE_MAX_TERMS
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def module_search_terms(module):
+    """Search terms for a module's papers: its curated keywords plus its name"""
+    terms = list(module.get("keywords") or [])[:ARXIV_MODULE_MAX_TERMS]
+    if module.get("name"):
+        terms.append(module["name"])
+    return terms
+
+
 class ArxivService:
-    def __init__(self):
+    def __init__(self, base_url=ARXIV_API_URL):
         """Initialize the arXiv service"""
-        self.base_url = "http://export.arxiv.org/api/query"
+        self.base_url = base_url
         logger.info("Initialized arXiv service")
 
-    def fetch_papers(self, search_query="cs.AI", max_results=30, start=0, sort_by="submittedDate", years_limit=5):
-        """Fetch papers from arXiv API with improved reliability"""
-        try:
-            # Better handling for all category types
-            if ":" not in search_query and "." in search_query:
-                # Handle any category with subcategory (cs.AI, stat.ML, math.NT, etc.)
-                formatted_query = f"cat:{search_query}"
-            elif search_query in ["cs", "stat", "math", "physics"]:
-                # Handle any main category
-                formatted_query = f"cat:{search_query}"
-            else:
-                # Default to using the search query as provided
-                formatted_query = search_query
-                    
-            # Add basic search if query uses complex syntax
-            if "all:" in search_query or "ti:" in search_query:
-                # Keep it as is
-                formatted_query = search_query
-            
-            # Prepare parameters
-            params = {
-                "search_query": formatted_query,
-                "start": start,
-                "max_results": max_results,
-                "sortBy": sort_by,
-                "sortOrder": "descending"
-            }
-            
-            logger.info(f"Querying arXiv with: {formatted_query}")
-            
-            # Add rate limiting compliance
-            time.sleep(1)
-            
-            # Make API request with retries
-            max_retries = 3
-            response = None
-            for attempt in range(max_retries):
-                try:
-                    response = requests.get(self.base_url, params=params, timeout=30)
-                    
-                    if response.status_code == 200:
-                        break
-                        
-                    logger.warning(f"arXiv API attempt {attempt+1}/{max_retries} failed: {response.status_code}")
-                    if attempt < max_retries - 1:
-                        time.sleep(2 * (attempt + 1))
-                        
-                except requests.exceptions.RequestException as e:
-                    logger.warning(f"Network error attempt {attempt+1}/{max_retries}: {str(e)}")
-                    if attempt < max_retries - 1:
-                        time.sleep(2 * (attempt + 1))
-            
-            if response is None or response.status_code != 200:
-                logger.error(f"All arXiv API attempts failed")
-                return []
-                
-            # Parse XML response - check response content first
-            content = response.content
-            if not content or len(content) < 100:
-                logger.error(f"arXiv API returned empty or invalid response: {content}")
-                return []
+    def build_params(self, search_query="cs.AI", max_results=30, start=0, sort_by="submittedDate"):
+        """Build arXiv API query parameters, prefixing bare categories with cat:"""
+        # Better handling for all category types
+        if ":" not in search_query and "." in search_query:
+            # Handle any category with subcategory (cs.AI, stat.ML, math.NT, etc.)
+            formatted_query = f"cat:{search_query}"
+        elif search_query in ["cs", "stat", "math", "physics"]:
+            # Handle any main category
+            formatted_query = f"cat:{search_query}"
+        else:
+            # Default to using the search query as provided
+            formatted_query = search_query
                 
-            # Parse the XML
-            try:
-                root = ET.fromstring(content)
-            except ET.ParseError as e:
-                logger.error(f"Failed to parse arXiv response XML: {str(e)}")
-                logger.error(f"Response content: {content[:200]}...")
-                return []
+        # Add basic search if query uses complex syntax
+        if "all:" in search_query or "ti:" in search_query:
+            # Keep it as is
+            formatted_query = search_query
+        
+        # Prepare parameters
+        return {
+            "search_query": formatted_query,
+            "start": start,
+            "max_results": max_results,
+            "sortBy": sort_by,
+            "sortOrder": "descending"
+        }
+
+    def parse_papers(self, content, search_query="", years_limit=5):
+        """
+        Parse an arXiv Atom response into paper dicts, dropping papers older than years_limit
+        
+        Args:
+            content: Response bytes or a binary file-like object; entries are parsed as they stream in
+            search_query (str): Query the response answers, for logging
+            years_limit (int): Maximum paper age in years (0 keeps everything)
             
-            # Extract papers from response
+        Returns:
+            list: Parsed papers, or None if the response could not be parsed, so a
+                truncated or malformed feed is never cached as an empty result
+        """
+        try:
+            cutoff_date = datetime.now() - timedelta(days=365 * years_limit) if years_limit > 0 else None
             papers = []
-            namespace = {"atom": "http://www.w3.org/2005/Atom", 
-                         "arxiv": "http://arxiv.org/schemas/atom"}
-            
-            # Count entries to verify we received results
-            entries = root.findall("atom:entry", namespace)
-            logger.info(f"Found {len(entries)} entries in arXiv response")
-            
-            for entry in root.findall("atom:entry", namespace):
-                # Skip the OpenSearch entry if present
-                title_elem = entry.find("atom:title", namespace)
-                summary_elem = entry.find("atom:summary", namespace)
-                
-                # More explicit checks - avoid using truth value of Element objects
-                if title_elem is None or summary_elem is None:
-                    continue
-                
-                # Also check if the text content exists
-                if title_elem.text is None or summary_elem.text is None:
-                    continue
+            total = 0
+            for paper in iter_atom_papers(content):
+                total += 1
+                if cutoff_date is None or paper["published_at"] >= cutoff_date:
+                    papers.append(paper)
                     
-                # Extract basic paper information
-                title = title_elem.text.strip()
-                summary = summary_elem.text.strip()
-                
-                # Extract authors
-                authors = []
-                for author in entry.findall("atom:author", namespace):
-                    name_elem = author.find("atom:name", namespace)
-                    if name_elem is not None and name_elem.text:
-                        authors.append(name_elem.text)
-                
-                # Extract arXiv ID and URLs
-                id_elem = entry.find("atom:id", namespace)
-                if id_elem is None or not id_elem.text:
-                    continue
-                    
-                paper_id = id_elem.text
-                arxiv_id = paper_id.split("/abs/")[-1]
-                
-                # Get PDF URL
-                pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-                abstract_url = f"https://arxiv.org/abs/{arxiv_id}"
-                
-                # Extract categories
-                categories = []
-                primary_category = entry.find("arxiv:primary_category", namespace)
-                if primary_category is not None:
-                    cat_term = primary_category.attrib.get("term")
-                    if cat_term:
-                        categories.append(cat_term)
-                
-                for category in entry.findall("atom:category", namespace):
-                    cat_term = category.attrib.get("term")
-                    if cat_term and cat_term not in categories:
-                        categories.append(cat_term)
-                
-                # Extract publication date
-                published_elem = entry.find("atom:published", namespace)
-                if published_elem is None or not published_elem.text:
-                    published_date = datetime.utcnow()
-                else:
-                    try:
-                        published_date = datetime.strptime(published_elem.text, "%Y-%m-%dT%H:%M:%SZ")
-                    except ValueError:
-                        published_date = datetime.utcnow()
-                
-                # Convert to our standard format
-                paper = {
-                    "title": title,
-                    "description": summary[:300] + "..." if len(summary) > 300 else summary,
-                    "content": summary,
-                    "url": abstract_url,
-                    "pdf_url": pdf_url,
-                    "arxiv_id": arxiv_id,
-                    "source_name": "arXiv",
-                    "authors": authors,
-                    "categories": categories,
-                    "published_at": published_date,
-                    "source_type": "academic"
-                }
-                
-                papers.append(paper)
-
-            # Apply years limit filter if specified
-            if years_limit > 0:
-                # Calculate cutoff date
-                cutoff_date = datetime.now() - timedelta(days=365 * years_limit)
-                
-                # Filter papers by date
-                filtered_papers = [paper for paper in papers if paper["published_at"] >= cutoff_date]
-                
-                logger.info(f"Date filtering: kept {len(filtered_papers)} out of {len(papers)} papers (limit: {years_limit} years)")
-                papers = filtered_papers
-            
+            if cutoff_date is not None:
+                logger.info(f"Date filtering: kept {len(papers)} out of {total} papers (limit: {years_limit} years)")
             logger.info(f"Successfully extracted {len(papers)} papers from arXiv for query: {search_query}")
             return papers
+        except etree.XMLSyntaxError as e:
+            logger.error(f"Failed to parse arXiv response XML: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Error parsing arXiv response: {str(e)}", exc_info=True)
+            return None
+
+    def fetch_papers(self, search_query="cs.AI", max_results=30, start=0, sort_by="submittedDate", years_limit=5):
+        """Fetch papers from arXiv API with improved reliability"""
+        try:
+            params = self.build_params(search_query, max_results, start, sort_by)
+            
+            # Identical queries within the cache TTL are answered from the parsed response cache
+            papers = cached_fetch(
+                "arxiv", dict(params, years_limit=years_limit),
+                lambda: self._request_papers(params, search_query, years_limit)
+            )
+            return papers if papers is not None else []
         except Exception as e:
             logger.error(f"Error fetching papers from arXiv: {str(e)}", exc_info=True)
             return []
+
+    def _request_papers(self, params, search_query, years_limit):
+        """Request and parse one arXiv query, returning None if the request or parsing failed"""
+        logger.info(f"Querying arXiv with: {params['search_query']}")
+        
+        # Make API request (retries, backoff and circuit breaking live in the shared client;
+        # the shared limiter spaces requests from every thread as arXiv asks)
+        response = http_get(self.base_url, params=params, stream=True, limiter=get_rate_limiter("arxiv"))
+        
+        with response:
+            if response.status_code != 200:
+                logger.error(f"arXiv API request failed: {response.status_code}")
+                return None
+                
+            # Parse entries straight off the socket instead of buffering the whole feed
+            response.raw.decode_content = True
+            return self.parse_papers(response.raw, search_query, years_limit)
         
     def fetch_and_store_papers(self, search_query="cs", max_results=20, years_limit=5):
         """Fetch papers from arXiv and store them in the database"""
@@ -196,13 +133,9 @@ class ArxivService:
             papers = self.fetch_papers(search_query=search_query, max_results=max_results, years_limit=years_limit)
             print(f"Found {len(papers)} papers")
             
-            # Store each paper
-            stored_count = 0
-            for paper in papers:
-                # Store paper
-                result = self.store_paper(paper)
-                if result:
-                    stored_count += 1
+            # Store the whole response in one bulk write
+            result = self.store_papers_bulk(papers)
+            stored_count = len(result["inserted"]) + len(result["updated"])
                     
             logger.info(f"Stored {stored_count} papers for query: {search_query}")
             return stored_count
@@ -210,65 +143,265 @@ class ArxivService:
             logger.error(f"Error fetching and storing papers: {str(e)}")
             return 0
 
-    def store_paper(self, paper):
-        """Store a paper in the database"""
+    def fetch_targeted_papers(self, keywords, max_results=30, years_limit=5):
+        """
+        Fetch and store papers matching any of a set of keywords with one boolean query
+        
+        Args:
+            keywords (str or list): Keywords, or a comma-separated string of them
+            max_results (int): Number of papers to fetch
+            years_limit (int): Maximum paper age in years
+            
+        Returns:
+            int: Number of papers stored
+        """
         try:
-            # Prepare paper document
-            paper_doc = {
-                "title": paper.get("title"),
-                "description": paper.get("description"),
-                "content": paper.get("content"),
-                "url": paper.get("url"),
-                "pdf_url": paper.get("pdf_url"),
-                "arxiv_id": paper.get("arxiv_id"),
-                "source_name": "arXiv",
-                "authors": paper.get("authors", []),
-                "categories": paper.get("categories", []),
-                "published_at": paper.get("published_at"),
-                "updated_at": datetime.utcnow(),
-                "source_type": "academic",
-                "vector_embedding": None  # Will be populated by embedding service
-            }
+            if isinstance(keywords, str):
+                keywords = [k.strip() for k in keywords.split(",")]
+            counts = self.fetch_papers_for_topics({"keywords": keywords}, max_results, years_limit)
+            return counts.get("keywords", 0)
+        except Exception as e:
+            logger.error(f"Error fetching targeted papers: {str(e)}")
+            return 0
+
+    def fetch_module_specific_papers(self, module_id, max_results=25, years_limit=5):
+        """
+        Fetch and store papers for one module from its name and keywords
+        
+        Args:
+            module_id (str or ObjectId): ID of the module
+            max_results (int): Number of papers to fetch
+            years_limit (int): Maximum paper age in years
+            
+        Returns:
+            int: Number of papers stored for the module
+        """
+        try:
+            from utils.db_utils import modules_collection
+            module = modules_collection.find_one({"_id": ObjectId(module_id) if isinstance(module_id, str) else module_id})
             
-            # Check if paper already exists (by arXiv ID)
-            existing = articles_collection.find_one({"arxiv_id": paper.get("arxiv_id")})
+            if not module:
+                logger.error(f"Module not found: {module_id}")
+                return 0
+                
+            return self.fetch_papers_for_modules([module], max_results, years_limit).get(module["_id"], 0)
+        except Exception as e:
+            logger.error(f"Error fetching module-specific papers: {str(e)}")
+            return 0
+
+    def fetch_papers_for_modules(self, modules, max_results=25, years_limit=5, done_terms=(), on_batch=None):
+        """
+        Fetch and store papers for many modules with a few combined queries
+        
+        Args:
+            modules (list): Module documents
+            max_results (int): Papers to keep per module
+            years_limit (int): Maximum paper age in years
+            done_terms (list): Terms to skip, e.g. ones an interrupted run already searched
+            on_batch (callable): Called with the terms of each query once its papers are stored
             
-            if existing:
-                # Update existing paper
-                articles_collection.update_one(
-                    {"_id": existing["_id"]},
-                    {"$set": paper_doc}
+        Returns:
+            dict: Module _id -> number of papers stored for it
+        """
+        return self.fetch_papers_for_topics(
+            {module["_id"]: module_search_terms(module) for module in modules}, max_results, years_limit,
+            done_terms=done_terms, on_batch=on_batch
+        )
+
+    def fetch_papers_for_topics(self, topics, max_results=25, years_limit=5, done_terms=(), on_batch=None):
+        """
+        Fetch papers for several topics by OR-ing their terms into a few boolean queries
+        
+        Terms are packed ARXIV_QUERY_MAX_TERMS to a query, each query asking for
+        enough results to cover every topic in it. Each returned paper is routed
+        back to the topics whose terms appear in its title or abstract, up to
+        max_results papers per topic, and the routed papers of a query are
+        stored with one bulk write.
+        
+        Args:
+            topics (dict): Topic key (e.g. a module _id) -> list of search terms
+            max_results (int): Papers to keep per topic
+            years_limit (int): Maximum paper age in years
+            done_terms (list): Terms to skip, e.g. ones an interrupted run already searched
+            on_batch (callable): Called with the terms of each query once its papers are stored
+            
+        Returns:
+            dict: Topic key -> number of papers routed to it and stored
+        """
+        # A term shared by several modules is only queried once
+        planner = QueryPlanner()
+        for topic, terms in topics.items():
+            planner.add(topic, terms, max_results)
+        planner.exclude(done_terms)
+        try:
+            for batch in planner.batches(max_terms=ARXIV_QUERY_MAX_TERMS):
+                wanted = planner.wanted(batch)
+                if not wanted:
+                    continue
+                
+                query = " OR ".join(f'{"all" if " " in term else "abs"}:"{term}"' for term in batch)
+                papers = self.fetch_papers(
+                    search_query=query,
+                    max_results=min(ARXIV_BATCH_MAX_RESULTS, wanted),
+                    sort_by="relevance",
+                    years_limit=years_limit
                 )
-                return existing["_id"]
-            else:
-                # Insert new paper
-                result = articles_collection.insert_one(paper_doc)
-                return result.inserted_id
+                
+                routed = planner.route(papers, batch, lambda paper: f"{paper.get('title', '')} {paper.get('content', '')}")
+                if routed:
+                    self.store_papers_bulk([paper for paper, _ in routed])
+                logger.info(f"Routed {len(routed)} of {len(papers)} papers for a {len(batch)}-term query")
+                if on_batch:
+                    on_batch(batch)
+            return planner.counts
+        except Exception as e:
+            logger.error(f"Error fetching papers for topics: {str(e)}")
+            return planner.counts
+
+    def store_paper(self, paper):
+        """Store a paper in the database"""
+        try:
+            result = self.store_papers_bulk([paper])
+            ids = result["inserted"] + result["updated"]
+            return ids[0] if ids else None
         except Exception as e:
             logger.error(f"Error storing paper: {str(e)}")
             return None
 
-    def get_papers_by_category(self, category, limit=20, skip=0):
+    def store_papers_bulk(self, papers):
+        """
+        Upsert a parsed arXiv response with one unordered bulk write keyed on arxiv_id
+        
+        Papers are stored once per versionless arXiv id. A paper whose version
+        is newer than the stored one replaces its text and has its embedding
+        cleared for recomputation; the same or an older version is left alone
+        (its upsert hits the unique arxiv_id index and is counted as unchanged).
+        
+        Args:
+            papers (list): Paper dicts from parse_papers
+            
+        Returns:
+            dict: {"inserted": [ids], "updated": [ids], "unchanged": count}
+        """
+        try:
+            # One document per arXiv id; keep the newest version on the page
+            docs = {}
+            for paper in papers:
+                if not paper.get("arxiv_id"):
+                    continue
+                current = docs.get(paper["arxiv_id"])
+                if current is None or paper.get("arxiv_version", 1) >= current.get("arxiv_version", 1):
+                    docs[paper["arxiv_id"]] = paper
+            if not docs:
+                return {"inserted": [], "updated": [], "unchanged": 0}
+            docs = [self._paper_document(paper) for paper in docs.values()]
+            
+            now = datetime.utcnow()
+            operations = [self._upsert_operation(paper_doc, now) for paper_doc in docs]
+            inserted, skipped = set(), set()
+            try:
+                result = articles_collection.bulk_write(operations, ordered=False)
+                inserted.update(result.upserted_ids)
+            except BulkWriteError as e:
+                inserted.update(upsert["index"] for upsert in e.details.get("upserted", []))
+                for error in e.details.get("writeErrors", []):
+                    skipped.add(error["index"])
+                    if error.get("code") != 11000:
+                        logger.error(f"Error upserting paper {docs[error['index']]['arxiv_id']}: {error.get('errmsg')}")
+                        
+            # Look the ids of written papers up in one query rather than one per paper
+            written = [index for index in range(len(docs)) if index not in skipped]
+            ids = {
+                doc["arxiv_id"]: doc["_id"]
+                for doc in articles_collection.find(
+                    {"arxiv_id": {"$in": [docs[index]["arxiv_id"] for index in written]}}, {"arxiv_id": 1}
+                )
+            } if written else {}
+            stored = []
+            result = {"inserted": [], "updated": [], "unchanged": len(skipped)}
+            for index in written:
+                paper_doc = docs[index]
+                paper_doc["_id"] = ids.get(paper_doc["arxiv_id"])
+                if paper_doc["_id"] is None:
+                    continue
+                stored.append(paper_doc)
+                result["inserted" if index in inserted else "updated"].append(paper_doc["_id"])
+                
+            notify_ingested(stored)
+            logger.info(f"Bulk stored {len(result['inserted'])} new and {len(result['updated'])} revised papers "
+                        f"({result['unchanged']} unchanged)")
+            return result
+        except Exception as e:
+            logger.error(f"Error bulk storing papers: {str(e)}")
+            return {"inserted": [], "updated": [], "unchanged": 0}
+
+    def _paper_document(self, paper):
+        """Convert a parsed paper into the stored document shape"""
+        return {
+            "title": paper.get("title"),
+            "description": paper.get("description"),
+            "content": paper.get("content"),
+            "url": paper.get("url"),
+            "pdf_url": paper.get("pdf_url"),
+            "arxiv_id": paper.get("arxiv_id"),
+            "arxiv_version": paper.get("arxiv_version", 1),
+            "source_name": "arXiv",
+            "authors": paper.get("authors", []),
+            "categories": paper.get("categories", []),
+            "category_facets": category_facets(paper.get("categories", [])),
+            "type": "academic",
+            "published_at": paper.get("published_at"),
+            "updated_at": datetime.utcnow(),
+            "source_type": "academic",
+            "vector_embedding": None  # Will be populated by embedding service
+        }
+
+    def _upsert_operation(self, paper_doc, now):
+        """Build the version-aware upsert for one paper document"""
+        revised = {field: value for field, value in paper_doc.items()
+                   if field not in ("arxiv_id", "url", "source_name", "type", "source_type", "published_at")}
+        return UpdateOne(
+            # Only matches a stored copy of an older version; otherwise inserts,
+            # which the unique arxiv_id index rejects if any copy already exists
+            {"arxiv_id": paper_doc["arxiv_id"], "arxiv_version": {"$not": {"$gte": paper_doc["arxiv_version"]}}},
+            {
+                "$set": revised,
+                "$setOnInsert": {
+                    "url": paper_doc["url"],
+                    "source_name": paper_doc["source_name"],
+                    "type": paper_doc["type"],
+                    "source_type": paper_doc["source_type"],
+                    "published_at": paper_doc["published_at"],
+                    "created_at": now
+                }
+            },
+            upsert=True
+        )
+
+    def get_papers_by_category(self, category, limit=20, skip=0, cursor=None):
         """Get papers from database filtered by category"""
         try:
             # Build query to find arXiv papers with specific category
             query = {
-                "source_name": "arXiv",
-                "categories": category
+                "type": "academic",
+                "category_facets": category.strip().lower()
             }
+            
+            # Continue after the previous page
+            if cursor:
+                query.update(keyset_filter(PUBLISHED_SORT, cursor))
+                skip = 0
                 
             # Get papers
             papers = list(articles_collection.find(query)
-                         .sort("published_at", -1)
+                         .sort(PUBLISHED_SORT)
                          .skip(skip)
                          .limit(limit))
-                          
-            # Convert ObjectId to string for JSON serialization
-            for paper in papers:
-                paper["_id"] = str(paper["_id"])
                 
             logger.info(f"Retrieved {len(papers)} papers from database for category: {category}")
             return papers
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Error getting papers: {str(e)}")
             return []
@@ -289,10 +422,6 @@ class ArxivService:
                          .sort("published_at", -1)
                          .skip(skip)
                          .limit(limit))
-                           
-            # Convert ObjectId to string
-            for paper in papers:
-                paper["_id"] = str(paper["_id"])
                 
             logger.info(f"Found {len(papers)} papers matching query: {query}")
             return papers
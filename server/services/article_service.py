@@ -1,74 +1,134 @@
 # Updated article_service.py with improved historical content fetch
 import logging
-import requests
+from collections import Counter
 from datetime import datetime, timedelta
 from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from utils.db_utils import articles_collection
-from config import NEWS_API_KEY
+from utils.facet_utils import article_type, category_facets
+from utils.ingest_hooks import notify_ingested
+from utils.http_client import http_get
+from utils.query_planner import QueryPlanner
+from utils.response_cache import cached_fetch
+from utils.quota_budget import get_quota_budget
+from utils.pagination import InvalidCursorError, PUBLISHED_SORT, SEARCH_SORT, decode_cursor, keyset_filter
+from config import (
+    NEWS_API_KEY, NEWSAPI_BASE_URL, SEARCH_BACKEND, NEWSAPI_QUERY_MAX_LENGTH, NEWSAPI_MAX_PAGE_SIZE,
+    RELEVANCE_THRESHOLD, MODULE_NEED_FRESH_DAYS
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ArticleService:
-    def __init__(self, news_api_key=NEWS_API_KEY):
+    def __init__(self, news_api_key=NEWS_API_KEY, search_index=None, base_url=NEWSAPI_BASE_URL):
         """Initialize the article service"""
         self.news_api_key = news_api_key
+        self.search_index = search_index
+        self.everything_url = f"{base_url.rstrip('/')}/everything"
         logger.info("Initialized article service")
 
-    def fetch_articles(self, category=None, count=20, page=1):
-        """Fetch articles from NewsAPI"""
-        try:
-            url = "https://newsapi.org/v2/everything"
-            
-            # Prepare parameters
-            params = {
-                "apiKey": self.news_api_key,
-                "pageSize": count,
-                "page": page,
-                "language": "en"
-            }
-            
-            # Add category if specified
-            if category:
-                params["category"] = category
-                
-            # Make API request
-            response = requests.get(url, params=params)
+    def category_params(self, category=None, count=20, page=1):
+        """Build NewsAPI /everything parameters for a category fetch"""
+        params = {
+            "apiKey": self.news_api_key,
+            "pageSize": count,
+            "page": page,
+            "language": "en"
+        }
+        
+        # Add category if specified
+        if category:
+            params["category"] = category
+        return params
+
+    def keyword_query(self, keywords):
+        """Build the NewsAPI q string for a keyword search"""
+        # Convert keywords list to proper query format
+        if isinstance(keywords, list):
+            query = " OR ".join([f'"{k}"' for k in keywords])
+        else:
+            query = keywords
+            
+        # Add CS/programming specific terms to improve relevance
+        return f"({query}) AND (programming OR software OR technology OR algorithm OR data OR computer)"
+
+    def keyword_params(self, keywords, count=30, page=1):
+        """Build NewsAPI /everything parameters for a keyword search"""
+        query = self.keyword_query(keywords)
+        
+        # Get articles from last 30 days instead of default 7 for better historical coverage
+        from_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+        
+        return {
+            "apiKey": self.news_api_key,
+            "q": query,
+            "pageSize": count,
+            "page": page,
+            "language": "en",
+            "from": from_date,
+            "sortBy": "relevancy"  # Use relevancy instead of date
+        }
+
+    def parse_news_response(self, status_code, data, text=""):
+        """Extract the article list from a NewsAPI response, or None if it failed"""
+        # Check for successful response
+        if status_code != 200:
+            logger.error(f"NewsAPI error: {status_code}, {text}")
+            return None
             
-            # Check for successful response
-            if response.status_code != 200:
-                logger.error(f"NewsAPI error: {response.status_code}, {response.text}")
-                return []
-                
-            # Parse response
-            data = response.json()
+        # Check if articles were returned
+        if not isinstance(data, dict) or data.get("status") != "ok" or "articles" not in data:
+            logger.error(f"Invalid response from NewsAPI: {data}")
+            return None
             
-            # Check if articles were returned
-            if data.get("status") != "ok" or "articles" not in data:
-                logger.error(f"Invalid response from NewsAPI: {data}")
+        return data["articles"]
+
+    def fetch_news(self, params, job="admin"):
+        """
+        Get the articles for a NewsAPI /everything request
+        
+        Identical requests within the cache TTL are answered from the parsed
+        response cache, which also covers for NewsAPI failures with a stale copy.
+        Requests that do go out are charged to job's share of the daily quota.
+        
+        Returns:
+            list: Articles, or None if the request failed (or job's budget is spent) and nothing was cached
+        """
+        return cached_fetch("newsapi", params, lambda: self._request_news(params, job))
+
+    def _request_news(self, params, job="admin"):
+        """Request one NewsAPI page and return its articles, or None on failure"""
+        if not get_quota_budget("newsapi").try_spend(job):
+            return None
+        response = http_get(self.everything_url, params=params)
+        data = response.json() if response.status_code == 200 else None
+        return self.parse_news_response(response.status_code, data, response.text)
+
+    def fetch_articles(self, category=None, count=20, page=1, job="admin"):
+        """Fetch articles from NewsAPI"""
+        try:
+            articles = self.fetch_news(self.category_params(category, count, page), job)
+            if articles is None:
                 return []
                 
-            articles = data["articles"]
             logger.info(f"Fetched {len(articles)} articles from NewsAPI for category: {category}")
             return articles
         except Exception as e:
             logger.error(f"Error fetching articles: {str(e)}")
             return []
 
-    def fetch_and_store_articles(self, category=None, count=20):
+    def fetch_and_store_articles(self, category=None, count=20, job="admin"):
         """Fetch articles from NewsAPI and store them in the database"""
         try:
             # Fetch articles
-            articles = self.fetch_articles(category, count)
+            articles = self.fetch_articles(category, count, job=job)
             
-            # Store each article
-            stored_count = 0
-            for article in articles:
-                # Store article
-                result = self.store_article(article, category)
-                if result:
-                    stored_count += 1
+            # Store the whole page in one bulk write
+            result = self.store_articles_bulk(articles, category)
+            stored_count = len(result["inserted"]) + len(result["updated"])
                     
             logger.info(f"Stored {stored_count} articles for category: {category}")
             return stored_count
@@ -76,65 +136,139 @@ class ArticleService:
             logger.error(f"Error fetching and storing articles: {str(e)}")
             return 0
 
-    def store_article(self, article, category=None):
-        """Store an article in the database"""
-        try:
-            # Extract source information
-            source = article.get("source", {})
-            source_name = source.get("name", "Unknown") if isinstance(source, dict) else str(source)
-            
-            # Extract published date
-            published_at = article.get("publishedAt")
-            if published_at:
+    def normalize_article(self, article, category=None):
+        """Convert a NewsAPI article into the stored document shape"""
+        # Extract source information
+        source = article.get("source", {})
+        source_name = source.get("name", "Unknown") if isinstance(source, dict) else str(source)
+        
+        # Extract published date
+        published_at = article.get("publishedAt")
+        if published_at:
+            try:
+                published_at = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%SZ")
+            except:
                 try:
-                    published_at = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%SZ")
+                    published_at = datetime.strptime(published_at, "%Y-%m-%d %H:%M:%S")
                 except:
-                    try:
-                        published_at = datetime.strptime(published_at, "%Y-%m-%d %H:%M:%S")
-                    except:
-                        published_at = datetime.utcnow()
-            else:
-                published_at = datetime.utcnow()
-                
-            # Prepare article document
-            article_doc = {
-                "title": article.get("title"),
-                "description": article.get("description"),
-                "content": article.get("content"),
-                "url": article.get("url"),
-                "image_url": article.get("urlToImage"),
-                "source_name": source_name,
-                "published_at": published_at,
-                "updated_at": datetime.utcnow(),
-                "vector_embedding": None  # Will be populated by embedding service
-            }
+                    published_at = datetime.utcnow()
+        else:
+            published_at = datetime.utcnow()
+            
+        # Prepare article document
+        article_doc = {
+            "title": article.get("title"),
+            "description": article.get("description"),
+            "content": article.get("content"),
+            "url": article.get("url"),
+            "image_url": article.get("urlToImage"),
+            "source_name": source_name,
+            "type": article_type(source_name),
+            "published_at": published_at,
+            "updated_at": datetime.utcnow(),
+            "vector_embedding": None  # Will be populated by embedding service
+        }
+        
+        # Add category if provided
+        if category:
+            article_doc["categories"] = [category]
+            article_doc["category_facets"] = category_facets([category])
             
-            # Add category if provided
-            if category:
-                article_doc["categories"] = [category]
-                
-            # Add keywords if available
-            if article.get("keywords"):
-                article_doc["keywords"] = article.get("keywords")
-                
-            # Check if article already exists (by URL)
-            existing = articles_collection.find_one({"url": article_doc["url"]})
+        # Add keywords if available
+        if article.get("keywords"):
+            article_doc["keywords"] = article.get("keywords")
             
-            if existing:
-                # Update existing article
-                articles_collection.update_one(
-                    {"_id": existing["_id"]},
-                    {"$set": article_doc}
-                )
-                return existing["_id"]
-            else:
-                # Insert new article
-                result = articles_collection.insert_one(article_doc)
-                return result.inserted_id
+        return article_doc
+
+    def store_article(self, article, category=None):
+        """Store an article in the database"""
+        try:
+            result = self.store_articles_bulk([article], category)
+            ids = result["inserted"] + result["updated"]
+            return ids[0] if ids else None
         except Exception as e:
             logger.error(f"Error storing article: {str(e)}")
             return None
 
+    def store_articles_bulk(self, articles, category=None):
+        """
+        Upsert a page of fetched articles with a single bulk write keyed on url
+        
+        Fields that do not change once an article is known (source, publish
+        date, its embedding) are only written on insert, so re-fetching an
+        article refreshes its text without discarding its embedding.
+        Categories and keywords are merged into the existing ones.
+        
+        Args:
+            articles (list): Raw NewsAPI articles
+            category (str): Category the page was fetched for
+            
+        Returns:
+            dict: {"inserted": [ids of new articles], "updated": [ids of existing articles]}
+        """
+        try:
+            # One document per URL; later duplicates on the page win
+            docs = {}
+            for article in articles:
+                article_doc = self.normalize_article(article, category)
+                if article_doc["url"]:
+                    docs[article_doc["url"]] = article_doc
+            if not docs:
+                return {"inserted": [], "updated": []}
+            docs = list(docs.values())
+            
+            now = datetime.utcnow()
+            operations = [self._upsert_operation(article_doc, now) for article_doc in docs]
+            inserted_urls = set()
+            try:
+                result = articles_collection.bulk_write(operations, ordered=False)
+                inserted_urls.update(docs[index]["url"] for index in result.upserted_ids)
+            except BulkWriteError as e:
+                # A concurrent fetcher inserted the same URL first; the retry matches and updates it
+                retry = [error["index"] for error in e.details.get("writeErrors", []) if error.get("code") == 11000]
+                inserted_urls.update(docs[upsert["index"]]["url"] for upsert in e.details.get("upserted", []))
+                other_errors = len(e.details.get("writeErrors", [])) - len(retry)
+                if other_errors:
+                    logger.error(f"Bulk article upsert had {other_errors} failed writes")
+                if retry:
+                    articles_collection.bulk_write([operations[index] for index in retry], ordered=False)
+                    
+            # Look the ids up in one query rather than one per article
+            ids = {
+                doc["url"]: doc["_id"]
+                for doc in articles_collection.find({"url": {"$in": [d["url"] for d in docs]}}, {"url": 1})
+            }
+            stored = []
+            inserted, updated = [], []
+            for article_doc in docs:
+                article_id = ids.get(article_doc["url"])
+                if article_id is None:
+                    continue
+                article_doc["_id"] = article_id
+                stored.append(article_doc)
+                (inserted if article_doc["url"] in inserted_urls else updated).append(article_id)
+                
+            notify_ingested(stored)
+            logger.info(f"Bulk stored {len(inserted)} new and {len(updated)} updated articles")
+            return {"inserted": inserted, "updated": updated}
+        except Exception as e:
+            logger.error(f"Error bulk storing articles: {str(e)}")
+            return {"inserted": [], "updated": []}
+
+    def _upsert_operation(self, article_doc, now):
+        """Build the upsert for one normalized article"""
+        update = {
+            "$set": {field: article_doc[field] for field in ("title", "description", "content", "image_url", "updated_at")},
+            "$setOnInsert": {
+                field: article_doc[field] for field in ("source_name", "type", "published_at", "vector_embedding")
+            }
+        }
+        update["$setOnInsert"]["created_at"] = now
+        merged = {field: {"$each": article_doc[field]} for field in ("categories", "category_facets", "keywords") if article_doc.get(field)}
+        if merged:
+            update["$addToSet"] = merged
+        return UpdateOne({"url": article_doc["url"]}, update, upsert=True)
+
     def get_articles(self, category=None, limit=20, skip=0):
         """Get articles from database, optionally filtered by category"""
         try:
@@ -148,10 +282,6 @@ class ArticleService:
                           .sort("published_at", -1)
                           .skip(skip)
                           .limit(limit))
-                          
-            # Convert ObjectId to string for JSON serialization
-            for article in articles:
-                article["_id"] = str(article["_id"])
                 
             logger.info(f"Retrieved {len(articles)} articles from database for category: {category}")
             return articles
@@ -170,8 +300,6 @@ class ArticleService:
             article = articles_collection.find_one({"_id": article_id})
             
             if article:
-                # Convert ObjectId to string
-                article["_id"] = str(article["_id"])
                 return article
                 
             logger.error(f"Article not found: {article_id}")
@@ -194,14 +322,9 @@ class ArticleService:
                            .skip(skip)
                            .limit(limit))
                            
-            # Convert ObjectId to string and add type
+            # Type is stored at ingest; documents stored before that fall back to the source
             for item in results:
-                item["_id"] = str(item["_id"])
-                # Add a type field to distinguish between news and academic
-                if item.get("source_name") == "arXiv":
-                    item["type"] = "academic"
-                else:
-                    item["type"] = "news"
+                item.setdefault("type", article_type(item.get("source_name")))
                     
             logger.info(f"Found {len(results)} combined items matching query: {query}")
             return results
@@ -209,81 +332,112 @@ class ArticleService:
             logger.error(f"Error searching combined content: {str(e)}")
             return []                 
         
-    def get_combined_articles(self, category=None, limit=20, skip=0):
+    def get_combined_articles(self, category=None, limit=20, skip=0, cursor=None):
         """Get both news articles and academic papers, optionally filtered by category
         This method combines news articles and arXiv papers in a single list,
-        sorted by published date"""
+        sorted by published date. Pass the ``cursor`` of the previous page for
+        constant-cost paging; ``skip`` is kept for older clients"""
         try:
             # Build query
             query = {}
             
-            # Add category filter if provided
+            # Add category filter if provided (both are exact matches on ingest-time facets,
+            # so each page is a range scan over a (facet, published_at, _id) index)
             if category:
                 # Handle special case "academic" to show only papers
                 if category == "academic":
-                    query["source_name"] = "arXiv"
-                # For regular categories, try to match with either news categories or arXiv categories
+                    query["type"] = "academic"
+                # For regular categories, match news categories and arXiv category tokens
                 else:
-                    query["$or"] = [
-                        {"categories": category},  # Regular news article category
-                        {"categories": {"$regex": category, "$options": "i"}}  # arXiv category (case insensitive)
-                    ]
+                    query["category_facets"] = category.strip().lower()
+                    
+            # Continue after the previous page
+            if cursor:
+                query = {"$and": [query, keyset_filter(PUBLISHED_SORT, cursor)]}
+                skip = 0
                     
             # Get articles from both sources
             combined_articles = list(articles_collection.find(query)
-                            .sort("published_at", -1)
+                            .sort(PUBLISHED_SORT)
                             .skip(skip)
                             .limit(limit))
                             
-            # Convert ObjectId to string for JSON serialization
+            # Type is stored at ingest; documents stored before that fall back to the source
             for article in combined_articles:
-                article["_id"] = str(article["_id"])
-                # Add a type field to distinguish between news and academic
-                if article.get("source_name") == "arXiv":
-                    article["type"] = "academic"
-                else:
-                    article["type"] = "news"
+                article.setdefault("type", article_type(article.get("source_name")))
                     
             logger.info(f"Retrieved {len(combined_articles)} combined articles/papers from database for category: {category}")
             return combined_articles
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Error getting combined articles: {str(e)}")
             return []    
 
-    def search_combined(self, query, limit=20, skip=0):
+    def search_combined(self, query, limit=20, skip=0, cursor=None):
         """Enhanced search for both news articles and academic papers
-        Uses text search and supports more complex queries"""
+        Uses text search and supports more complex queries, or the in-process
+        BM25 index when SEARCH_BACKEND is 'bm25'"""
         try:
-            # Build search query
-            search_query = {
-                "$text": {"$search": query}
-            }
+            if SEARCH_BACKEND == "bm25" and self.search_index:
+                return self._search_index_results(query, limit=limit, skip=skip, cursor=cursor)
+                
+            # Sort by relevance, then by date, with _id as a unique tie-breaker
+            pipeline = [
+                {"$match": {"$text": {"$search": query}}},
+                {"$addFields": {"score": {"$meta": "textScore"}}}
+            ]
+            
+            # Continue after the previous page instead of skipping over it
+            if cursor:
+                pipeline.append({"$match": keyset_filter(SEARCH_SORT, cursor)})
+                skip = 0
+                
+            pipeline.append({"$sort": dict(SEARCH_SORT)})
+            if skip:
+                pipeline.append({"$skip": skip})
+            pipeline.append({"$limit": limit})
             
             # Perform search
-            results = list(articles_collection.find(search_query)
-                           .sort([
-                               ("score", {"$meta": "textScore"}),  # Sort by relevance
-                               ("published_at", -1)                # Then by date
-                           ])
-                           .skip(skip)
-                           .limit(limit))
+            results = list(articles_collection.aggregate(pipeline))
                            
-            # Convert ObjectId to string and add type
+            # Type is stored at ingest; documents stored before that fall back to the source
             for item in results:
-                item["_id"] = str(item["_id"])
-                # Add a type field to distinguish between news and academic
-                if item.get("source_name") == "arXiv":
-                    item["type"] = "academic"
-                else:
-                    item["type"] = "news"
+                item.setdefault("type", article_type(item.get("source_name")))
                     
             logger.info(f"Found {len(results)} combined items matching query: {query}")
             return results
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Error searching combined content: {str(e)}")
             return []
 
-    def fetch_targeted_articles(self, keywords, count=30, page=1):
+    def _search_index_results(self, query, limit=20, skip=0, cursor=None):
+        """Rank with the BM25 index and load the matching documents by _id"""
+        after = decode_cursor(cursor) if cursor else None
+        ranked = self.search_index.search(query, limit=limit, skip=skip, after=after)
+        
+        scores = dict(ranked)
+        documents = {
+            doc["_id"]: doc
+            for doc in articles_collection.find({"_id": {"$in": list(scores)}}, {"vector_embedding": 0})
+        }
+        
+        results = []
+        for article_id, score in ranked:
+            item = documents.get(article_id)
+            if not item:
+                continue  # Deleted since it was indexed
+            item["score"] = score
+            # Type is stored at ingest; documents stored before that fall back to the source
+            item.setdefault("type", article_type(item.get("source_name")))
+            results.append(item)
+            
+        logger.info(f"Found {len(results)} combined items matching query via search index: {query}")
+        return results
+
+    def fetch_targeted_articles(self, keywords, count=30, page=1, job="admin"):
         """
         Fetch articles that are targeted to specific keywords for better relevance
         
@@ -291,77 +445,96 @@ class ArticleService:
             keywords (str or list): Keywords to search for, comma-separated or list
             count (int): Number of articles to fetch
             page (int): Page number for pagination
+            job (str): Job type whose share of the NewsAPI quota pays for the request
             
         Returns:
             int: Number of articles stored
         """
         try:
             # Use the "everything" endpoint instead of "top-headlines" for deeper search
-            url = "https://newsapi.org/v2/everything"
-            
-            # Convert keywords list to proper query format
+            articles = self.fetch_news(self.keyword_params(keywords, count, page), job)
+            if articles is None:
+                return 0
+                
+            logger.info(f"Fetched {len(articles)} targeted articles for keywords: {keywords}")
+            return self.store_targeted_articles(articles, keywords)
+        except Exception as e:
+            logger.error(f"Error fetching targeted articles: {str(e)}")
+            return 0
+
+    def store_targeted_articles(self, articles, keywords):
+        """Tag fetched articles with the keywords that found them and store them"""
+        for article in articles:
+            # Add keywords as categories
             if isinstance(keywords, list):
-                query = " OR ".join([f'"{k}"' for k in keywords])
+                article["keywords"] = keywords
             else:
-                query = keywords
+                article["keywords"] = [k.strip() for k in keywords.split(",")]
                 
-            # Add CS/programming specific terms to improve relevance
-            query = f"({query}) AND (programming OR software OR technology OR algorithm OR data OR computer)"
-            
-            # Prepare parameters for deeper search with extended date range
-            # Get articles from last 30 days instead of default 7 for better historical coverage
-            from_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
-            
-            params = {
-                "apiKey": self.news_api_key,
-                "q": query,
-                "pageSize": count,
-                "page": page,
-                "language": "en",
-                "from": from_date,
-                "sortBy": "relevancy"  # Use relevancy instead of date
-            }
+        result = self.store_articles_bulk(articles)
+        stored_count = len(result["inserted"]) + len(result["updated"])
+                
+        logger.info(f"Stored {stored_count} targeted articles for keywords: {keywords}")
+        return stored_count
+
+    def module_keyword_groups(self, module):
+        """
+        Derive the keyword groups used to search for a module's articles
+        
+        Args:
+            module (dict): Module document
             
-            # Make API request
-            response = requests.get(url, params=params)
+        Returns:
+            tuple: (prioritized keywords, list of keyword groups)
+        """
+        # Extract keywords from module title and description
+        title = module.get("name", "")
+        description = module.get("description", "")
+        
+        # Simple keyword extraction (you can use NLP libraries for better extraction)
+        keywords = []
+        
+        # Add title keywords
+        title_words = [w.lower() for w in title.split() if len(w) > 3]
+        keywords.extend(title_words)
+        
+        # Extract keywords from description
+        if description:
+            # Remove common words
+            common_words = {"the", "and", "that", "for", "with", "this", "are", "will", "what", "about"}
+            desc_words = [w.lower() for w in description.split() if len(w) > 3 and w.lower() not in common_words]
+            keywords.extend(desc_words)
+        
+        # Add specific module keywords if available
+        if "keywords" in module and module["keywords"]:
+            # Prioritize module keywords by adding them multiple times
+            for kw in module["keywords"]:
+                keywords.extend([kw.lower()] * 3)  # Add each keyword 3 times for higher weight
+            
+        # Remove duplicates but maintain priority of keywords that appeared multiple times
+        keyword_count = Counter(keywords)
+        
+        # Get keywords ordered by frequency
+        prioritized_keywords = [k for k, _ in keyword_count.most_common(10)]
+        
+        # Create different keyword combinations for better coverage
+        keyword_groups = []
+        
+        # Group 1: Top 5 keywords
+        if len(prioritized_keywords) >= 5:
+            keyword_groups.append(prioritized_keywords[:5])
             
-            # Check for successful response
-            if response.status_code != 200:
-                logger.error(f"NewsAPI error: {response.status_code}, {response.text}")
-                return 0
-                
-            # Parse response
-            data = response.json()
+        # Group 2: Next 5 keywords
+        if len(prioritized_keywords) >= 10:
+            keyword_groups.append(prioritized_keywords[5:10])
             
-            # Check if articles were returned
-            if data.get("status") != "ok" or "articles" not in data:
-                logger.error(f"Invalid response from NewsAPI: {data}")
-                return 0
-                
-            articles = data["articles"]
-            logger.info(f"Fetched {len(articles)} targeted articles for keywords: {keywords}")
+        # Group 3: Mix of keywords with module name
+        if title and len(prioritized_keywords) >= 3:
+            keyword_groups.append([title] + prioritized_keywords[:3])
             
-            # Store each article
-            stored_count = 0
-            for article in articles:
-                # Add keywords as categories
-                if isinstance(keywords, list):
-                    article["keywords"] = keywords
-                else:
-                    article["keywords"] = [k.strip() for k in keywords.split(",")]
-                    
-                # Store article
-                result = self.store_article(article)
-                if result:
-                    stored_count += 1
-                    
-            logger.info(f"Stored {stored_count} targeted articles for keywords: {keywords}")
-            return stored_count
-        except Exception as e:
-            logger.error(f"Error fetching targeted articles: {str(e)}")
-            return 0
+        return prioritized_keywords, keyword_groups
 
-    def fetch_module_specific_articles(self, module_id, count=25):
+    def fetch_module_specific_articles(self, module_id, count=25, job="admin"):
         """
         Fetch articles specifically for a module based on its title and keywords
         with improvements for better relevance
@@ -369,6 +542,7 @@ class ArticleService:
         Args:
             module_id (str or ObjectId): ID of the module
             count (int): Number of articles to fetch
+            job (str): Job type whose share of the NewsAPI quota pays for the requests
             
         Returns:
             int: Number of articles stored
@@ -382,75 +556,142 @@ class ArticleService:
                 logger.error(f"Module not found: {module_id}")
                 return 0
                 
-            # Extract keywords from module title and description
-            title = module.get("name", "")
-            description = module.get("description", "")
-            
-            # Simple keyword extraction (you can use NLP libraries for better extraction)
-            keywords = []
-            
-            # Add title keywords
-            title_words = [w.lower() for w in title.split() if len(w) > 3]
-            keywords.extend(title_words)
-            
-            # Extract keywords from description
-            if description:
-                # Remove common words
-                common_words = {"the", "and", "that", "for", "with", "this", "are", "will", "what", "about"}
-                desc_words = [w.lower() for w in description.split() if len(w) > 3 and w.lower() not in common_words]
-                keywords.extend(desc_words)
-            
-            # Add specific module keywords if available
-            if "keywords" in module and module["keywords"]:
-                # Prioritize module keywords by adding them multiple times
-                for kw in module["keywords"]:
-                    keywords.extend([kw.lower()] * 3)  # Add each keyword 3 times for higher weight
-                
-            # Remove duplicates but maintain priority of keywords that appeared multiple times
-            from collections import Counter
-            keyword_count = Counter(keywords)
-            
-            # Get keywords ordered by frequency
-            prioritized_keywords = [k for k, _ in keyword_count.most_common(10)]
-            
-            # Create different keyword combinations for better coverage
-            keyword_groups = []
-            
-            # Group 1: Top 5 keywords
-            if len(prioritized_keywords) >= 5:
-                keyword_groups.append(prioritized_keywords[:5])
-                
-            # Group 2: Next 5 keywords
-            if len(prioritized_keywords) >= 10:
-                keyword_groups.append(prioritized_keywords[5:10])
-                
-            # Group 3: Mix of keywords with module name
-            if title and len(prioritized_keywords) >= 3:
-                keyword_groups.append([title] + prioritized_keywords[:3])
+            planner = self.plan_keyword_searches(modules=[module], module_count=count)
+            self.fetch_planned_articles(planner, job=job)
+            return planner.counts[module["_id"]]
+        except Exception as e:
+            logger.error(f"Error fetching module-specific articles: {str(e)}")
+            return 0
+
+    def module_news_terms(self, module):
+        """Every term the module's keyword groups search for, most important first"""
+        prioritized_keywords, keyword_groups = self.module_keyword_groups(module)
+        terms = [term for group in keyword_groups for term in group] + prioritized_keywords[:7]
+        return list(dict.fromkeys(terms))
+
+    def plan_keyword_searches(self, modules=(), keywords=(), module_count=25, keyword_count=30):
+        """
+        Collect the keyword searches of a fetch cycle into one plan
+        
+        Terms shared by several modules or keywords (e.g. "security") are
+        only searched once.
+        
+        Args:
+            modules (list): Module documents, each wanting module_count articles
+            keywords (list): General keywords, each wanting keyword_count articles
+            module_count (int): Articles to route to each module
+            keyword_count (int): Articles to route to each keyword
             
-            # Fetch articles based on these keyword groups
-            total_articles = 0
+        Returns:
+            QueryPlanner: Plan keyed by module _id and keyword
+        """
+        planner = QueryPlanner()
+        for module in modules:
+            planner.add(module["_id"], self.module_news_terms(module), module_count, group="modules")
+        for keyword in keywords:
+            planner.add(keyword, [keyword], keyword_count, group="keywords")
+        return planner
+
+    def planned_job(self, planner, terms):
+        """Job type a packed query is charged to: modules if it still serves any, else keywords"""
+        return "modules" if "modules" in planner.open_groups(terms) else "keywords"
+
+    def order_modules_by_need(self, modules, days=MODULE_NEED_FRESH_DAYS):
+        """
+        Sort modules so those with the fewest fresh relevant articles come first
+        
+        Planned searches pack terms in module order, so the neediest modules'
+        terms go out in the first queries, before the quota can run out.
+        
+        Args:
+            modules (list): Module documents
+            days (int): How recent a relevance score must be to count as fresh
             
-            # Calculate articles per group based on total count
-            articles_per_group = count // (len(keyword_groups) or 1)
+        Returns:
+            list: The modules, neediest first
+        """
+        try:
+            from utils.db_utils import relevance_collection
+            since = datetime.now() - timedelta(days=days)
+            fresh = {
+                doc["_id"]: doc["count"]
+                for doc in relevance_collection.aggregate([
+                    {"$match": {
+                        "module_id": {"$in": [module["_id"] for module in modules]},
+                        "relevance_score": {"$gte": RELEVANCE_THRESHOLD},
+                        "created_at": {"$gte": since}
+                    }},
+                    {"$group": {"_id": "$module_id", "count": {"$sum": 1}}}
+                ])
+            }
+            ordered = sorted(modules, key=lambda module: fresh.get(module["_id"], 0))
+            logger.info("Module fetch order by fresh relevant articles: " + ", ".join(
+                f"{module.get('name', module['_id'])} ({fresh.get(module['_id'], 0)})" for module in ordered
+            ))
+            return ordered
+        except Exception as e:
+            logger.error(f"Error ordering modules by need: {str(e)}")
+            return list(modules)
+
+    def planned_batches(self, planner):
+        """Pack a plan's terms into the fewest NewsAPI queries that fit its q length limit"""
+        return planner.batches(render=self.keyword_query, max_length=NEWSAPI_QUERY_MAX_LENGTH)
+
+    def fetch_planned_articles(self, planner, job=None, on_batch=None):
+        """
+        Run a keyword search plan with one NewsAPI request per packed query
+        
+        Args:
+            planner (QueryPlanner): Plan from plan_keyword_searches; its counts
+                record the articles routed to each module and keyword
+            job (str): Job type charged for every query (default: planned_job per query)
+            on_batch (callable): Called with the terms of each query once its articles are stored
             
-            for group in keyword_groups:
-                # Fetch articles based on this keyword group
-                article_count = self.fetch_targeted_articles(
-                    keywords=group, 
-                    count=articles_per_group
-                )
-                total_articles += article_count
-                
-            # If we didn't fetch enough articles, try with the full list as a backup
-            if total_articles < count // 2 and prioritized_keywords:
-                article_count = self.fetch_targeted_articles(
-                    keywords=prioritized_keywords[:7],  # Use top 7 keywords
-                    count=count - total_articles
+        Returns:
+            int: Number of articles stored
+        """
+        stored_count = 0
+        batches = self.planned_batches(planner)
+        logger.info(f"Planned {len(batches)} NewsAPI queries for {len(planner.term_topics)} distinct terms "
+                    f"from {len(planner.quotas)} modules and keywords")
+        for batch in batches:
+            try:
+                wanted = planner.wanted(batch)
+                if not wanted:
+                    continue
+                    
+                articles = self.fetch_news(
+                    self.keyword_params(batch, min(NEWSAPI_MAX_PAGE_SIZE, wanted)),
+                    job or self.planned_job(planner, batch)
                 )
-                total_articles += article_count
-                
-            return total_articles
-        except Exception as e:
-            logger.error(f"Error fetching module-specific articles: {str(e)}")
-            return 0
\ No newline at end of file
+                if articles is None:
+                    continue
+                    
+                if articles:
+                    result = self.store_articles_bulk(self.tag_planned_articles(planner, articles, batch))
+                    stored_count += len(result["inserted"]) + len(result["updated"])
+                if on_batch:
+                    on_batch(batch)
+            except Exception as e:
+                logger.error(f"Error fetching planned articles for {batch}: {str(e)}")
+        return stored_count
+
+    def tag_planned_articles(self, planner, articles, terms):
+        """Route a packed query's articles to the plan's topics and tag them with the terms they match
+        
+        Articles that match none of the terms in their visible text are still
+        stored (NewsAPI also searches the full article body), tagged with every
+        term of the query as before.
+        """
+        routed = planner.route(
+            articles, terms,
+            lambda article: f"{article.get('title') or ''} {article.get('description') or ''} {article.get('content') or ''}"
+        )
+        for article, matched_terms in routed:
+            article["keywords"] = matched_terms
+        matched = {id(article) for article, _ in routed}
+        for article in articles:
+            if id(article) not in matched:
+                article["keywords"] = list(terms)
+        logger.info(f"Routed {len(routed)} of {len(articles)} articles for a {len(terms)}-term query")
+        return articles
@@ -0,0 +1,267 @@
+# Concurrent NewsAPI and arXiv ingestion over asyncio/aiohttp
+import json
+import time
+import asyncio
+import logging
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from utils.http_client import RETRY_STATUSES, get_http_client, retry_after_seconds, retry_delay
+from utils.rate_limit import get_rate_limiter
+from utils.response_cache import get_response_cache
+from utils.quota_budget import get_quota_budget
+from config import (
+    ARTICLE_CATEGORIES, ARXIV_CS_CATEGORIES, GENERAL_CS_KEYWORDS,
+    ASYNC_INGEST_LIMITS, ASYNC_INGEST_TIMEOUT_SECONDS, ASYNC_INGEST_STORE_WORKERS, HTTP_MAX_RETRIES, RATE_LIMITS,
+    NEWSAPI_MAX_PAGE_SIZE
+)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class HostLimiter:
+    """Bound concurrent requests to one upstream API and apply its shared rate limiter"""
+
+    def __init__(self, concurrency, rate_limiter=None):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate_limiter = rate_limiter
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.rate_limiter is not None:
+            # Queues on the same clock as the synchronous callers, without blocking the loop
+            await self.rate_limiter.acquire_async()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.semaphore.release()
+
+
+class AsyncIngestService:
+    def __init__(self, article_service, arxiv_service=None, limits=None):
+        """Initialize the async ingest service
+
+        Args:
+            article_service (ArticleService): Builds NewsAPI requests and stores articles
+            arxiv_service (ArxivService): Builds arXiv requests and stores papers
+            limits (dict): Per-API {"concurrency"}, keyed "newsapi" and "arxiv"
+        """
+        self.article_service = article_service
+        self.arxiv_service = arxiv_service
+        self.limits = limits or ASYNC_INGEST_LIMITS
+        logger.info("Initialized async ingest service")
+
+    @staticmethod
+    def is_available():
+        """Whether aiohttp is installed"""
+        return aiohttp is not None
+
+    def refresh(self, categories=True, modules=True, keywords=True, modules_list=None, arxiv_categories=True,
+                modules_ordered=False, done_terms=(), on_batch=None):
+        """Fetch and store content from every configured source concurrently
+
+        Requests run in parallel within each API's concurrency and rate limits,
+        and each response is stored as soon as it arrives, so a refresh takes
+        about as long as its slowest chain of calls rather than the sum of all.
+
+        Args:
+            categories (bool): NewsAPI categories and arXiv CS categories
+            modules (bool): NewsAPI keyword searches derived from each module
+            keywords (bool): NewsAPI searches for the general CS keywords
+            modules_list (list): Module documents to use instead of reading them all
+            arxiv_categories (bool): Include the arXiv category listings with the categories
+            modules_ordered (bool): modules_list is already ordered by order_modules_by_need
+            done_terms (list): Module and keyword terms an interrupted run already searched
+            on_batch (callable): Called with the terms of each keyword query once its articles are stored
+
+        Returns:
+            dict: {"articles": stored news articles, "papers": stored arXiv papers,
+                "topics": articles routed to each module id and keyword}
+        """
+        try:
+            if modules and modules_list is None:
+                from utils.db_utils import modules_collection
+                modules_list = list(modules_collection.find({}, {"name": 1, "description": 1, "keywords": 1}))
+            started = time.monotonic()
+            if modules and modules_list and not modules_ordered:
+                # Neediest modules first, so their terms go out before the quota can run out
+                modules_list = self.article_service.order_modules_by_need(modules_list)
+            self.done_terms = done_terms
+            self.on_batch = on_batch
+            counts = asyncio.run(self._refresh(categories, modules, keywords, modules_list or [], arxiv_categories))
+            logger.info(f"Async refresh stored {counts['articles']} articles and {counts['papers']} papers "
+                        f"in {time.monotonic() - started:.1f}s")
+            return counts
+        except Exception as e:
+            logger.error(f"Error in async refresh: {str(e)}")
+            return {"articles": 0, "papers": 0, "topics": {}}
+
+    async def _refresh(self, categories, modules, keywords, modules_list, arxiv_categories=True):
+        """Run all fetch jobs on one session and sum what they stored"""
+        self.counts = {"articles": 0, "papers": 0, "topics": {}}
+        # Checkpoint saves go one at a time, so an older one never lands after a newer one
+        self.checkpoint_lock = asyncio.Lock()
+        self.hosts = {
+            name: HostLimiter(limit["concurrency"], get_rate_limiter(name) if name in RATE_LIMITS else None)
+            for name, limit in self.limits.items()
+        }
+        timeout = aiohttp.ClientTimeout(total=ASYNC_INGEST_TIMEOUT_SECONDS)
+        connector = aiohttp.TCPConnector(limit=sum(limit["concurrency"] for limit in self.limits.values()))
+
+        # Stores go through pymongo, which blocks, so they run on a small thread pool
+        with ThreadPoolExecutor(max_workers=ASYNC_INGEST_STORE_WORKERS) as store_pool:
+            self.store_pool = store_pool
+            async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+                jobs = []
+                if categories:
+                    jobs.extend(self._news_category(session, category) for category in ARTICLE_CATEGORIES)
+                    if self.arxiv_service and arxiv_categories:
+                        jobs.extend(self._arxiv_category(session, category) for category in ARXIV_CS_CATEGORIES)
+                if modules or keywords:
+                    # Module and keyword searches share one plan, so overlapping terms are searched once
+                    planner = self.article_service.plan_keyword_searches(
+                        modules=modules_list if modules else (),
+                        keywords=GENERAL_CS_KEYWORDS if keywords else ()
+                    )
+                    planner.exclude(self.done_terms)
+                    self.counts["topics"] = planner.counts
+                    batches = self.article_service.planned_batches(planner)
+                    logger.info(f"Planned {len(batches)} NewsAPI queries for {len(planner.term_topics)} distinct terms")
+                    jobs.extend(self._news_batch(session, planner, batch) for batch in batches)
+                await asyncio.gather(*jobs)
+        return self.counts
+
+    async def _get(self, session, source, url, params):
+        """GET a URL within the source's limits, retrying throttled and failed requests
+
+        Backoff, Retry-After handling and the per-host circuit breaker are
+        shared with the synchronous HTTP client.
+
+        Returns:
+            tuple: (status, body bytes), or (None, None) if every attempt failed
+        """
+        breaker = get_http_client().breaker(urlsplit(url).netloc)
+        status = None
+        for attempt in range(HTTP_MAX_RETRIES):
+            if not breaker.allow():
+                logger.warning(f"Circuit open for {source}; skipping request")
+                return None, None
+            retry_after = None
+            try:
+                async with self.hosts[source]:
+                    async with session.get(url, params=params) as response:
+                        status = response.status
+                        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                        body = await response.read()
+                if status not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return status, body
+                breaker.record_failure()
+                logger.warning(f"{source} attempt {attempt + 1}/{HTTP_MAX_RETRIES} failed: {status}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                breaker.record_failure()
+                logger.warning(f"{source} network error attempt {attempt + 1}/{HTTP_MAX_RETRIES}: {str(e)}")
+            if attempt < HTTP_MAX_RETRIES - 1:
+                await asyncio.sleep(retry_delay(attempt, retry_after))
+        return status, None
+
+    async def _store(self, kind, store, *args):
+        """Hand fetched items to a blocking store function without stalling other fetches"""
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(self.store_pool, store, *args)
+        self.counts[kind] += stored
+        return stored
+
+    async def _cached(self, source, params, load):
+        """Answer a request from the shared response cache, or await load and cache its result"""
+        cache = get_response_cache()
+        if cache is None:
+            return await load()
+        return await cache.fetch_async(source, params, load)
+
+    async def _fetch_news(self, session, params, job):
+        """Fetch one NewsAPI page, charged to job's quota share, and return its articles (None on failure)"""
+        async def load():
+            # The quota lives in MongoDB, so check it off the event loop
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(self.store_pool, get_quota_budget("newsapi").try_spend, job):
+                return None
+            status, body = await self._get(session, "newsapi", self.article_service.everything_url, params)
+            if body is None:
+                return None
+            try:
+                data = json.loads(body) if status == 200 else None
+            except ValueError:
+                data = None
+            return self.article_service.parse_news_response(status, data, body[:200])
+
+        return await self._cached("newsapi", params, load)
+
+    def _store_news(self, articles, category=None):
+        """Store a page of category articles, returning how many were stored"""
+        result = self.article_service.store_articles_bulk(articles, category)
+        return len(result["inserted"]) + len(result["updated"])
+
+    async def _news_category(self, session, category, count=20):
+        """Fetch and store one NewsAPI category page"""
+        try:
+            articles = await self._fetch_news(session, self.article_service.category_params(category, count), "categories") or []
+            logger.info(f"Fetched {len(articles)} articles from NewsAPI for category: {category}")
+            return await self._store("articles", self._store_news, articles, category)
+        except Exception as e:
+            logger.error(f"Error fetching articles for category {category}: {str(e)}")
+            return 0
+
+    async def _news_batch(self, session, planner, terms):
+        """Fetch one packed keyword query of a plan, route its articles and store them"""
+        try:
+            wanted = planner.wanted(terms)
+            if not wanted:
+                return 0
+            params = self.article_service.keyword_params(terms, min(NEWSAPI_MAX_PAGE_SIZE, wanted))
+            articles = await self._fetch_news(session, params, self.article_service.planned_job(planner, terms))
+            if articles is None:
+                return 0
+            # Routing runs on the event loop, so the plan's counts are only touched from one thread
+            articles = self.article_service.tag_planned_articles(planner, articles, terms)
+            stored = await self._store("articles", self._store_news, articles)
+            if self.on_batch:
+                async with self.checkpoint_lock:
+                    await asyncio.get_running_loop().run_in_executor(self.store_pool, self.on_batch, terms)
+            return stored
+        except Exception as e:
+            logger.error(f"Error fetching planned articles for {terms}: {str(e)}")
+            return 0
+
+    async def _arxiv_category(self, session, category, max_results=15, years_limit=5):
+        """Fetch, parse and store one arXiv category listing"""
+        try:
+            params = self.arxiv_service.build_params(category, max_results)
+
+            async def load():
+                status, body = await self._get(session, "arxiv", self.arxiv_service.base_url, params)
+                if status != 200 or body is None:
+                    logger.error(f"arXiv request for {category} failed: {status}")
+                    return None
+                loop = asyncio.get_running_loop()
+                # Parsing a large Atom feed is CPU work, so keep it off the event loop too
+                return await loop.run_in_executor(self.store_pool, self.arxiv_service.parse_papers, body, category, years_limit)
+
+            # Same cache key as ArxivService.fetch_papers, so sync and async fetches share entries
+            papers = await self._cached("arxiv", dict(params, years_limit=years_limit), load)
+            if papers is None:
+                return 0
+            return await self._store("papers", self._store_papers, papers)
+        except Exception as e:
+            logger.error(f"Error fetching arXiv papers for {category}: {str(e)}")
+            return 0
+
+    def _store_papers(self, papers):
+        """Store parsed papers, returning how many were stored"""
+        result = self.arxiv_service.store_papers_bulk(papers)
+        return len(result["inserted"]) + len(result["updated"])
@@ -0,0 +1,310 @@
+# Item-item co-occurrence recommender ("readers of this also read")
+import logging
+import numpy as np
+import scipy.sparse as sp
+from array import array
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne
+from utils.db_utils import articles_collection, interactions_collection, article_neighbours_collection, service_state_collection
+from utils.facet_utils import article_type
+from config import (
+    INTERACTION_WEIGHTS, COOCCURRENCE_TOP_K, COOCCURRENCE_CHUNK_SIZE,
+    COOCCURRENCE_READ_BATCH_SIZE, COOCCURRENCE_MAX_INCREMENTAL_ARTICLES
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATE_ID = "cooccurrence"
+
+
+class CooccurrenceService:
+    def __init__(self, top_k=COOCCURRENCE_TOP_K, chunk_size=COOCCURRENCE_CHUNK_SIZE):
+        """Initialize the co-occurrence recommender"""
+        self.top_k = top_k
+        self.chunk_size = chunk_size
+        logger.info("Initialized co-occurrence service")
+
+    def _load_matrix(self, query):
+        """Stream interactions matching the query into a sparse user x article matrix
+
+        Repeated interactions by the same user with the same article are summed
+        and damped with log1p so a single heavy reader cannot dominate.
+
+        Returns:
+            tuple: (csr_matrix, list of article ObjectIds, max interaction _id)
+        """
+        user_index = {}
+        article_index = {}
+        rows = array("i")
+        cols = array("i")
+        vals = array("f")
+        max_id = None
+
+        cursor = interactions_collection.find(
+            query, {"user_id": 1, "article_id": 1, "type": 1}
+        ).batch_size(COOCCURRENCE_READ_BATCH_SIZE)
+
+        for interaction in cursor:
+            user_id = interaction.get("user_id")
+            article_id = interaction.get("article_id")
+            if user_id is None or article_id is None:
+                continue
+
+            rows.append(user_index.setdefault(user_id, len(user_index)))
+            cols.append(article_index.setdefault(article_id, len(article_index)))
+            vals.append(INTERACTION_WEIGHTS.get(interaction.get("type"), 1.0))
+
+            if max_id is None or interaction["_id"] > max_id:
+                max_id = interaction["_id"]
+
+        shape = (len(user_index), len(article_index))
+        matrix = sp.coo_matrix(
+            (np.frombuffer(vals, dtype=np.float32),
+             (np.frombuffer(rows, dtype=np.int32), np.frombuffer(cols, dtype=np.int32))),
+            shape=shape
+        ).tocsr()  # Converting to CSR sums duplicate (user, article) entries
+        matrix.data = np.log1p(matrix.data)
+
+        article_ids = [None] * len(article_index)
+        for article_id, idx in article_index.items():
+            article_ids[idx] = article_id
+
+        return matrix, article_ids, max_id
+
+    def _top_k(self, scores, indices, exclude=None):
+        """Return (index, score) pairs for the k highest scores, best first"""
+        if exclude is not None:
+            keep = indices != exclude
+            scores, indices = scores[keep], indices[keep]
+        if len(scores) > self.top_k:
+            part = np.argpartition(-scores, self.top_k)[:self.top_k]
+            scores, indices = scores[part], indices[part]
+        order = np.argsort(-scores)
+        return [(int(indices[i]), float(scores[i])) for i in order]
+
+    def _neighbour_doc(self, article_id, neighbours, now):
+        """Build the stored neighbour document for one article"""
+        return {
+            "article_id": article_id,
+            "neighbours": [{"article_id": n_id, "score": score} for n_id, score in neighbours],
+            "updated_at": now
+        }
+
+    def build_neighbours(self):
+        """Rebuild the neighbour lists for every article from the full interaction history
+
+        The item-item cosine matrix is computed block by block (X^T X restricted to
+        ``chunk_size`` articles at a time) so peak memory is bounded by the block
+        size rather than the square of the catalogue.
+
+        Returns:
+            int: Number of articles with stored neighbours
+        """
+        try:
+            started = datetime.now()
+            matrix, article_ids, max_id = self._load_matrix({})
+            if not article_ids:
+                logger.info("No interactions available for co-occurrence build")
+                return 0
+
+            # Normalize columns so the product yields cosine similarities
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+            norms[norms == 0] = 1.0
+            normalized = matrix @ sp.diags(1.0 / norms)
+            normalized = normalized.tocsc()
+            transposed = normalized.T.tocsr()
+
+            now = datetime.now()
+            stored = 0
+            for start in range(0, len(article_ids), self.chunk_size):
+                end = min(start + self.chunk_size, len(article_ids))
+                block = (transposed[start:end] @ normalized).tocsr()
+
+                operations = []
+                for row in range(block.shape[0]):
+                    lo, hi = block.indptr[row], block.indptr[row + 1]
+                    neighbours = self._top_k(block.data[lo:hi], block.indices[lo:hi], exclude=start + row)
+                    if not neighbours:
+                        continue
+                    article_id = article_ids[start + row]
+                    neighbours = [(article_ids[idx], score) for idx, score in neighbours]
+                    operations.append(ReplaceOne(
+                        {"article_id": article_id},
+                        self._neighbour_doc(article_id, neighbours, now),
+                        upsert=True
+                    ))
+
+                if operations:
+                    article_neighbours_collection.bulk_write(operations, ordered=False)
+                    stored += len(operations)
+
+            # Drop neighbour lists for articles that no longer co-occur with anything
+            article_neighbours_collection.delete_many({"updated_at": {"$lt": now}})
+
+            service_state_collection.update_one(
+                {"_id": STATE_ID},
+                {"$set": {"last_interaction_id": max_id, "last_full_build_at": now}},
+                upsert=True
+            )
+
+            elapsed = (datetime.now() - started).total_seconds()
+            logger.info(f"Built co-occurrence neighbours for {stored} articles from {matrix.nnz} user-article pairs in {elapsed:.1f}s")
+            return stored
+        except Exception as e:
+            logger.error(f"Error building co-occurrence neighbours: {str(e)}")
+            return 0
+
+    def _article_norms(self, article_ids):
+        """Compute the full-history column norm for each of the given articles"""
+        weight_branches = [
+            {"case": {"$eq": ["$type", interaction_type]}, "then": weight}
+            for interaction_type, weight in INTERACTION_WEIGHTS.items()
+        ]
+        pipeline = [
+            {"$match": {"article_id": {"$in": list(article_ids)}}},
+            {"$group": {
+                "_id": {"user_id": "$user_id", "article_id": "$article_id"},
+                "weight": {"$sum": {"$switch": {"branches": weight_branches, "default": 1.0}}}
+            }},
+            {"$group": {
+                "_id": "$_id.article_id",
+                "norm_sq": {"$sum": {"$pow": [{"$ln": {"$add": [1, "$weight"]}}, 2]}}
+            }}
+        ]
+        norms = {}
+        for doc in interactions_collection.aggregate(pipeline, allowDiskUse=True):
+            norms[doc["_id"]] = float(np.sqrt(doc["norm_sq"])) or 1.0
+        return norms
+
+    def update_incremental(self):
+        """Refresh neighbour lists for articles that received interactions since the last run
+
+        Only the affected articles' rows are recomputed, using the histories of the
+        users who read them. The symmetric entries are merged into the neighbours'
+        own lists; the periodic full rebuild reconciles anything else that drifted.
+
+        Returns:
+            int: Number of articles whose neighbour lists were updated
+        """
+        try:
+            state = service_state_collection.find_one({"_id": STATE_ID})
+            if not state or not state.get("last_interaction_id"):
+                return self.build_neighbours()
+
+            watermark = state["last_interaction_id"]
+            new_interactions = interactions_collection.find(
+                {"_id": {"$gt": watermark}}, {"article_id": 1}
+            ).batch_size(COOCCURRENCE_READ_BATCH_SIZE)
+
+            affected = set()
+            max_id = watermark
+            for interaction in new_interactions:
+                if interaction.get("article_id") is not None:
+                    affected.add(interaction["article_id"])
+                max_id = max(max_id, interaction["_id"])
+
+            if not affected:
+                return 0
+
+            if len(affected) > COOCCURRENCE_MAX_INCREMENTAL_ARTICLES:
+                logger.info(f"{len(affected)} articles changed, running full co-occurrence rebuild")
+                return self.build_neighbours()
+
+            # Load the full histories of everyone who read an affected article
+            readers = interactions_collection.distinct("user_id", {"article_id": {"$in": list(affected)}})
+            matrix, article_ids, _ = self._load_matrix({"user_id": {"$in": readers}})
+            if not article_ids:
+                return 0
+
+            column_of = {article_id: idx for idx, article_id in enumerate(article_ids)}
+            affected_cols = [column_of[a] for a in affected if a in column_of]
+
+            norms = self._article_norms(article_ids)
+            norm_vector = np.array([norms.get(a, 1.0) for a in article_ids])
+
+            matrix = matrix.tocsc()
+            transposed = matrix[:, affected_cols].T.tocsr()
+            products = (transposed @ matrix).tocsr()
+
+            now = datetime.now()
+            operations = []
+            reverse_entries = {}
+            for row, col in enumerate(affected_cols):
+                lo, hi = products.indptr[row], products.indptr[row + 1]
+                indices = products.indices[lo:hi]
+                scores = products.data[lo:hi] / (norm_vector[col] * norm_vector[indices])
+                neighbours = self._top_k(scores, indices, exclude=col)
+
+                article_id = article_ids[col]
+                neighbours = [(article_ids[idx], score) for idx, score in neighbours]
+                operations.append(ReplaceOne(
+                    {"article_id": article_id},
+                    self._neighbour_doc(article_id, neighbours, now),
+                    upsert=True
+                ))
+                for neighbour_id, score in neighbours:
+                    if neighbour_id not in affected:
+                        reverse_entries.setdefault(neighbour_id, []).append((article_id, score))
+
+            # Merge the symmetric scores into the neighbours' existing lists
+            existing = article_neighbours_collection.find({"article_id": {"$in": list(reverse_entries)}})
+            existing = {doc["article_id"]: doc for doc in existing}
+            for neighbour_id, entries in reverse_entries.items():
+                merged = {}
+                if neighbour_id in existing:
+                    merged = {n["article_id"]: n["score"] for n in existing[neighbour_id]["neighbours"]}
+                merged.update(dict(entries))
+                ranked = sorted(merged.items(), key=lambda item: item[1], reverse=True)[:self.top_k]
+                operations.append(ReplaceOne(
+                    {"article_id": neighbour_id},
+                    self._neighbour_doc(neighbour_id, ranked, now),
+                    upsert=True
+                ))
+
+            if operations:
+                article_neighbours_collection.bulk_write(operations, ordered=False)
+
+            service_state_collection.update_one(
+                {"_id": STATE_ID},
+                {"$set": {"last_interaction_id": max_id, "last_incremental_at": now}},
+                upsert=True
+            )
+
+            logger.info(f"Incrementally updated co-occurrence neighbours for {len(operations)} articles")
+            return len(operations)
+        except Exception as e:
+            logger.error(f"Error updating co-occurrence neighbours: {str(e)}")
+            return 0
+
+    def get_also_read(self, article_id, limit=10):
+        """Get articles most often read by readers of the given article"""
+        try:
+            if isinstance(article_id, str):
+                article_id = ObjectId(article_id)
+
+            doc = article_neighbours_collection.find_one({"article_id": article_id})
+            if not doc:
+                return []
+
+            neighbours = doc.get("neighbours", [])[:limit]
+            scores = {n["article_id"]: n["score"] for n in neighbours}
+            articles = articles_collection.find(
+                {"_id": {"$in": list(scores)}}, {"vector_embedding": 0}
+            )
+
+            results = []
+            for article in articles:
+                article["also_read_score"] = scores[article["_id"]]
+                # Type is stored at ingest; documents stored before that fall back to the source
+                article.setdefault("type", article_type(article.get("source_name")))
+                results.append(article)
+
+            results.sort(key=lambda x: x["also_read_score"], reverse=True)
+            logger.info(f"Found {len(results)} also-read articles for article: {article_id}")
+            return results
+        except Exception as e:
+            logger.error(f"Error getting also-read articles: {str(e)}")
+            return []
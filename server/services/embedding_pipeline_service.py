@@ -0,0 +1,198 @@
+# Event-driven embedding: stored articles are embedded and scored within seconds
+import time
+import queue
+import logging
+import threading
+from pymongo.errors import OperationFailure
+from utils.db_utils import db, articles_collection, service_state_collection
+from utils.ingest_hooks import register_ingest_listener
+from config import (
+    EMBEDDING_PIPELINE_SOURCE, EMBEDDING_PIPELINE_BATCH_SIZE, EMBEDDING_PIPELINE_MAX_WAIT_SECONDS
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STREAM_STATE_ID = "changestream:articles"  # service_state _id of the change stream's resume token
+HISTORY_LOST_CODES = {280, 286}  # The resume token fell off the oplog
+RESUME_TOKEN_SAVE_SECONDS = 5
+
+
+def change_streams_available():
+    """Whether the MongoDB deployment supports change streams (a replica set or sharded cluster)"""
+    try:
+        hello = db.client.admin.command("hello")
+        return bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+    except Exception:
+        return False
+
+
+class EmbeddingPipelineService:
+    def __init__(self, embedding_service, vector_index, source=EMBEDDING_PIPELINE_SOURCE,
+                 batch_size=EMBEDDING_PIPELINE_BATCH_SIZE, max_wait=EMBEDDING_PIPELINE_MAX_WAIT_SECONDS):
+        """Initialize the embedding pipeline
+
+        Stored articles become events on a queue: either straight from this
+        process's store operations (the ingest hooks) or, on a replica set,
+        from a change stream on the articles collection that also sees other
+        writers. A worker drains the queue in micro-batches, embeds every
+        article of a batch in one model call, patches the vectors into the
+        in-memory index and scores them against the module matrix, so new
+        content reaches module pages seconds after it is stored.
+
+        Args:
+            embedding_service (EmbeddingService): Embeds articles and stores relevance
+            vector_index (VectorIndexService): Holds the module matrix and takes the new vectors
+            source (str): 'memory', 'change_stream' or 'auto'; change streams are only
+                consumed while this process holds the lease set on the service
+            batch_size (int): Most articles per micro-batch
+            max_wait (float): Seconds to wait for a micro-batch to fill after its first event
+        """
+        self.embedding_service = embedding_service
+        self.vector_index = vector_index
+        self.source = source
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.pending = set()  # Article ids queued and not yet taken by the worker
+        self.lock = threading.Lock()
+        self.started = False
+        self.lease = None  # With change streams, only the holder of this lease consumes, so events are handled once
+        self.stats_counts = {"events": 0, "batches": 0, "embedded": 0, "scores": 0}
+        self.last_batch = None
+        logger.info("Initialized embedding pipeline service")
+
+    def start(self):
+        """Start consuming article events (idempotent)"""
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        if self.source == "change_stream" or (self.source == "auto" and change_streams_available()):
+            self.source = "change_stream"
+            threading.Thread(target=self._watch, name="embedding-stream", daemon=True).start()
+        else:
+            self.source = "memory"
+            register_ingest_listener(self.enqueue)
+        threading.Thread(target=self._work, name="embedding-worker", daemon=True).start()
+        logger.info(f"Started embedding pipeline with {self.source} events")
+
+    def enqueue(self, documents):
+        """Queue stored article documents (each with its _id) for embedding; an ingest listener"""
+        now = time.monotonic()
+        with self.lock:
+            for document in documents:
+                article_id = document.get("_id")
+                if article_id is None or article_id in self.pending:
+                    continue
+                # Re-stored articles that keep their embedding are skipped when the batch is read
+                self.pending.add(article_id)
+                self.queue.put((article_id, now))
+                self.stats_counts["events"] += 1
+
+    def _work(self):
+        """Drain the queue in micro-batches forever"""
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            with self.lock:
+                for article_id, _ in batch:
+                    self.pending.discard(article_id)
+            self.process(batch)
+
+    def process(self, batch):
+        """
+        Embed and score one micro-batch
+
+        Args:
+            batch (list): (article id, monotonic time it was queued) pairs
+
+        Returns:
+            int: Number of articles embedded
+        """
+        try:
+            started = time.monotonic()
+            ids, vectors = self.embedding_service.embed_articles([article_id for article_id, _ in batch])
+            scores = 0
+            if ids:
+                self.vector_index.add_articles(ids, vectors)
+                module_ids, module_matrix = self.vector_index.get_all_module_vectors()
+                scores = self.embedding_service.score_articles(ids, vectors, module_ids, module_matrix)
+
+            finished = time.monotonic()
+            with self.lock:
+                self.stats_counts["batches"] += 1
+                self.stats_counts["embedded"] += len(ids)
+                self.stats_counts["scores"] += scores
+                self.last_batch = {
+                    "events": len(batch),
+                    "embedded": len(ids),
+                    "scores": scores,
+                    "processing_seconds": round(finished - started, 3),
+                    # From the oldest event of the batch being queued to its scores being stored
+                    "max_latency_seconds": round(finished - min(queued for _, queued in batch), 3)
+                }
+            return len(ids)
+        except Exception as e:
+            logger.error(f"Error processing embedding batch: {str(e)}")
+            return 0
+
+    def _watch(self):
+        """Queue articles inserted, or updated without an embedding, as the change stream reports them"""
+        pipeline = [{"$match": {"$or": [
+            {"operationType": "insert"},
+            {"operationType": {"$in": ["update", "replace"]}, "fullDocument.vector_embedding": None}
+        ]}}]
+        while True:
+            if self.lease is None or not self.lease.held():
+                time.sleep(1)
+                continue
+            try:
+                state = service_state_collection.find_one({"_id": STREAM_STATE_ID}) or {}
+                last_saved = time.monotonic()
+                with articles_collection.watch(
+                    pipeline, full_document="updateLookup", max_await_time_ms=1000,
+                    resume_after=state.get("resume_token")
+                ) as stream:
+                    logger.info("Watching the articles collection for new content")
+                    while stream.alive and self.lease.held():
+                        change = stream.try_next()
+                        if change is not None:
+                            self.enqueue([change["documentKey"]])
+                        # Let a restart (or the next leader) resume close to where this one stopped
+                        if time.monotonic() - last_saved >= RESUME_TOKEN_SAVE_SECONDS and stream.resume_token:
+                            service_state_collection.update_one(
+                                {"_id": STREAM_STATE_ID}, {"$set": {"resume_token": stream.resume_token}}, upsert=True
+                            )
+                            last_saved = time.monotonic()
+            except OperationFailure as e:
+                logger.error(f"Error watching articles for the embedding pipeline: {str(e)}")
+                if e.code in HISTORY_LOST_CODES:
+                    # Start over from now; the periodic embedding sweep picks up what was missed
+                    service_state_collection.delete_one({"_id": STREAM_STATE_ID})
+                time.sleep(5)
+            except Exception as e:
+                logger.error(f"Error watching articles for the embedding pipeline: {str(e)}")
+                time.sleep(5)
+
+    def stats(self):
+        """Event source, queue depth and what the pipeline has processed since it started"""
+        with self.lock:
+            return dict(
+                self.stats_counts,
+                running=self.started,
+                source=self.source,
+                queued=self.queue.qsize(),
+                batch_size=self.batch_size,
+                max_wait_seconds=self.max_wait,
+                last_batch=self.last_batch
+            )
@@ -4,7 +4,8 @@ import logging
 from datetime import datetime
 from sentence_transformers import SentenceTransformer
 from bson.objectid import ObjectId
-from utils.db_utils import articles_collection, modules_collection, relevance_collection
+from pymongo import UpdateOne
+from utils.db_utils import articles_collection, modules_collection, relevance_collection, bump_data_version, MODULES_VERSION, RELEVANCE_VERSION
 from config import SBERT_MODEL_NAME, RELEVANCE_THRESHOLD
 
 # Set up logging
@@ -58,6 +59,7 @@ class EmbeddingService:
                 {"_id": module["_id"]},
                 {"$set": {"vector_embedding": embedding, "updated_at": datetime.now()}}
             )
+            bump_data_version(MODULES_VERSION)
             
             logger.info(f"Generated embedding for module: {module.get('name')}")
             return embedding
@@ -65,6 +67,22 @@ class EmbeddingService:
             logger.error(f"Error generating module embedding: {str(e)}")
             return None
 
+    def article_text(self, article):
+        """Combine an article's title, description, and content into the text to embed"""
+        text_parts = []
+        
+        if article.get("title"):
+            text_parts.append(article["title"])
+            
+        if article.get("description"):
+            text_parts.append(article["description"])
+            
+        if article.get("content"):
+            # Limit content to first 1000 characters to avoid exceeding model limits
+            text_parts.append(article["content"][:1000])
+            
+        return " ".join(text_parts)
+
     def generate_article_embedding(self, article_id):
         """Generate embedding vector for an article based on title, description, and content"""
         try:
@@ -75,19 +93,7 @@ class EmbeddingService:
                 return None
                 
             # Combine title, description, and content
-            text_parts = []
-            
-            if article.get("title"):
-                text_parts.append(article["title"])
-                
-            if article.get("description"):
-                text_parts.append(article["description"])
-                
-            if article.get("content"):
-                # Limit content to first 1000 characters to avoid exceeding model limits
-                text_parts.append(article["content"][:1000])
-                
-            text = " ".join(text_parts)
+            text = self.article_text(article)
             
             # Generate embedding
             embedding = self.generate_embedding(text)
@@ -181,15 +187,102 @@ class EmbeddingService:
             logger.error(f"Error updating module-article relevance: {str(e)}")
             return None
 
+    def embed_articles(self, article_ids):
+        """
+        Embed the articles among article_ids that have no embedding yet, in one model call
+        
+        Args:
+            article_ids (list): Article ObjectIds
+            
+        Returns:
+            tuple: (ids of the embedded articles, their embeddings as a numpy matrix or None)
+        """
+        try:
+            articles = list(articles_collection.find(
+                {"_id": {"$in": list(article_ids)}, "vector_embedding": None},
+                {"title": 1, "description": 1, "content": 1}
+            ))
+            ids = []
+            texts = []
+            for article in articles:
+                text = self.article_text(article)
+                if text:
+                    ids.append(article["_id"])
+                    texts.append(text)
+            if not texts:
+                return [], None
+                
+            # Encoding a batch at once is far cheaper than one call per article
+            vectors = np.asarray(self.model.encode(texts), dtype=np.float32)
+            now = datetime.now()
+            articles_collection.bulk_write([
+                UpdateOne({"_id": article_id}, {"$set": {"vector_embedding": vector.tolist(), "updated_at": now}})
+                for article_id, vector in zip(ids, vectors)
+            ], ordered=False)
+            
+            logger.info(f"Generated embeddings for {len(ids)} articles")
+            return ids, vectors
+        except Exception as e:
+            logger.error(f"Error embedding articles: {str(e)}")
+            return [], None
+
+    def score_articles(self, article_ids, vectors, module_ids, module_matrix):
+        """
+        Store the relevance of freshly embedded articles to every module
+        
+        Args:
+            article_ids (list): Article ObjectIds
+            vectors (numpy.ndarray): Their embeddings, one row per article
+            module_ids (list): Module ObjectIds
+            module_matrix (numpy.ndarray): Normalized module embeddings, one row per module
+            
+        Returns:
+            int: Number of module-article relevance scores written
+        """
+        try:
+            if not article_ids or module_matrix is None or not module_ids:
+                return 0
+                
+            # Cosine similarity of every article with every module in one matrix product
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            scores = (vectors / norms) @ module_matrix.T
+            
+            now = datetime.now()
+            operations = [
+                UpdateOne(
+                    {"module_id": module_id, "article_id": article_id},
+                    {
+                        "$set": {"relevance_score": float(scores[row, column]), "updated_at": now},
+                        "$setOnInsert": {"created_at": now}
+                    },
+                    upsert=True
+                )
+                for row, article_id in enumerate(article_ids)
+                for column, module_id in enumerate(module_ids)
+            ]
+            relevance_collection.bulk_write(operations, ordered=False)
+            bump_data_version(RELEVANCE_VERSION)
+            
+            logger.info(f"Scored {len(article_ids)} new articles against {len(module_ids)} modules")
+            return len(operations)
+        except Exception as e:
+            logger.error(f"Error scoring new articles: {str(e)}")
+            return 0
+
     def update_all_module_embeddings(self):
         """Update embeddings for all modules"""
         try:
             modules = modules_collection.find({})
+            count = 0
             for module in modules:
                 self.generate_module_embedding(module["_id"])
+                count += 1
             logger.info("Updated all module embeddings")
+            return count
         except Exception as e:
             logger.error(f"Error updating all module embeddings: {str(e)}")
+            return 0
 
     def update_recent_article_embeddings(self, days=7):
         """Update embeddings for articles from the last X days and articles without embeddings"""
@@ -214,8 +307,10 @@ class EmbeddingService:
                 count += 1
                 
             logger.info(f"Updated embeddings for {count} articles")
+            return count
         except Exception as e:
             logger.error(f"Error updating article embeddings: {str(e)}")
+            return 0
 
     def update_relevance_scores(self):
         """Update relevance scores for module-article pairs with improved historical coverage"""
@@ -262,10 +357,15 @@ class EmbeddingService:
                 for article in combined_articles:
                     self.update_module_article_relevance(module["_id"], article["_id"])
                     count += 1
+            
+            if count:
+                bump_data_version(RELEVANCE_VERSION)
                     
             logger.info(f"Updated {count} module-article relevance scores")
+            return count
         except Exception as e:
             logger.error(f"Error updating relevance scores: {str(e)}")
+            return 0
 
     def get_module_recommendations(self, module_id, limit=10):
         """Get article recommendations for a specific module"""
@@ -0,0 +1,140 @@
+# Streaming exports of the corpus and module relevance lists
+import re
+import logging
+from datetime import datetime, timezone
+from bson.objectid import ObjectId
+from utils.db_utils import articles_collection, relevance_collection, modules_collection
+from utils.facet_utils import article_type
+from config import EXPORT_BATCH_SIZE, EXPORT_MAX_BATCH_SIZE
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+DEFAULT_ARTICLE_FIELDS = ["title", "url", "source_name", "type", "published_at"]
+
+
+def parse_fields(fields):
+    """Turn a comma-separated field list into a projection (None exports all fields but embeddings)
+
+    Raises:
+        ValueError: If a field name is not a plain document path
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    for name in names:
+        if not FIELD_NAME.match(name):
+            raise ValueError(f"Invalid field name: {name}")
+    return {name: 1 for name in names}
+
+
+def parse_since(value):
+    """Parse an ISO 8601 date or datetime query parameter into a naive UTC datetime
+
+    Values with an offset are converted to UTC, to compare with the stored
+    naive-UTC timestamps; values without one are taken as UTC.
+
+    Raises:
+        ValueError: If the value is not ISO 8601
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def clamp_batch_size(batch_size):
+    """Keep a requested batch size within the configured bounds"""
+    if not batch_size:
+        return EXPORT_BATCH_SIZE
+    return max(1, min(int(batch_size), EXPORT_MAX_BATCH_SIZE))
+
+
+class ExportService:
+    def __init__(self):
+        """Initialize the export service"""
+        logger.info("Initialized export service")
+
+    def iter_articles(self, projection=None, since=None, content_type=None, category=None, batch_size=None):
+        """Yield stored articles in _id order without materializing the result
+
+        Args:
+            projection (dict): Fields to include; by default every field except the embedding
+            since (datetime): Only articles published at or after this time
+            content_type (str): "academic" or "news"
+            category (str): Category facet to filter on
+            batch_size (int): Documents fetched from MongoDB per round trip
+        """
+        query = {}
+        if since:
+            query["published_at"] = {"$gte": since}
+        if content_type:
+            query["type"] = content_type
+        if category:
+            query["category_facets"] = category.strip().lower()
+        full_documents = projection is None
+        if full_documents:
+            projection = {"vector_embedding": 0}
+
+        cursor = articles_collection.find(query, projection).sort("_id", 1).batch_size(clamp_batch_size(batch_size))
+        try:
+            for article in cursor:
+                if full_documents:
+                    # Type is stored at ingest; documents stored before that fall back to the source
+                    article.setdefault("type", article_type(article.get("source_name")))
+                yield article
+        finally:
+            cursor.close()
+
+    def iter_module_relevance(self, module_id, min_score=0.0, article_fields=None, batch_size=None):
+        """Yield a module's relevance list, best first, joined with article fields batch by batch
+
+        Each item is {"article_id", "relevance_score", "article"}; articles are
+        fetched with one $in query per batch rather than one lookup per row.
+
+        Raises:
+            LookupError: If the module does not exist
+        """
+        if isinstance(module_id, str):
+            if not ObjectId.is_valid(module_id):
+                raise LookupError(f"Module not found: {module_id}")
+            module_id = ObjectId(module_id)
+        if not modules_collection.find_one({"_id": module_id}, {"_id": 1}):
+            raise LookupError(f"Module not found: {module_id}")
+
+        batch_size = clamp_batch_size(batch_size)
+        projection = article_fields or {name: 1 for name in DEFAULT_ARTICLE_FIELDS}
+        cursor = relevance_collection.find(
+            {"module_id": module_id, "relevance_score": {"$gte": min_score}},
+            {"article_id": 1, "relevance_score": 1, "_id": 0}
+        ).sort([("relevance_score", -1), ("article_id", -1)]).batch_size(batch_size)
+
+        try:
+            batch = []
+            for rel in cursor:
+                batch.append(rel)
+                if len(batch) >= batch_size:
+                    yield from self._join_articles(batch, projection)
+                    batch = []
+            if batch:
+                yield from self._join_articles(batch, projection)
+        finally:
+            cursor.close()
+
+    def _join_articles(self, batch, projection):
+        """Attach article fields to a batch of relevance rows, dropping rows whose article is gone"""
+        articles = {
+            article["_id"]: article
+            for article in articles_collection.find({"_id": {"$in": [rel["article_id"] for rel in batch]}}, projection)
+        }
+        for rel in batch:
+            article = articles.get(rel["article_id"])
+            if article is None:
+                continue
+            article.pop("_id", None)
+            rel["article"] = article
+            yield rel
@@ -0,0 +1,95 @@
+# In-memory module catalog, reloaded only when the modules version stamp changes
+import json
+import time
+import hashlib
+import logging
+import threading
+from utils.db_utils import modules_collection, get_data_version, MODULES_VERSION
+from config import MODULE_CATALOG_CHECK_SECONDS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _etag(body):
+    """Strong ETag for a serialized body"""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha1(body).hexdigest()
+
+
+class ModuleCatalogService:
+    def __init__(self, serializer=None, check_seconds=MODULE_CATALOG_CHECK_SECONDS):
+        """Initialize the catalog cache
+
+        Args:
+            serializer: Callable turning a payload into a JSON string (defaults to json.dumps)
+            check_seconds: Minimum interval between reads of the version stamp
+        """
+        self.serializer = serializer or (lambda payload: json.dumps(payload, default=str))
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._catalog = None   # (body, etag)
+        self._modules = {}     # module id -> (module, body, etag)
+        logger.info("Initialized module catalog service")
+
+    def _ensure_fresh(self):
+        """Reload the catalog if the modules version stamp moved since it was loaded"""
+        now = time.monotonic()
+        if self._catalog is not None and now - self._checked_at < self.check_seconds:
+            return
+        with self._lock:
+            if self._catalog is not None and now - self._checked_at < self.check_seconds:
+                return
+            version = get_data_version(MODULES_VERSION)
+            if self._catalog is None or version != self._version:
+                self._load(version)
+            self._checked_at = now
+
+    def _load(self, version):
+        """Serialize the whole catalog and each module once"""
+        modules = list(modules_collection.find({}, {"vector_embedding": 0}))
+        per_module = {}
+        for module in modules:
+            module["_id"] = str(module["_id"])
+            body = self.serializer({"module": module})
+            per_module[module["_id"]] = (module, body, _etag(body))
+
+        body = self.serializer({"modules": modules})
+        self._catalog = (body, _etag(body))
+        self._modules = per_module
+        self._version = version
+        logger.info(f"Loaded module catalog with {len(modules)} modules (version {version})")
+
+    def invalidate(self):
+        """Force a version check on the next read"""
+        self._checked_at = 0.0
+
+    def get_catalog(self):
+        """Get the serialized catalog
+
+        Returns:
+            tuple: (JSON body, ETag), or None if the catalog could not be loaded
+        """
+        try:
+            self._ensure_fresh()
+            return self._catalog
+        except Exception as e:
+            logger.error(f"Error getting module catalog: {str(e)}")
+            return None
+
+    def get_module(self, module_id):
+        """Get one module from the catalog
+
+        Returns:
+            tuple: (module dict, JSON body, ETag), or None if the module does not exist
+        """
+        try:
+            self._ensure_fresh()
+            return self._modules.get(str(module_id))
+        except Exception as e:
+            logger.error(f"Error getting module from catalog: {str(e)}")
+            return None
@@ -1,7 +1,8 @@
 # NewsAPI integration
-import requests
 import logging
 from datetime import datetime, timedelta
+from utils.http_client import http_get
+from utils.quota_budget import get_quota_budget
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -31,8 +32,12 @@ class NewsAPIClientService:
             if category:
                 params["category"] = category
                 
+            # Every request counts against the daily NewsAPI quota
+            if not get_quota_budget("newsapi").try_spend("admin"):
+                return {"status": "error", "articles": []}
+                
             # Make API request
-            response = requests.get(url, params=params)
+            response = http_get(url, params=params)
             
             # Check for successful response
             if response.status_code != 200:
@@ -66,8 +71,12 @@ class NewsAPIClientService:
                 "pageSize": page_size
             }
             
+            # Every request counts against the daily NewsAPI quota
+            if not get_quota_budget("newsapi").try_spend("admin"):
+                return {"status": "error", "articles": []}
+                
             # Make API request
-            response = requests.get(url, params=params)
+            response = http_get(url, params=params)
             
             # Check for successful response
             if response.status_code != 200:
@@ -100,8 +109,12 @@ class NewsAPIClientService:
             if country:
                 params["country"] = country
                 
+            # Every request counts against the daily NewsAPI quota
+            if not get_quota_budget("newsapi").try_spend("admin"):
+                return {"status": "error", "sources": []}
+                
             # Make API request
-            response = requests.get(url, params=params)
+            response = http_get(url, params=params)
             
             # Check for successful response
             if response.status_code != 200:
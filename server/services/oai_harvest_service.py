@@ -0,0 +1,170 @@
+# Incremental arXiv harvesting over OAI-PMH
+import logging
+from datetime import datetime, timedelta
+from lxml import etree
+from utils.db_utils import service_state_collection
+from utils.http_client import http_get
+from utils.rate_limit import get_rate_limiter
+from utils.arxiv_parsing import iter_oai_papers
+from config import (
+    ARXIV_OAI_URL, ARXIV_OAI_SETS, ARXIV_OAI_INITIAL_DAYS, ARXIV_OAI_MAX_PAGES, ARXIV_CS_CATEGORIES
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+METADATA_PREFIX = "arXivRaw"  # Lists every version, so revisions can be detected
+DATESTAMP_FORMAT = "%Y-%m-%d"
+
+
+def state_id(set_spec):
+    """service_state _id holding a set's harvest watermark and checkpoint"""
+    return f"oai:{set_spec}"
+
+
+class OaiHarvestService:
+    def __init__(self, arxiv_service, base_url=ARXIV_OAI_URL, categories=ARXIV_CS_CATEGORIES, years_limit=5):
+        """Initialize the OAI-PMH harvester
+
+        Args:
+            arxiv_service (ArxivService): Stores harvested papers in bulk
+            base_url (str): OAI-PMH endpoint
+            categories (list): Keep papers listed in any of these categories (None keeps all)
+            years_limit (int): Skip papers first submitted longer ago than this (0 keeps all)
+        """
+        self.arxiv_service = arxiv_service
+        self.base_url = base_url
+        self.categories = set(categories) if categories else None
+        self.years_limit = years_limit
+        logger.info("Initialized OAI-PMH harvest service")
+
+    def harvest_all(self, sets=None):
+        """Harvest every configured set, returning {set: papers stored}"""
+        return {set_spec: self.harvest(set_spec) for set_spec in (sets or ARXIV_OAI_SETS)}
+
+    def harvest(self, set_spec, from_date=None, max_pages=ARXIV_OAI_MAX_PAGES):
+        """
+        Harvest new and changed records of one set since its watermark
+
+        The resumption token is checkpointed after every stored page, so an
+        interrupted harvest resumes where it stopped. Once the list is
+        exhausted the watermark advances to the date of the first response,
+        and the next harvest asks only for records changed since then.
+
+        Args:
+            set_spec (str): OAI-PMH set, e.g. "cs"
+            from_date (datetime): Harvest from this date instead of the watermark (e.g. a backfill)
+            max_pages (int): Stop after this many pages, leaving the checkpoint for the next run
+
+        Returns:
+            int: Number of papers inserted or revised
+        """
+        try:
+            state = service_state_collection.find_one({"_id": state_id(set_spec)}) or {}
+            token = state.get("resumption_token") if from_date is None else None
+            if token:
+                harvest_from = state.get("harvest_from")
+                started_at = state.get("harvest_started_at")
+                logger.info(f"Resuming OAI-PMH harvest of {set_spec} from its checkpoint")
+            else:
+                harvest_from = from_date or state.get("watermark") or (
+                    datetime.utcnow() - timedelta(days=ARXIV_OAI_INITIAL_DAYS)
+                )
+                started_at = None
+                logger.info(f"Starting OAI-PMH harvest of {set_spec} from {harvest_from.strftime(DATESTAMP_FORMAT)}")
+
+            stored = 0
+            for _ in range(max_pages):
+                if token:
+                    params = {"verb": "ListRecords", "resumptionToken": token}
+                else:
+                    params = {
+                        "verb": "ListRecords", "metadataPrefix": METADATA_PREFIX,
+                        "set": set_spec, "from": harvest_from.strftime(DATESTAMP_FORMAT)
+                    }
+
+                page, papers = self._fetch_page(params)
+                if page["error"]:
+                    code, message = page["error"]
+                    if code == "noRecordsMatch":
+                        token = None
+                        started_at = started_at or page["response_date"]
+                        break
+                    if code == "badResumptionToken" and token:
+                        # Expired token: restart the same window from the top
+                        logger.warning(f"Resumption token for {set_spec} expired; restarting from {harvest_from}")
+                        token = None
+                        continue
+                    logger.error(f"OAI-PMH error for {set_spec}: {code} {message}")
+                    return stored
+
+                started_at = started_at or page["response_date"] or datetime.utcnow()
+                result = self.arxiv_service.store_papers_bulk(papers)
+                stored += len(result["inserted"]) + len(result["updated"])
+                token = page["resumption_token"]
+                logger.info(f"Harvested {page['records']} records from {set_spec} "
+                            f"({len(papers)} kept, {page['complete_list_size'] or '?'} in list)")
+
+                # Checkpoint only after the page is stored
+                self._save_state(set_spec, {
+                    "resumption_token": token,
+                    "harvest_from": harvest_from,
+                    "harvest_started_at": started_at
+                })
+                if not token:
+                    break
+
+            if not token:
+                # OAI-PMH "from" is inclusive, so records datestamped on the start day are seen again next time
+                self._save_state(set_spec, {
+                    "watermark": started_at or datetime.utcnow(),
+                    "resumption_token": None,
+                    "last_completed_at": datetime.utcnow()
+                })
+                logger.info(f"Completed OAI-PMH harvest of {set_spec}: {stored} papers stored")
+            else:
+                logger.info(f"Paused OAI-PMH harvest of {set_spec} after {max_pages} pages: {stored} papers stored")
+            return stored
+        except Exception as e:
+            logger.error(f"Error harvesting OAI-PMH set {set_spec}: {str(e)}")
+            return 0
+
+    def _fetch_page(self, params):
+        """Fetch and stream-parse one ListRecords page
+
+        Returns:
+            tuple: (page results from iter_oai_papers, papers kept by the category and age filters)
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=365 * self.years_limit) if self.years_limit > 0 else None
+        page = {}
+        papers = []
+        response = http_get(self.base_url, params=params, stream=True, limiter=get_rate_limiter("arxiv"))
+        with response:
+            if response.status_code != 200:
+                page.update(error=("http", f"status {response.status_code}"))
+                return page, papers
+            response.raw.decode_content = True
+            try:
+                for paper in iter_oai_papers(response.raw, page):
+                    if self.categories is not None and not self.categories.intersection(paper["categories"]):
+                        continue
+                    if cutoff_date is not None and paper["published_at"] < cutoff_date:
+                        continue
+                    papers.append(paper)
+            except etree.XMLSyntaxError as e:
+                page["error"] = ("parse", str(e))
+        return page, papers
+
+    def _save_state(self, set_spec, fields):
+        """Merge fields into a set's harvest state"""
+        fields["updated_at"] = datetime.utcnow()
+        service_state_collection.update_one({"_id": state_id(set_spec)}, {"$set": fields}, upsert=True)
+
+    def get_state(self, set_spec):
+        """Get a set's watermark and checkpoint"""
+        try:
+            return service_state_collection.find_one({"_id": state_id(set_spec)}) or {}
+        except Exception as e:
+            logger.error(f"Error getting OAI-PMH state for {set_spec}: {str(e)}")
+            return {}
@@ -1,22 +1,31 @@
 # Recommendation engine
+import heapq
 import logging
+import numpy as np
 from datetime import datetime
 from bson.objectid import ObjectId
-from utils.db_utils import articles_collection, modules_collection, relevance_collection, interactions_collection
-from config import RELEVANCE_THRESHOLD
+from utils.db_utils import (
+    articles_collection, modules_collection, relevance_collection, interactions_collection, users_collection,
+    bump_user_data_version
+)
+from utils.facet_utils import article_type
+from utils.pagination import InvalidCursorError, decode_cursor, keyset_filter
+from config import RELEVANCE_THRESHOLD, INTERACTION_WEIGHTS, TASTE_HALF_LIFE_DAYS, TASTE_BLEND_WEIGHT
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RecommendationService:
-    def __init__(self, embedding_service):
+    def __init__(self, embedding_service, vector_index=None):
         """Initialize the recommendation service with the embedding service"""
         self.embedding_service = embedding_service
+        self.vector_index = vector_index
         logger.info("Initialized recommendation service")
 
-    def get_module_recommendations(self, module_id, limit=20):
+    def get_module_recommendations(self, module_id, limit=20, cursor=None):
     #Get combined article and paper recommendations for a specific module
+    #Pass the cursor of the previous page to continue after its last (score, article) pair
         try:
             # Ensure module_id is ObjectId
             if isinstance(module_id, str):
@@ -29,10 +38,14 @@ class RecommendationService:
                 return []
                     
             # Get articles/papers with high relevance scores for this module
-            relevance_docs = relevance_collection.find({
+            query = {
                 "module_id": module_id,
                 "relevance_score": {"$gte": RELEVANCE_THRESHOLD}
-            }).sort("relevance_score", -1).limit(limit * 2)  # Get more to ensure mix of types
+            }
+            relevance_sort = [("relevance_score", -1), ("article_id", -1)]
+            if cursor:
+                query = {"$and": [query, keyset_filter(relevance_sort, cursor)]}
+            relevance_docs = relevance_collection.find(query).sort(relevance_sort).limit(limit * 2)  # Get more to ensure mix of types
                 
             # Retrieve articles/papers with their relevance scores
             recommendations = []
@@ -41,64 +54,107 @@ class RecommendationService:
                 if article:
                     # Add relevance score to article
                     article["relevance_score"] = rel["relevance_score"]
-                    # Add type field
-                    if article.get("source_name") == "arXiv":
-                        article["type"] = "academic"
-                    else:
-                        article["type"] = "news"
-                    # Convert ObjectId to string for JSON serialization
-                    article["_id"] = str(article["_id"])
+                    # Type is stored at ingest; documents stored before that fall back to the source
+                    article.setdefault("type", article_type(article.get("source_name")))
                     recommendations.append(article)
             
             # Sort by relevance score and take top results           
-            recommendations = sorted(recommendations, key=lambda x: x["relevance_score"], reverse=True)[:limit]
+            recommendations = recommendations[:limit]
             
             logger.info(f"Found {len(recommendations)} combined recommendations for module: {module.get('name')}")
             return recommendations
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Error getting module recommendations: {str(e)}")
             return []
 
-    def get_user_recommendations(self, user_id, limit=20):
-        """Get personalized recommendations for a user based on enrolled modules"""
+    def get_user_recommendations(self, user_id, limit=20, cursor=None):
+        """Get personalized recommendations for a user based on enrolled modules
+
+        Results are ordered by (score, _id); pass the cursor of the previous page
+        to continue after it.
+        """
         try:
+            after = decode_cursor(cursor) if cursor else None
+            
             # Get user details and enrolled modules
-            from utils.db_utils import users_collection
             user = users_collection.find_one({"_id": ObjectId(user_id) if isinstance(user_id, str) else user_id})
             
+            # Rank by the user's taste vector when one has been built up
+            if user and user.get("taste_vector") and self.vector_index:
+                recommendations = self._rank_by_taste(user, limit, after)
+                if recommendations or after:
+                    logger.info(f"Found {len(recommendations)} taste-ranked recommendations for user: {user_id}")
+                    return recommendations
+            
             if not user or not user.get("modules"):
                 logger.error(f"User not found or has no enrolled modules: {user_id}")
                 return []
                     
-            # Get recommendations for each module the user is enrolled in
-            all_recommendations = []
-            for module_id in user.get("modules", []):
-                module_recs = self.get_module_recommendations(module_id, limit=10)
-                for rec in module_recs:
-                    rec["module_id"] = str(module_id)  # Mark which module this recommendation is for
-                    all_recommendations.append(rec)
-                        
-            # Deduplicate recommendations (an article may be relevant to multiple modules)
-            seen_articles = set()
-            unique_recommendations = []
-            
-            for article in all_recommendations:
-                if article["_id"] not in seen_articles:
-                    seen_articles.add(article["_id"])
-                    unique_recommendations.append(article)
-                        
-            # Sort by relevance score
-            sorted_recommendations = sorted(
-                unique_recommendations, 
-                key=lambda x: x.get("relevance_score", 0), 
-                reverse=True
+            # An article scores its best relevance to any enrolled module. Merge the modules'
+            # relevance index scans after the cursor in (score, article) order: the first entry
+            # of an article is its best one, so the scan stops once the page is full
+            module_ids = [ObjectId(m) if isinstance(m, str) else m for m in user.get("modules", [])]
+            relevance_sort = [("relevance_score", -1), ("article_id", -1)]
+            module_scans = []
+            for module_id in module_ids:
+                query = {"module_id": module_id, "relevance_score": {"$gte": RELEVANCE_THRESHOLD}}
+                if cursor:
+                    query = {"$and": [query, keyset_filter(relevance_sort, cursor)]}
+                projection = {"article_id": 1, "module_id": 1, "relevance_score": 1}
+                module_scans.append(
+                    relevance_collection.find(query, projection).sort(relevance_sort).batch_size(limit)
+                )
+            merged = heapq.merge(
+                *module_scans, key=lambda rel: (rel["relevance_score"], rel["article_id"]), reverse=True
             )
             
-            # Take top N recommendations
-            top_recommendations = sorted_recommendations[:limit]
+            best = {}  # article id -> (score, module id), in page order
+            seen = set()
+            pending = []
+            
+            def accept_pending():
+                # An article whose best entry sorts before the cursor was on an earlier page
+                shown = self._shown_before(pending, module_ids, after) if after and pending else set()
+                for entry in pending:
+                    if entry["article_id"] not in shown:
+                        best[entry["article_id"]] = (entry["relevance_score"], entry["module_id"])
+                pending.clear()
+            
+            for rel in merged:
+                if rel["article_id"] in seen:
+                    continue
+                seen.add(rel["article_id"])
+                pending.append(rel)
+                if len(best) + len(pending) >= limit:
+                    accept_pending()
+                    if len(best) >= limit:
+                        break
+            accept_pending()
+            
+            top_ids = list(best)[:limit]
+            articles = {
+                article["_id"]: article
+                for article in articles_collection.find({"_id": {"$in": top_ids}}, {"vector_embedding": 0})
+            }
+            top_recommendations = []
+            for article_id in top_ids:
+                article = articles.get(article_id)
+                if not article:
+                    continue
+                score, module_id = best[article_id]
+                article["relevance_score"] = score
+                article["score"] = score
+                article["module_id"] = str(module_id)  # Mark which module this recommendation is for
+                # Type is stored at ingest; documents stored before that fall back to the source
+                article.setdefault("type", article_type(article.get("source_name")))
+                top_recommendations.append(article)
             
             logger.info(f"Found {len(top_recommendations)} personalized recommendations for user: {user_id}")
             return top_recommendations
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Error getting user recommendations: {str(e)}")
             return []
@@ -133,12 +189,141 @@ class RecommendationService:
             # Insert interaction record
             interactions_collection.insert_one(interaction)
             
+            # Fold the article into the user's taste vector
+            if interaction_type in INTERACTION_WEIGHTS:
+                self._update_taste_vector(user_id, article_id, INTERACTION_WEIGHTS[interaction_type], interaction["created_at"])
+            
+            # Invalidate this user's recommendations; trending feeds revalidate on their time bucket
+            bump_user_data_version(user_id)
+            
             logger.info(f"Recorded {interaction_type} interaction for user {user_id}, article {article_id}")
             return True
         except Exception as e:
             logger.error(f"Error recording interaction: {str(e)}")
             return False
 
+    def _shown_before(self, entries, module_ids, after):
+        """Ids of the entries' articles that score (score, _id) at or above the cursor for any of the modules"""
+        last_score, last_id = after
+        shown = set()
+        for rel in relevance_collection.find(
+            {
+                "module_id": {"$in": module_ids},
+                "article_id": {"$in": [entry["article_id"] for entry in entries]},
+                "relevance_score": {"$gte": last_score}
+            },
+            {"article_id": 1, "relevance_score": 1}
+        ):
+            if (rel["relevance_score"], rel["article_id"]) >= (last_score, last_id):
+                shown.add(rel["article_id"])
+        return shown
+
+    def _update_taste_vector(self, user_id, article_id, weight, now):
+        """Update the user's time-decayed weighted mean of article embeddings in O(d)
+
+        The stored weight decays with a half-life of TASTE_HALF_LIFE_DAYS, so the
+        mean drifts towards what the user has been reading recently.
+        """
+        try:
+            embedding = None
+            if self.vector_index:
+                embedding = self.vector_index.get_article_vector(article_id)
+            if embedding is None:
+                article = articles_collection.find_one({"_id": article_id}, {"vector_embedding": 1})
+                if not article or not article.get("vector_embedding"):
+                    return False
+                embedding = np.asarray(article["vector_embedding"], dtype=np.float32)
+                norm = np.linalg.norm(embedding)
+                if norm == 0:
+                    return False
+                embedding = embedding / norm
+
+            user = users_collection.find_one(
+                {"_id": user_id},
+                {"taste_vector": 1, "taste_weight": 1, "taste_updated_at": 1}
+            )
+            if not user:
+                return False
+
+            taste = user.get("taste_vector")
+            if taste and len(taste) == len(embedding):
+                elapsed_days = max((now - user.get("taste_updated_at", now)).total_seconds() / 86400.0, 0.0)
+                old_weight = user.get("taste_weight", 0.0) * 0.5 ** (elapsed_days / TASTE_HALF_LIFE_DAYS)
+                total_weight = old_weight + weight
+                taste = (np.asarray(taste, dtype=np.float32) * old_weight + embedding * weight) / total_weight
+            else:
+                total_weight = weight
+                taste = embedding
+
+            users_collection.update_one(
+                {"_id": user_id},
+                {"$set": {
+                    "taste_vector": taste.tolist(),
+                    "taste_weight": float(total_weight),
+                    "taste_updated_at": now
+                }}
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error updating taste vector: {str(e)}")
+            return False
+
+    def _rank_by_taste(self, user, limit, after=None):
+        """Rank all indexed articles by the user's taste vector blended with module relevance"""
+        # Taste and module scores come from one index snapshot so their rows line up
+        module_ids, module_matrix = self.vector_index.get_module_vectors(user.get("modules", []))
+        article_ids, taste_scores, module_scores = self.vector_index.score_articles_with_modules(
+            user["taste_vector"], module_matrix
+        )
+        if not article_ids:
+            return []
+
+        # Module relevance is the best cosine similarity to any enrolled module
+        if module_scores is not None:
+            best_module = module_scores.argmax(axis=1)
+            relevance_scores = module_scores[np.arange(len(best_module)), best_module]
+            scores = TASTE_BLEND_WEIGHT * taste_scores + (1 - TASTE_BLEND_WEIGHT) * relevance_scores
+        else:
+            best_module = None
+            relevance_scores = None
+            scores = taste_scores
+
+        # Continue after the previous page by masking out everything that ranked above it
+        candidates = np.arange(len(scores))
+        if after:
+            last_score, last_id = after
+            candidates = candidates[scores < last_score]
+            ties = [idx for idx in np.flatnonzero(scores == last_score) if article_ids[idx] < last_id]
+            if ties:
+                candidates = np.concatenate([candidates, ties])
+        if len(candidates) == 0:
+            return []
+
+        count = min(limit, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], count - 1)[:count]]
+        top = sorted(top, key=lambda idx: (scores[idx], article_ids[idx]), reverse=True)
+
+        ranked_ids = [article_ids[idx] for idx in top]
+        articles = {
+            article["_id"]: article
+            for article in articles_collection.find({"_id": {"$in": ranked_ids}}, {"vector_embedding": 0})
+        }
+
+        recommendations = []
+        for idx, article_id in zip(top, ranked_ids):
+            article = articles.get(article_id)
+            if not article:
+                continue
+            article["score"] = float(scores[idx])
+            article["taste_score"] = float(taste_scores[idx])
+            if relevance_scores is not None:
+                article["relevance_score"] = float(relevance_scores[idx])
+                article["module_id"] = str(module_ids[best_module[idx]])
+            # Type is stored at ingest; documents stored before that fall back to the source
+            article.setdefault("type", article_type(article.get("source_name")))
+            recommendations.append(article)
+        return recommendations
+
     def get_trending_articles(self, days=7, limit=10):
         """Get trending content (articles and papers) based on recent interactions"""
         try:
@@ -165,12 +350,8 @@ class RecommendationService:
                 article = articles_collection.find_one({"_id": item["_id"]})
                 if article:
                     article["interaction_count"] = item["interaction_count"]
-                    article["_id"] = str(article["_id"])  # Convert ObjectId to string
-                    # Add type field
-                    if article.get("source_name") == "arXiv":
-                        article["type"] = "academic"
-                    else:
-                        article["type"] = "news"
+                    # Type is stored at ingest; documents stored before that fall back to the source
+                    article.setdefault("type", article_type(article.get("source_name")))
                     results.append(article)
             
             # Sort by interaction count and limit results
@@ -190,10 +371,7 @@ class RecommendationService:
                 "$text": {"$search": keyword}
             }).limit(limit)
             
-            results = []
-            for article in articles:
-                article["_id"] = str(article["_id"])  # Convert ObjectId to string
-                results.append(article)
+            results = list(articles)
                 
             logger.info(f"Found {len(results)} articles matching keyword: {keyword}")
             return results
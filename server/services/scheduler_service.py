@@ -1,31 +1,165 @@
 # Updated scheduler_service.py with improved content fetching
+import atexit
 import threading
 import time
 import logging
 import schedule
-from datetime import datetime
-from config import SCHEDULER_INTERVAL_MINUTES, ARTICLE_CATEGORIES, GENERAL_CS_KEYWORDS, MODULE_CONTENT_FETCH_COUNT, ARXIV_CS_CATEGORIES
+from datetime import datetime, timedelta
+from config import SCHEDULER_INTERVAL_MINUTES, ARTICLE_CATEGORIES, GENERAL_CS_KEYWORDS, MODULE_CONTENT_FETCH_COUNT, ARXIV_CS_CATEGORIES, SEARCH_INDEX_SNAPSHOT_MINUTES, SUGGEST_REBUILD_MINUTES, ARXIV_OAI_HARVEST_HOURS, SCHEDULER_HEARTBEAT_SECONDS
 from services.article_service import ArticleService
+from utils.job_executor import JobExecutor
+from utils.leader_lease import LeaderLease
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class SchedulerService:
-    def __init__(self, article_service, embedding_service, arxiv_service=None):
+    def __init__(self, article_service, embedding_service, arxiv_service=None, cooccurrence_service=None, search_index_service=None, suggest_service=None, async_ingest_service=None, oai_harvest_service=None, embedding_pipeline_service=None):
         """Initialize the scheduler service"""
         self.article_service = article_service
         self.embedding_service = embedding_service
         self.arxiv_service = arxiv_service 
+        self.cooccurrence_service = cooccurrence_service
+        self.search_index_service = search_index_service
+        self.suggest_service = suggest_service
+        self.async_ingest_service = async_ingest_service
+        self.oai_harvest_service = oai_harvest_service
+        self.embedding_pipeline_service = embedding_pipeline_service
         self.is_running = False
+        # Jobs run on a bounded pool, so a long fetch never holds up the embedding refresh
+        self.executor = JobExecutor()
+        self.score_after_embedding = threading.Event()
+        self.scheduled = {}  # Job name -> its periodic schedule entry
+        # Every process may start the scheduler, but only the lease holder runs jobs
+        self.lease = LeaderLease("scheduler")
+        self.is_leader = False
+        self._register_jobs()
         logger.info("Initialized scheduler service")
 
+    def _register_jobs(self):
+        """Register every job the configured services support with the executor, with how often it is due"""
+        jobs = [
+            # Fetch regular articles every day
+            (self.fetch_articles, timedelta(hours=24)),
+            # Fetch targeted content for modules every 12 hours
+            (self.fetch_targeted_content_for_modules, timedelta(hours=12)),
+            # Fetch keyword-based content every 3 days for broader coverage
+            (self.fetch_general_keyword_content, timedelta(days=3)),
+            # Update article embeddings every 15 minutes; with the embedding pipeline
+            # new articles are embedded as they are stored, so this is an hourly sweep
+            # for anything it missed and for embeddings due a refresh
+            (self.update_article_embeddings, timedelta(hours=1) if self.embedding_pipeline_service else timedelta(minutes=15)),
+            # Update module embeddings daily
+            (self.update_module_embeddings, timedelta(days=1)),
+            # Update relevance scores every hour
+            (self.update_relevance_scores, timedelta(hours=1))
+        ]
+        if self.async_ingest_service:
+            # Runs the three fetch jobs at once, so it has no schedule of its own
+            jobs.append((self.refresh_all_content, None))
+        if self.oai_harvest_service:
+            # Harvest new and revised arXiv papers incrementally
+            jobs.append((self.harvest_arxiv, timedelta(hours=ARXIV_OAI_HARVEST_HOURS)))
+        if self.cooccurrence_service:
+            # Fold new interactions into the "also read" neighbours every hour
+            # and rebuild them from the full history daily
+            jobs.extend([(self.update_also_read, timedelta(hours=1)), (self.rebuild_also_read, timedelta(days=1))])
+        if self.search_index_service:
+            # Snapshot the search index when it changed, and compact it daily
+            jobs.extend([
+                (self.save_search_index, timedelta(minutes=SEARCH_INDEX_SNAPSHOT_MINUTES)),
+                (self.rebuild_search_index, timedelta(days=1))
+            ])
+        if self.suggest_service:
+            # Refresh suggestion popularity
+            jobs.append((self.rebuild_suggestions, timedelta(minutes=SUGGEST_REBUILD_MINUTES)))
+        for job, interval in jobs:
+            self.executor.register(job.__name__, job, interval)
+
+    def trigger(self, job_name):
+        """Run a job in the background; duplicate triggers while it is queued or running are coalesced"""
+        return self.executor.submit(job_name)
+
+    def catch_up(self):
+        """
+        Start the jobs that fell due while no process was leading the scheduler
+
+        A job runs now only if its interval has passed since its last
+        successful run (persisted across restarts), or if it never ran.
+        The schedule of jobs not yet due is moved to when they are.
+
+        Returns:
+            list: Names of the jobs started now
+        """
+        now = datetime.now()
+        due = []
+        for name in self.executor.intervals:
+            remaining = self.executor.due_in(name, now)
+            if remaining <= timedelta(0):
+                due.append(name)
+            else:
+                if name in self.scheduled:
+                    self.scheduled[name].next_run = now + remaining
+                logger.info(f"Job {name} is not due for {remaining}; skipping it at startup")
+
+        # One concurrent refresh replaces the three fetch jobs when all of them are due
+        fetch_jobs = ["fetch_articles", "fetch_targeted_content_for_modules", "fetch_general_keyword_content"]
+        if self.async_ingest_service and all(name in due for name in fetch_jobs):
+            due = [name for name in due if name not in fetch_jobs]
+            due.insert(0, "refresh_all_content")
+
+        for name in due:
+            self.trigger(name)
+        logger.info(f"Catch-up started: {due}")
+        return due
+
+    def _progress(self, job_name):
+        """
+        Resume the checkpoint an interrupted run of a fetch job left behind
+
+        Returns:
+            tuple: (progress dict with the "news_terms" and "arxiv_terms" already
+                searched, function returning an on_batch callback that records
+                searched terms under one of those keys and saves the checkpoint)
+        """
+        checkpoint = self.executor.load_checkpoint(job_name)
+        progress = {
+            "news_terms": list(checkpoint.get("news_terms", [])),
+            "arxiv_terms": list(checkpoint.get("arxiv_terms", []))
+        }
+
+        def recorder(key):
+            def on_batch(terms):
+                progress[key].extend(terms)
+                self.executor.save_checkpoint(job_name, progress)
+            return on_batch
+
+        return progress, recorder
+
+    def refresh_scores(self):
+        """Embed newly fetched content and then rescore it, in the background"""
+        if self.embedding_pipeline_service and self.embedding_pipeline_service.started:
+            # The pipeline already embeds and scores content as it is stored
+            return
+        self.score_after_embedding.set()
+        self.trigger("update_article_embeddings")
+
     def start(self):
         """Start the background scheduler thread"""
         if self.is_running:
             logger.warning("Scheduler is already running")
             return
             
+        # From now on jobs in this process run only while it leads
+        self.executor.lease = self.lease
+        atexit.register(self.lease.release)
+        
+        # Content fetched by the jobs is embedded as it is stored; with change
+        # streams only the leader consumes them, so each event is handled once
+        if self.embedding_pipeline_service:
+            self.embedding_pipeline_service.start()
+        
         # Start in a new thread
         thread = threading.Thread(target=self.run_scheduler)
         thread.daemon = True  # Allow the thread to exit when the main program exits
@@ -35,59 +169,79 @@ class SchedulerService:
         logger.info("Started scheduler service")
 
     def run_scheduler(self):
-        """Run the scheduler with periodic tasks"""
+        """Run the scheduler with periodic tasks while this process holds the scheduler lease"""
         try:
-            # Schedule tasks
-            
-            # Fetch regular articles every day
-            schedule.every(24).hours.do(self.fetch_articles)
-            
-            # Fetch targeted content for modules every 12 hours
-            schedule.every(12).hours.do(self.fetch_targeted_content_for_modules)
-            
-            # Fetch keyword-based content every 3 days for broader coverage
-            schedule.every(3).days.do(self.fetch_general_keyword_content)
-            
-            # Update article embeddings every 15 minutes
-            schedule.every(15).minutes.do(self.update_article_embeddings)
-            
-            # Update module embeddings daily
-            schedule.every().day.do(self.update_module_embeddings)
-            
-            # Update relevance scores every hour
-            schedule.every(1).hours.do(self.update_relevance_scores)
-            
-            # Run immediately on startup for initial data population
-            self.fetch_articles()
-            self.fetch_targeted_content_for_modules()
-            self.fetch_general_keyword_content()
-            self.update_article_embeddings()
+            next_heartbeat = 0.0
             
             # Run the scheduler loop
             while True:
-                schedule.run_pending()
+                # Renew the lease, or try to take it over from a leader that died
+                if time.monotonic() >= next_heartbeat:
+                    next_heartbeat = time.monotonic() + SCHEDULER_HEARTBEAT_SECONDS
+                    leading = self.lease.heartbeat()
+                    if leading and not self.is_leader:
+                        self.lead()
+                    elif self.is_leader and not leading:
+                        self.follow()
+                
+                if self.is_leader:
+                    schedule.run_pending()
                 time.sleep(1)
                 
         except Exception as e:
             logger.error(f"Error in scheduler: {str(e)}")
             self.is_running = False
 
+    def lead(self):
+        """Start scheduling jobs after this process became the leader"""
+        logger.info(f"This process leads the scheduler (fencing token {self.lease.fencing_token()})")
+        self.is_leader = True
+        
+        # Schedule every periodic job at its registered interval; each due job
+        # is handed to the executor, so this loop never blocks on one
+        for name, interval in self.executor.intervals.items():
+            self.scheduled[name] = schedule.every(int(interval.total_seconds())).seconds.do(self.trigger, name)
+        
+        # Run only the jobs whose interval passed while no process was leading
+        self.catch_up()
+
+    def follow(self):
+        """Stop scheduling jobs after another process took the lead"""
+        logger.warning("This process no longer leads the scheduler; stopping scheduled jobs")
+        self.is_leader = False
+        schedule.clear()
+        self.scheduled = {}
+
+    def status(self):
+        """Whether this process runs the scheduler, who leads it and the state of every job"""
+        return {
+            "scheduler_service_running": self.is_running,
+            "leader": self.lease.status(),
+            "jobs": self.executor.status()
+        }
+
     def fetch_articles(self):
         """Fetch new articles from all categories and arXiv with increased count"""
         try:
             logger.info("Running scheduled task: fetch_articles")
             
+            # Fetch categories and arXiv listings concurrently when possible
+            if self.async_ingest_service:
+                self.async_ingest_service.refresh(modules=False, keywords=False, arxiv_categories=not self.oai_harvest_service)
+                logger.info(f"Completed fetching articles at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                return True
+            
             # Fetch more news articles for each category
             for category in ARTICLE_CATEGORIES:
                 try:
                     logger.info(f"Fetching articles for category: {category}")
                     # Fetch more articles per category
-                    self.article_service.fetch_and_store_articles(category=category, count=20)
+                    self.article_service.fetch_and_store_articles(category=category, count=20, job="categories")
                 except Exception as e:
                     logger.error(f"Error fetching articles for category {category}: {str(e)}")
             
-            # Fetch arXiv papers if service is available
-            if self.arxiv_service:
+            # Fetch arXiv papers if service is available (the OAI-PMH harvest covers them otherwise)
+            if self.arxiv_service and not self.oai_harvest_service:
                 try:
                     for category in ARXIV_CS_CATEGORIES:
                         logger.info(f"Fetching arXiv papers for category: {category}")
@@ -107,48 +261,55 @@ class SchedulerService:
         try:
             logger.info("Running scheduled task: fetch_targeted_content_for_modules")
             
-            # Get all modules
+            # Get all modules, the ones with the fewest fresh relevant articles first
             from utils.db_utils import modules_collection
-            modules = list(modules_collection.find({}))
+            modules = self.article_service.order_modules_by_need(list(modules_collection.find({})))
+            
+            # Skip the searches an interrupted run already made
+            progress, record = self._progress("fetch_targeted_content_for_modules")
             
             total_articles = 0
             total_papers = 0
             
-            # For each module, fetch relevant content
+            # Fetch every module's news searches concurrently when possible,
+            # otherwise as one plan of packed keyword queries
+            article_counts = {}
+            if self.async_ingest_service:
+                counts = self.async_ingest_service.refresh(
+                    categories=False, keywords=False, modules_list=modules, modules_ordered=True,
+                    done_terms=progress["news_terms"], on_batch=record("news_terms")
+                )
+                total_articles += counts["articles"]
+                article_counts = counts["topics"]
+            elif self.article_service:
+                # Increased count from 10 to 25 for better coverage
+                planner = self.article_service.plan_keyword_searches(modules=modules, module_count=25)
+                planner.exclude(progress["news_terms"])
+                total_articles += self.article_service.fetch_planned_articles(
+                    planner, on_batch=record("news_terms")
+                )
+                article_counts = planner.counts
+            
+            # Fetch papers for all modules with a few combined arXiv queries
+            paper_counts = {}
+            if self.arxiv_service:
+                # Increased count from 10 to 25
+                paper_counts = self.arxiv_service.fetch_papers_for_modules(
+                    modules, max_results=25, years_limit=5,
+                    done_terms=progress["arxiv_terms"], on_batch=record("arxiv_terms")
+                )
+                total_papers += sum(paper_counts.values())
+            
+            # Report what each module received
             for module in modules:
-                module_id = module["_id"]
                 module_name = module.get("name", "Unknown")
-                
-                try:
-                    logger.info(f"Fetching targeted content for module: {module_name}")
-                    
-                    # Fetch relevant news articles for this module
-                    if self.article_service:
-                        # Increased count from 10 to 25 for better coverage
-                        article_count = self.article_service.fetch_module_specific_articles(
-                            module_id=module_id, count=25
-                        )
-                        total_articles += article_count
-                    
-                    # Fetch relevant academic papers for this module
-                    if self.arxiv_service:
-                        # Increased count from 10 to 25
-                        paper_count = self.arxiv_service.fetch_module_specific_papers(
-                            module_id=module_id, 
-                            max_results=25,
-                            years_limit=5
-                        )
-                        total_papers += paper_count
-                        
-                    logger.info(f"Fetched {article_count} articles and {paper_count} papers for module: {module_name}")
-                    
-                except Exception as e:
-                    logger.error(f"Error fetching content for module {module_name}: {str(e)}")
+                article_count = article_counts.get(module["_id"], 0)
+                paper_count = paper_counts.get(module["_id"], 0)
+                logger.info(f"Fetched {article_count} articles and {paper_count} papers for module: {module_name}")
             
             # Update embeddings for the new content
             if total_articles > 0 or total_papers > 0:
-                self.update_article_embeddings()
-                self.update_relevance_scores()
+                self.refresh_scores()
                 
             logger.info(f"Completed fetching targeted content: {total_articles} articles, {total_papers} papers")
             return True
@@ -161,34 +322,44 @@ class SchedulerService:
         try:
             logger.info("Running scheduled task: fetch_general_keyword_content")
             
+            # Skip the searches an interrupted run already made
+            progress, record = self._progress("fetch_general_keyword_content")
+            
             total_articles = 0
             total_papers = 0
             
-            # First, fetch from the predefined general CS keywords
+            # Fetch the keyword news searches concurrently when possible,
+            # otherwise as one plan of packed keyword queries
+            article_counts = {}
+            if self.async_ingest_service:
+                counts = self.async_ingest_service.refresh(
+                    categories=False, modules=False,
+                    done_terms=progress["news_terms"], on_batch=record("news_terms")
+                )
+                total_articles += counts["articles"]
+                article_counts = counts["topics"]
+            elif self.article_service:
+                planner = self.article_service.plan_keyword_searches(keywords=GENERAL_CS_KEYWORDS, keyword_count=30)
+                planner.exclude(progress["news_terms"])
+                total_articles += self.article_service.fetch_planned_articles(
+                    planner, on_batch=record("news_terms")
+                )
+                article_counts = planner.counts
+            
+            # Fetch papers for all keywords with a few combined arXiv queries
+            paper_counts = {}
+            if self.arxiv_service:
+                paper_counts = self.arxiv_service.fetch_papers_for_topics(
+                    {keyword: [keyword] for keyword in GENERAL_CS_KEYWORDS}, max_results=30, years_limit=5,
+                    done_terms=progress["arxiv_terms"], on_batch=record("arxiv_terms")
+                )
+                total_papers += sum(paper_counts.values())
+            
+            # Report what each predefined general CS keyword received
             for keyword in GENERAL_CS_KEYWORDS:
-                try:
-                    logger.info(f"Fetching content for keyword: {keyword}")
-                    
-                    # Fetch news articles
-                    if self.article_service:
-                        article_count = self.article_service.fetch_targeted_articles(
-                            keywords=keyword, count=30
-                        )
-                        total_articles += article_count
-                    
-                    # Fetch arXiv papers
-                    if self.arxiv_service:
-                        paper_count = self.arxiv_service.fetch_targeted_papers(
-                            keywords=keyword, 
-                            max_results=30,
-                            years_limit=5
-                        )
-                        total_papers += paper_count
-                        
-                    logger.info(f"Fetched {article_count} articles and {paper_count} papers for keyword: {keyword}")
-                    
-                except Exception as e:
-                    logger.error(f"Error fetching content for keyword {keyword}: {str(e)}")
+                article_count = article_counts.get(keyword, 0)
+                paper_count = paper_counts.get(keyword, 0)
+                logger.info(f"Fetched {article_count} articles and {paper_count} papers for keyword: {keyword}")
             
             # Now try to extract additional trending keywords from top articles
             try:
@@ -234,7 +405,7 @@ class SchedulerService:
                         
                         if self.article_service:
                             article_count = self.article_service.fetch_targeted_articles(
-                                keywords=trending_keywords[:5], count=25
+                                keywords=trending_keywords[:5], count=25, job="keywords"
                             )
                             total_articles += article_count
                         
@@ -249,8 +420,7 @@ class SchedulerService:
             
             # Update embeddings for the new content
             if total_articles > 0 or total_papers > 0:
-                self.update_article_embeddings()
-                self.update_relevance_scores()
+                self.refresh_scores()
                 
             logger.info(f"Completed fetching keyword content: {total_articles} articles, {total_papers} papers")
             return True
@@ -258,14 +428,54 @@ class SchedulerService:
             logger.error(f"Error in fetch_general_keyword_content task: {str(e)}")
             return False
 
+    def harvest_arxiv(self):
+        """Harvest arXiv papers added or revised since the last harvest"""
+        try:
+            logger.info("Running scheduled task: harvest_arxiv")
+            counts = self.oai_harvest_service.harvest_all()
+            
+            if sum(counts.values()) > 0:
+                self.refresh_scores()
+                
+            logger.info(f"Completed harvesting arXiv: {counts}")
+            return True
+        except Exception as e:
+            logger.error(f"Error in harvest_arxiv task: {str(e)}")
+            return False
+
+    def refresh_all_content(self):
+        """Fetch categories, module searches and keyword searches in one concurrent refresh"""
+        try:
+            logger.info("Running task: refresh_all_content")
+            started_at = datetime.now()
+            counts = self.async_ingest_service.refresh(arxiv_categories=not self.oai_harvest_service)
+            
+            # The refresh covers the three fetch jobs, so none of them is due again until its interval passes
+            for name in ["fetch_articles", "fetch_targeted_content_for_modules", "fetch_general_keyword_content"]:
+                self.executor.record_success(name, started_at)
+            
+            if counts["articles"] > 0 or counts["papers"] > 0:
+                self.refresh_scores()
+                
+            logger.info(f"Completed refreshing content: {counts['articles']} articles, {counts['papers']} papers")
+            return True
+        except Exception as e:
+            logger.error(f"Error in refresh_all_content task: {str(e)}")
+            return False
+
     def update_article_embeddings(self):
         """Update embeddings for recently added articles and papers with increased time range"""
         try:
             logger.info("Running scheduled task: update_article_embeddings")
             # Increase days from 1 to 7 to ensure older articles get embeddings too
-            self.embedding_service.update_recent_article_embeddings(days=7)
+            count = self.embedding_service.update_recent_article_embeddings(days=7)
             logger.info(f"Completed updating article embeddings at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            return True
+            
+            # Rescore once new content has its embeddings
+            if self.score_after_embedding.is_set():
+                self.score_after_embedding.clear()
+                self.trigger("update_relevance_scores")
+            return count
         except Exception as e:
             logger.error(f"Error in update_article_embeddings task: {str(e)}")
             return False
@@ -274,9 +484,13 @@ class SchedulerService:
         """Update embeddings for all modules"""
         try:
             logger.info("Running scheduled task: update_module_embeddings")
-            self.embedding_service.update_all_module_embeddings()
+            count = self.embedding_service.update_all_module_embeddings()
             logger.info(f"Completed updating module embeddings at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            return True
+            
+            # Scores against the old module vectors are stale now
+            if count:
+                self.trigger("update_relevance_scores")
+            return count
         except Exception as e:
             logger.error(f"Error in update_module_embeddings task: {str(e)}")
             return False
@@ -285,9 +499,62 @@ class SchedulerService:
         """Update relevance scores between modules and articles/papers with increased processing"""
         try:
             logger.info("Running scheduled task: update_relevance_scores")
-            self.embedding_service.update_relevance_scores()
+            count = self.embedding_service.update_relevance_scores()
             logger.info(f"Completed updating relevance scores at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            return True
+            return count
         except Exception as e:
             logger.error(f"Error in update_relevance_scores task: {str(e)}")
+            return False
+
+    def update_also_read(self):
+        """Incrementally update "also read" neighbours from new interactions"""
+        try:
+            logger.info("Running scheduled task: update_also_read")
+            count = self.cooccurrence_service.update_incremental()
+            logger.info(f"Completed updating also-read neighbours for {count} articles")
+            return count
+        except Exception as e:
+            logger.error(f"Error in update_also_read task: {str(e)}")
+            return False
+
+    def rebuild_also_read(self):
+        """Rebuild "also read" neighbours from the full interaction history"""
+        try:
+            logger.info("Running scheduled task: rebuild_also_read")
+            count = self.cooccurrence_service.build_neighbours()
+            logger.info(f"Completed rebuilding also-read neighbours for {count} articles")
+            return count
+        except Exception as e:
+            logger.error(f"Error in rebuild_also_read task: {str(e)}")
+            return False
+
+    def save_search_index(self):
+        """Snapshot the search index to disk if it changed"""
+        try:
+            self.search_index_service.save_if_dirty()
+            return True
+        except Exception as e:
+            logger.error(f"Error in save_search_index task: {str(e)}")
+            return False
+
+    def rebuild_search_index(self):
+        """Rebuild the search index from MongoDB, dropping superseded postings"""
+        try:
+            logger.info("Running scheduled task: rebuild_search_index")
+            count = self.search_index_service.rebuild()
+            logger.info(f"Completed rebuilding search index with {count} documents")
+            return count
+        except Exception as e:
+            logger.error(f"Error in rebuild_search_index task: {str(e)}")
+            return False
+
+    def rebuild_suggestions(self):
+        """Rebuild typeahead suggestions with fresh popularity counts"""
+        try:
+            logger.info("Running scheduled task: rebuild_suggestions")
+            count = self.suggest_service.build()
+            logger.info(f"Completed rebuilding {count} suggestions")
+            return count
+        except Exception as e:
+            logger.error(f"Error in rebuild_suggestions task: {str(e)}")
             return False
\ No newline at end of file
@@ -0,0 +1,399 @@
+# In-process BM25 inverted index over article titles, descriptions and content
+import logging
+import math
+import os
+import pickle
+import re
+import heapq
+import threading
+import numpy as np
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from utils.db_utils import articles_collection
+from config import SEARCH_INDEX_PATH, SEARCH_FIELD_BOOSTS, BM25_K1, BM25_B, SEARCH_POSTINGS_CACHE_MB
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FIELDS = ("title", "description", "content")
+SNAPSHOT_VERSION = 1
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with"
+}
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Split text into lower-cased index terms"""
+    if not text or not isinstance(text, str):
+        return []
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def _append_varint(buffer, value):
+    """Append an unsigned integer to a bytearray as a LEB128 varint"""
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _decode_postings(data, previous_doc=0):
+    """Decode posting list bytes into an (n, 4) array of (doc, title tf, description tf, content tf)
+
+    Each posting is stored as four varints: the doc number as a delta from the
+    previous posting, then the term frequency in each field. All varints are
+    decoded at once with NumPy rather than byte by byte.
+
+    Args:
+        data (bytes): Whole postings, e.g. the tail appended since an earlier decode
+        previous_doc (int): Doc number of the posting just before ``data``
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    if not len(data):
+        return np.zeros((0, 4), dtype=np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = 7 * (np.arange(len(data)) - np.repeat(starts, ends - starts + 1))
+    values = np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts).reshape(-1, 4)
+    values[:, 0] = previous_doc + np.cumsum(values[:, 0])
+    return values
+
+
+def _take(values, rows):
+    """Gather rows of an array.array or bytearray without copying the whole of it
+
+    The NumPy view is dropped before returning, so the buffer can grow again.
+    """
+    view = np.frombuffer(values, dtype=np.uint8 if isinstance(values, bytearray) else values.typecode)
+    return view[rows]
+
+
+class SearchIndexService:
+    def __init__(self, path=SEARCH_INDEX_PATH, field_boosts=SEARCH_FIELD_BOOSTS, k1=BM25_K1, b=BM25_B,
+                 postings_cache_mb=SEARCH_POSTINGS_CACHE_MB):
+        """Initialize an empty index (call load_or_build to populate it)"""
+        self.path = path
+        self.field_boosts = [field_boosts.get(field, 1.0) for field in FIELDS]
+        self.k1 = k1
+        self.b = b
+        self.postings_cache_bytes = postings_cache_mb * 1024 * 1024
+        self._lock = threading.RLock()
+        self._rebuild_buffer = None  # Documents added while a rebuild reads the collection
+        self._reset()
+        logger.info("Initialized search index service")
+
+    def _reset(self):
+        """Clear all index structures"""
+        self.doc_ids = []                      # doc number -> article ObjectId
+        self.doc_numbers = {}                  # article ObjectId -> current doc number
+        self.deleted = bytearray()             # 1 for doc numbers superseded by a re-index
+        self.published = array("d")            # doc number -> published_at timestamp
+        self.field_lengths = [array("I") for _ in FIELDS]
+        self.field_totals = [0] * len(FIELDS)
+        self.postings = {}                     # term -> bytearray of varint postings
+        self.last_doc = {}                     # term -> last doc number in its posting list
+        self.live_docs = 0
+        self.dirty = False
+        self._clear_postings_cache()
+
+    def _clear_postings_cache(self):
+        """Drop the decoded posting lists (the postings they came from are being replaced)"""
+        self.postings_cache = OrderedDict()    # term -> (bytes decoded, (n, 4) postings array)
+        self.postings_cache_size = 0
+
+    def add_documents(self, documents):
+        """Add or re-index stored articles (usable directly as an ingest listener)"""
+        with self._lock:
+            if self._rebuild_buffer is not None:
+                # The rebuild's snapshot may predate these; replay them once it is swapped in
+                self._rebuild_buffer.extend(documents)
+            for doc in documents:
+                self._add_document(doc)
+            self.dirty = True
+
+    def _add_document(self, doc):
+        """Append one document to the index, superseding any earlier version"""
+        article_id = doc.get("_id")
+        if article_id is None:
+            return
+        if isinstance(article_id, str):
+            article_id = ObjectId(article_id)
+
+        previous = self.doc_numbers.get(article_id)
+        if previous is not None:
+            self._delete_doc_number(previous)
+
+        field_counts = []
+        for i, field in enumerate(FIELDS):
+            counts = {}
+            tokens = tokenize(doc.get(field))
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            field_counts.append(counts)
+            self.field_lengths[i].append(len(tokens))
+            self.field_totals[i] += len(tokens)
+
+        doc_number = len(self.doc_ids)
+        self.doc_ids.append(article_id)
+        self.doc_numbers[article_id] = doc_number
+        self.deleted.append(0)
+        published_at = doc.get("published_at")
+        self.published.append(published_at.timestamp() if isinstance(published_at, datetime) else 0.0)
+        self.live_docs += 1
+
+        terms = set()
+        for counts in field_counts:
+            terms.update(counts)
+        for term in terms:
+            buffer = self.postings.get(term)
+            if buffer is None:
+                buffer = self.postings[term] = bytearray()
+                previous_doc = 0
+            else:
+                previous_doc = self.last_doc[term]
+            _append_varint(buffer, doc_number - previous_doc)
+            for counts in field_counts:
+                _append_varint(buffer, counts.get(term, 0))
+            self.last_doc[term] = doc_number
+
+    def _delete_doc_number(self, doc_number):
+        """Tombstone a doc number; its postings are skipped until the next rebuild"""
+        if self.deleted[doc_number]:
+            return
+        self.deleted[doc_number] = 1
+        self.live_docs -= 1
+        for i in range(len(FIELDS)):
+            self.field_totals[i] -= self.field_lengths[i][doc_number]
+
+    def _decoded_postings(self, term):
+        """Decoded posting list of a term, cached for recently queried terms
+
+        Posting lists only ever grow at the end, so a cached list is extended
+        by decoding just the postings appended since (caller holds the lock).
+        """
+        buffer = self.postings.get(term)
+        if not buffer:
+            return None
+        cached = self.postings_cache.pop(term, None)
+        if cached is None:
+            decoded_bytes, postings = 0, None
+        else:
+            decoded_bytes, postings = cached
+            self.postings_cache_size -= postings.nbytes
+        if decoded_bytes < len(buffer):
+            previous_doc = int(postings[-1, 0]) if postings is not None and len(postings) else 0
+            tail = _decode_postings(buffer[decoded_bytes:], previous_doc)
+            postings = tail if postings is None else np.concatenate((postings, tail))
+
+        if postings.nbytes <= self.postings_cache_bytes:
+            self.postings_cache[term] = (len(buffer), postings)
+            self.postings_cache_size += postings.nbytes
+            while self.postings_cache_size > self.postings_cache_bytes:
+                _, (_, evicted) = self.postings_cache.popitem(last=False)
+                self.postings_cache_size -= evicted.nbytes
+        return postings
+
+    def search(self, query, limit=20, skip=0, after=None):
+        """Rank live documents for a query with BM25F
+
+        Args:
+            query (str): Free-text query
+            limit (int): Number of results
+            skip (int): Number of leading results to skip (ignored with ``after``)
+            after (tuple): (score, published_at, article ObjectId) of the last result
+                of the previous page; only results ranking below it are returned
+
+        Returns:
+            list: (article ObjectId, score) pairs, best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            if not self.live_docs:
+                return []
+            averages = [max(total / self.live_docs, 1.0) for total in self.field_totals]
+            term_docs = []
+            term_scores = []
+            for term in terms:
+                postings = self._decoded_postings(term)
+                if postings is None:
+                    continue
+                # Document frequency counts live postings only, so superseded versions never skew idf
+                postings = postings[_take(self.deleted, postings[:, 0]) == 0]
+                df = len(postings)
+                if not df:
+                    continue
+                idf = math.log(1 + (self.live_docs - df + 0.5) / (df + 0.5))
+                docs = postings[:, 0]
+                weighted_tf = np.zeros(df)
+                for i in range(len(FIELDS)):
+                    norm = 1 - self.b + self.b * _take(self.field_lengths[i], docs) / averages[i]
+                    weighted_tf += self.field_boosts[i] * postings[:, i + 1] / norm
+                term_docs.append(docs)
+                term_scores.append(idf * weighted_tf / (self.k1 + weighted_tf))
+            if not term_docs:
+                return []
+
+            # Sum each document's per-term scores
+            docs, inverse = np.unique(np.concatenate(term_docs), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(term_scores))
+
+            if after:
+                last_score, last_published, last_id = after
+                last_key = (last_score, last_published.timestamp() if isinstance(last_published, datetime) else 0.0, last_id)
+                below = scores < last_score
+                for row in np.flatnonzero(scores == last_score):
+                    doc = int(docs[row])
+                    below[row] = (self.published[doc], self.doc_ids[doc]) < last_key[1:]
+                docs, scores = docs[below], scores[below]
+                skip = 0
+
+            # Only documents scoring at least the page's lowest score need a full sort key
+            count = skip + limit
+            if len(scores) > count:
+                keep = scores >= np.partition(scores, len(scores) - count)[len(scores) - count]
+                docs, scores = docs[keep], scores[keep]
+            ranked = (
+                (float(score), self.published[doc], self.doc_ids[doc])
+                for doc, score in zip(docs.tolist(), scores.tolist())
+            )
+            top = heapq.nlargest(count, ranked)[skip:]
+            return [(article_id, score) for score, _, article_id in top]
+
+    def rebuild(self, batch_size=1000):
+        """Rebuild the whole index from the articles collection and snapshot it"""
+        try:
+            started = datetime.now()
+            with self._lock:
+                self._rebuild_buffer = []
+            fresh = SearchIndexService(path=self.path, k1=self.k1, b=self.b)
+            fresh.field_boosts = self.field_boosts
+            projection = {field: 1 for field in FIELDS}
+            projection["published_at"] = 1
+            cursor = articles_collection.find({}, projection).sort("_id", 1).batch_size(batch_size)
+            for doc in cursor:
+                fresh._add_document(doc)
+
+            with self._lock:
+                state = fresh._state()
+                self._load_state(state)
+                # Documents stored while the collection was read may be missing from it
+                for doc in self._rebuild_buffer:
+                    self._add_document(doc)
+                self._rebuild_buffer = None
+                self.dirty = True
+            self.save()
+
+            elapsed = (datetime.now() - started).total_seconds()
+            logger.info(f"Rebuilt search index with {self.live_docs} documents and {len(self.postings)} terms in {elapsed:.1f}s")
+            return self.live_docs
+        except Exception as e:
+            with self._lock:
+                self._rebuild_buffer = None
+            logger.error(f"Error rebuilding search index: {str(e)}")
+            return 0
+
+    def _state(self):
+        """Collect the index structures for a snapshot"""
+        return {
+            "version": SNAPSHOT_VERSION,
+            "doc_ids": self.doc_ids,
+            "deleted": self.deleted,
+            "published": self.published,
+            "field_lengths": self.field_lengths,
+            "field_totals": self.field_totals,
+            "postings": self.postings,
+            "last_doc": self.last_doc,
+            "live_docs": self.live_docs
+        }
+
+    def _load_state(self, state):
+        """Replace the index structures with a snapshot's"""
+        self.doc_ids = state["doc_ids"]
+        self.deleted = state["deleted"]
+        self.published = state["published"]
+        self.field_lengths = state["field_lengths"]
+        self.field_totals = state["field_totals"]
+        self.postings = state["postings"]
+        self.last_doc = state["last_doc"]
+        self.live_docs = state["live_docs"]
+        self._clear_postings_cache()
+        self.doc_numbers = {
+            article_id: doc for doc, article_id in enumerate(self.doc_ids) if not self.deleted[doc]
+        }
+
+    def save(self):
+        """Write a snapshot of the index to disk (atomically replacing the previous one)"""
+        try:
+            with self._lock:
+                state = self._state()
+                state["saved_at"] = datetime.now()
+                payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+                self.dirty = False
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+            logger.info(f"Saved search index snapshot to {self.path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving search index snapshot: {str(e)}")
+            return False
+
+    def save_if_dirty(self):
+        """Snapshot the index only if documents were added since the last save"""
+        if self.dirty:
+            return self.save()
+        return False
+
+    def load(self):
+        """Load the snapshot from disk; returns False if there is none or it is unusable"""
+        try:
+            if not os.path.exists(self.path):
+                return False
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") != SNAPSHOT_VERSION:
+                logger.warning("Search index snapshot has an old format, ignoring it")
+                return False
+            with self._lock:
+                self._load_state(state)
+                self.dirty = False
+            logger.info(f"Loaded search index snapshot with {self.live_docs} documents")
+            self._catch_up(state.get("saved_at"))
+            return True
+        except Exception as e:
+            logger.error(f"Error loading search index snapshot: {str(e)}")
+            return False
+
+    def _catch_up(self, saved_at):
+        """Index articles stored after the snapshot was written
+
+        Stored timestamps mix UTC and local time, so a day of overlap is
+        re-indexed; re-adding a document simply supersedes its old postings.
+        """
+        if not saved_at:
+            return
+        projection = {field: 1 for field in FIELDS}
+        projection["published_at"] = 1
+        cursor = articles_collection.find(
+            {"updated_at": {"$gte": saved_at - timedelta(days=1)}}, projection
+        ).batch_size(1000)
+        documents = list(cursor)
+        if documents:
+            self.add_documents(documents)
+            logger.info(f"Indexed {len(documents)} articles stored since the search index snapshot")
+
+    def load_or_build(self):
+        """Load the on-disk snapshot, building the index from MongoDB if there is none"""
+        if not self.load():
+            self.rebuild()
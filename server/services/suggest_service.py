@@ -0,0 +1,272 @@
+# Typeahead suggestions over module names, codes, keywords, article titles and categories
+import logging
+import math
+import re
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from utils.db_utils import (
+    articles_collection, modules_collection, interactions_collection,
+    users_collection, starred_modules_collection
+)
+from config import (
+    SUGGEST_MAX_ARTICLES, SUGGEST_POPULARITY_DAYS, SUGGEST_CACHED_PREFIX_LENGTH,
+    SUGGEST_CACHED_TOP, SUGGEST_MAX_PENDING, SUGGEST_KIND_WEIGHTS
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Keys are matched on their first characters only, so long titles are cut short
+MAX_KEY_LENGTH = 64
+# Suggestions also match from the start of later words ("neural" finds "Graph neural networks")
+MAX_WORD_STARTS = 6
+NON_KEY_CHARS = re.compile(r"[^a-z0-9.+# ]+")
+SKIP_WORDS = {"a", "an", "and", "for", "in", "of", "on", "the", "to", "with"}
+
+
+def normalize(text):
+    """Lower-case text and collapse punctuation and whitespace"""
+    if not text or not isinstance(text, str):
+        return ""
+    return " ".join(NON_KEY_CHARS.sub(" ", text.lower()).split())
+
+
+def suggestion_keys(text):
+    """Return the lookup keys for a suggestion: the whole text and each later word start"""
+    words = normalize(text).split()
+    keys = []
+    for i, word in enumerate(words[:MAX_WORD_STARTS]):
+        if i and word in SKIP_WORDS:
+            continue
+        keys.append(" ".join(words[i:])[:MAX_KEY_LENGTH])
+    return keys
+
+
+class SuggestService:
+    def __init__(self, max_articles=SUGGEST_MAX_ARTICLES, popularity_days=SUGGEST_POPULARITY_DAYS):
+        """Initialize an empty suggestion index (call build to populate it)"""
+        self.max_articles = max_articles
+        self.popularity_days = popularity_days
+        self._lock = threading.Lock()
+        self._entries = []             # entry index -> (text, kind, score, id, detail)
+        self._refs = {}                # (kind, id or normalized text) -> entry index
+        self._keys = []                # sorted lookup keys
+        self._key_entries = array("i") # entry index for each key
+        self._top_by_prefix = {}       # short prefix -> best entry indexes
+        self._pending = []             # sorted (key, entry index) added since the last indexing
+        logger.info("Initialized suggest service")
+
+    def _score(self, kind, popularity):
+        """Rank score for a suggestion: kind weight scaled by damped popularity"""
+        return SUGGEST_KIND_WEIGHTS.get(kind, 0.5) * (1.0 + math.log1p(max(popularity, 0)))
+
+    def _add_entry(self, entries, refs, text, kind, popularity, entry_id=None, detail=None):
+        """Append one suggestion unless it is already present; returns its index or None"""
+        if not text or not isinstance(text, str):
+            return None
+        ref = (kind, entry_id if entry_id is not None else normalize(text))
+        if ref in refs:
+            return None
+        refs[ref] = len(entries)
+        entries.append((text.strip(), kind, self._score(kind, popularity), entry_id, detail))
+        return refs[ref]
+
+    def _module_popularity(self):
+        """Count enrolments plus stars for each module"""
+        popularity = {}
+        pipeline = [
+            {"$unwind": "$modules"},
+            {"$group": {"_id": "$modules", "count": {"$sum": 1}}}
+        ]
+        for doc in users_collection.aggregate(pipeline):
+            popularity[doc["_id"]] = popularity.get(doc["_id"], 0) + doc["count"]
+        pipeline = [{"$group": {"_id": "$module_id", "count": {"$sum": 1}}}]
+        for doc in starred_modules_collection.aggregate(pipeline):
+            popularity[doc["_id"]] = popularity.get(doc["_id"], 0) + doc["count"]
+        return popularity
+
+    def _collect(self):
+        """Load every suggestion source from MongoDB into a fresh entry list"""
+        entries = []
+        refs = {}
+
+        # Modules by name, with their code as an extra key; keywords inherit module popularity
+        module_popularity = self._module_popularity()
+        keyword_popularity = {}
+        keyword_text = {}
+        for module in modules_collection.find({}, {"name": 1, "code": 1, "keywords": 1}):
+            popularity = module_popularity.get(module["_id"], 0)
+            self._add_entry(entries, refs, module.get("name"), "module", popularity,
+                            str(module["_id"]), module.get("code"))
+            for keyword in module.get("keywords") or []:
+                key = normalize(keyword)
+                if key:
+                    keyword_text.setdefault(key, keyword)
+                    keyword_popularity[key] = keyword_popularity.get(key, 0) + popularity
+        for key, popularity in keyword_popularity.items():
+            self._add_entry(entries, refs, keyword_text[key], "keyword", popularity)
+
+        # Categories by how many stored articles carry them
+        pipeline = [
+            {"$unwind": "$categories"},
+            {"$group": {"_id": "$categories", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": 1000}
+        ]
+        for doc in articles_collection.aggregate(pipeline, allowDiskUse=True):
+            self._add_entry(entries, refs, doc["_id"], "category", doc["count"])
+
+        # The most interacted-with articles, topped up with the newest ones
+        since = datetime.now() - timedelta(days=self.popularity_days)
+        pipeline = [
+            {"$match": {"created_at": {"$gte": since}}},
+            {"$group": {"_id": "$article_id", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": self.max_articles}
+        ]
+        article_popularity = {doc["_id"]: doc["count"] for doc in interactions_collection.aggregate(pipeline, allowDiskUse=True)}
+        projection = {"title": 1, "source_name": 1}
+        for article in articles_collection.find({"_id": {"$in": list(article_popularity)}}, projection):
+            self._add_entry(entries, refs, article.get("title"), "article",
+                            article_popularity[article["_id"]], str(article["_id"]), article.get("source_name"))
+        remaining = self.max_articles - len(article_popularity)
+        if remaining > 0:
+            recent = articles_collection.find({}, projection).sort("published_at", -1).limit(remaining)
+            for article in recent:
+                self._add_entry(entries, refs, article.get("title"), "article", 0,
+                                str(article["_id"]), article.get("source_name"))
+
+        return entries, refs
+
+    def _index(self, entries):
+        """Build the sorted key arrays and short-prefix top lists for an entry list"""
+        pairs = []
+        for idx, entry in enumerate(entries):
+            keys = suggestion_keys(entry[0])
+            if entry[1] == "module" and entry[4]:
+                keys.extend(suggestion_keys(entry[4]))  # Modules are also found by code
+            pairs.extend((key, idx) for key in set(keys))
+        pairs.sort()
+
+        keys = [key for key, _ in pairs]
+        key_entries = array("i", (idx for _, idx in pairs))
+
+        # Precompute the best entries for the shortest prefixes, whose key ranges are largest
+        prefix_candidates = {}
+        for key, idx in pairs:
+            for length in range(1, min(len(key), SUGGEST_CACHED_PREFIX_LENGTH) + 1):
+                prefix_candidates.setdefault(key[:length], set()).add(idx)
+        top_by_prefix = {
+            prefix: heapq.nlargest(SUGGEST_CACHED_TOP, candidates, key=lambda i: entries[i][2])
+            for prefix, candidates in prefix_candidates.items()
+        }
+        return keys, key_entries, top_by_prefix
+
+    def build(self):
+        """Rebuild all suggestions from MongoDB and swap them in
+
+        Returns:
+            int: Number of suggestions indexed
+        """
+        try:
+            started = datetime.now()
+            entries, refs = self._collect()
+            keys, key_entries, top_by_prefix = self._index(entries)
+            with self._lock:
+                self._entries = entries
+                self._refs = refs
+                self._keys = keys
+                self._key_entries = key_entries
+                self._top_by_prefix = top_by_prefix
+                self._pending = []
+            elapsed = (datetime.now() - started).total_seconds()
+            logger.info(f"Built {len(entries)} suggestions with {len(keys)} keys in {elapsed:.1f}s")
+            return len(entries)
+        except Exception as e:
+            logger.error(f"Error building suggestions: {str(e)}")
+            return 0
+
+    def add_documents(self, documents):
+        """Add titles and categories of freshly stored articles (usable as an ingest listener)
+
+        New keys go into a small sorted pending list that is searched alongside
+        the main arrays, and are folded into them once it grows past
+        SUGGEST_MAX_PENDING.
+        """
+        with self._lock:
+            for doc in documents:
+                new_entries = [self._add_entry(self._entries, self._refs, doc.get("title"), "article", 0,
+                                               str(doc["_id"]) if doc.get("_id") else None, doc.get("source_name"))]
+                for category in doc.get("categories") or []:
+                    new_entries.append(self._add_entry(self._entries, self._refs, category, "category", 1))
+                for idx in new_entries:
+                    if idx is None:
+                        continue
+                    for key in set(suggestion_keys(self._entries[idx][0])):
+                        insort(self._pending, (key, idx))
+
+            if len(self._pending) > SUGGEST_MAX_PENDING:
+                self._keys, self._key_entries, self._top_by_prefix = self._index(self._entries)
+                self._pending = []
+
+    def suggest(self, query, limit=10, kinds=None):
+        """Return the most popular suggestions whose text (or a later word of it) starts with the query
+
+        Args:
+            query (str): Partial text typed by the user
+            limit (int): Maximum number of suggestions
+            kinds (list): Optional subset of "module", "keyword", "category", "article"
+
+        Returns:
+            list: Suggestion dicts with text, type, score and, where known, id and detail
+        """
+        try:
+            prefix = normalize(query)[:MAX_KEY_LENGTH]
+            if not prefix or limit <= 0:
+                return []
+
+            with self._lock:
+                entries = self._entries
+                keys = self._keys
+                key_entries = self._key_entries
+                cached = self._top_by_prefix.get(prefix) if len(prefix) <= SUGGEST_CACHED_PREFIX_LENGTH else None
+                lo = bisect_left(self._pending, (prefix,))
+                hi = bisect_left(self._pending, (prefix + "\uffff",))
+                candidates = set(idx for _, idx in self._pending[lo:hi])
+
+            def wanted(idx):
+                return not kinds or entries[idx][1] in kinds
+
+            # A cached list answers the query unless filtering left it short of a full page
+            cached_hits = [idx for idx in cached or [] if wanted(idx)]
+            if cached is not None and (len(cached_hits) >= limit or len(cached) < SUGGEST_CACHED_TOP):
+                candidates.update(cached_hits)
+            else:
+                lo = bisect_left(keys, prefix)
+                hi = bisect_left(keys, prefix + "\uffff")
+                candidates.update(idx for idx in key_entries[lo:hi] if wanted(idx))
+            candidates = [idx for idx in candidates if wanted(idx)]
+
+            results = []
+            seen = set()
+            for idx in heapq.nlargest(limit * 2, candidates, key=lambda i: (entries[i][2], -len(entries[i][0]))):
+                text, kind, score, entry_id, detail = entries[idx]
+                if (kind, text.lower()) in seen:
+                    continue
+                seen.add((kind, text.lower()))
+                suggestion = {"text": text, "type": kind, "score": round(score, 4)}
+                if entry_id is not None:
+                    suggestion["id"] = entry_id
+                if detail:
+                    suggestion["detail"] = detail
+                results.append(suggestion)
+                if len(results) >= limit:
+                    break
+            return results
+        except Exception as e:
+            logger.error(f"Error getting suggestions: {str(e)}")
+            return []
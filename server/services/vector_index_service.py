@@ -0,0 +1,216 @@
+# In-memory article and module embedding matrices
+import logging
+import threading
+import time
+import numpy as np
+from datetime import datetime
+from bson.objectid import ObjectId
+from utils.db_utils import articles_collection, modules_collection
+from config import VECTOR_INDEX_REFRESH_SECONDS, VECTOR_INDEX_FULL_RELOAD_SECONDS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _normalize_rows(matrix):
+    """L2-normalize each row so dot products are cosine similarities"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndexService:
+    def __init__(self, refresh_seconds=VECTOR_INDEX_REFRESH_SECONDS, full_reload_seconds=VECTOR_INDEX_FULL_RELOAD_SECONDS):
+        """Initialize the vector index (loaded lazily on first use)"""
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self._lock = threading.Lock()
+
+        # (article ids, normalized embedding matrix, id -> row) swapped as one snapshot
+        self._articles = ([], np.zeros((0, 0), dtype=np.float32), {})
+        self._loaded_until = None
+        self._last_refresh = 0.0
+        self._last_full_reload = 0.0
+
+        self._modules = ([], np.zeros((0, 0), dtype=np.float32), {})
+        logger.info("Initialized vector index service")
+
+    def _load_articles(self, query):
+        """Load (ids, embedding matrix) for articles matching the query"""
+        ids = []
+        vectors = []
+        cursor = articles_collection.find(query, {"vector_embedding": 1}).batch_size(1000)
+        for article in cursor:
+            if article.get("vector_embedding"):
+                ids.append(article["_id"])
+                vectors.append(article["vector_embedding"])
+        if not vectors:
+            return ids, None
+        return ids, _normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+    def _load_modules(self):
+        """Load all module embeddings"""
+        ids = []
+        vectors = []
+        for module in modules_collection.find({"vector_embedding": {"$ne": None}}, {"vector_embedding": 1}):
+            if module.get("vector_embedding"):
+                ids.append(module["_id"])
+                vectors.append(module["vector_embedding"])
+        matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32)) if vectors else np.zeros((0, 0), dtype=np.float32)
+        self._modules = (ids, matrix, {module_id: idx for idx, module_id in enumerate(ids)})
+
+    def refresh(self, force=False):
+        """Reload the matrices if they are stale
+
+        Between full reloads only articles whose embeddings changed since the
+        last load are fetched and patched into the matrix.
+        """
+        now = time.time()
+        if not force and now - self._last_refresh < self.refresh_seconds:
+            return
+
+        with self._lock:
+            if not force and now - self._last_refresh < self.refresh_seconds:
+                return
+            try:
+                load_started = datetime.now()
+                if force or not self._loaded_until or now - self._last_full_reload >= self.full_reload_seconds:
+                    ids, matrix = self._load_articles({"vector_embedding": {"$ne": None}})
+                    if matrix is None:
+                        matrix = np.zeros((0, 0), dtype=np.float32)
+                    self._articles = (ids, matrix, {article_id: idx for idx, article_id in enumerate(ids)})
+                    self._last_full_reload = now
+                    logger.info(f"Loaded {len(ids)} article embeddings into vector index")
+                else:
+                    ids, matrix = self._load_articles({
+                        "vector_embedding": {"$ne": None},
+                        "updated_at": {"$gte": self._loaded_until}
+                    })
+                    if ids:
+                        self._patch_articles(ids, matrix)
+                        logger.info(f"Patched {len(ids)} article embeddings into vector index")
+
+                self._load_modules()
+                self._loaded_until = load_started
+                self._last_refresh = now
+            except Exception as e:
+                logger.error(f"Error refreshing vector index: {str(e)}")
+
+    def _patch_articles(self, ids, matrix):
+        """Replace existing rows and append new ones (caller holds the lock)"""
+        current_ids, current_matrix, current_rows = self._articles
+        if current_matrix.size == 0:
+            self._articles = (list(ids), matrix, {article_id: idx for idx, article_id in enumerate(ids)})
+            return
+
+        article_matrix = current_matrix.copy()
+        article_ids = list(current_ids)
+        rows = dict(current_rows)
+        new_vectors = []
+        for article_id, vector in zip(ids, matrix):
+            if article_id in rows:
+                article_matrix[rows[article_id]] = vector
+            else:
+                rows[article_id] = len(article_ids)
+                article_ids.append(article_id)
+                new_vectors.append(vector)
+        if new_vectors:
+            article_matrix = np.vstack([article_matrix, np.asarray(new_vectors, dtype=np.float32)])
+
+        # Swap in the new snapshot at once so readers never see a partial update
+        self._articles = (article_ids, article_matrix, rows)
+
+    def add_articles(self, ids, vectors):
+        """Patch freshly computed article embeddings into the index without waiting for a refresh"""
+        if not ids:
+            return
+        with self._lock:
+            self._patch_articles(ids, _normalize_rows(np.asarray(vectors, dtype=np.float32)))
+
+    def get_all_module_vectors(self):
+        """Get (module ids, normalized embedding matrix) for every module with an embedding"""
+        self.refresh()
+        module_ids, module_matrix, _ = self._modules
+        if module_matrix.size == 0:
+            return [], None
+        return module_ids, module_matrix
+
+    def get_article_vector(self, article_id):
+        """Get the normalized embedding of an article, or None if not indexed"""
+        self.refresh()
+        if isinstance(article_id, str):
+            article_id = ObjectId(article_id)
+        _, article_matrix, rows = self._articles
+        row = rows.get(article_id)
+        if row is None:
+            return None
+        return article_matrix[row]
+
+    def get_module_vectors(self, module_ids):
+        """Get (module ids, normalized embedding matrix) for the given modules"""
+        self.refresh()
+        _, module_matrix, module_rows = self._modules
+        found_ids = []
+        rows = []
+        for module_id in module_ids:
+            if isinstance(module_id, str):
+                module_id = ObjectId(module_id)
+            row = module_rows.get(module_id)
+            if row is not None:
+                found_ids.append(module_id)
+                rows.append(row)
+        if not rows:
+            return [], None
+        return found_ids, module_matrix[rows]
+
+    def score_articles(self, vector):
+        """Score every indexed article against a query vector with one matrix-vector product
+
+        Returns:
+            tuple: (list of article ObjectIds, numpy array of cosine scores)
+        """
+        self.refresh()
+        article_ids, article_matrix, _ = self._articles
+        if article_matrix.size == 0:
+            return [], np.zeros(0, dtype=np.float32)
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return article_ids, np.zeros(len(article_ids), dtype=np.float32)
+        return article_ids, article_matrix @ (vector / norm)
+
+    def score_articles_against_modules(self, module_matrix):
+        """Score every indexed article against several module vectors
+
+        Returns:
+            tuple: (list of article ObjectIds, articles x modules cosine score matrix)
+        """
+        self.refresh()
+        article_ids, article_matrix, _ = self._articles
+        if article_matrix.size == 0 or module_matrix is None:
+            return article_ids, None
+        return article_ids, article_matrix @ module_matrix.T
+
+    def score_articles_with_modules(self, vector, module_matrix):
+        """Score every indexed article against a query vector and several module vectors
+
+        Both scores come from the same snapshot of the index, so their rows line
+        up even if a refresh or a pipeline batch swaps the matrix in between.
+
+        Returns:
+            tuple: (list of article ObjectIds, numpy array of cosine scores against
+                the vector, articles x modules cosine score matrix or None)
+        """
+        self.refresh()
+        article_ids, article_matrix, _ = self._articles
+        if article_matrix.size == 0:
+            return [], np.zeros(0, dtype=np.float32), None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector_scores = np.zeros(len(article_ids), dtype=np.float32)
+        else:
+            vector_scores = article_matrix @ (vector / norm)
+        module_scores = article_matrix @ module_matrix.T if module_matrix is not None else None
+        return article_ids, vector_scores, module_scores
@@ -0,0 +1,225 @@
+# Streaming parsers for arXiv API responses
+import io
+import re
+import logging
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from lxml import etree
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV = "{http://arxiv.org/schemas/atom}"
+ENTRY_TAG = f"{ATOM}entry"
+OAI = "{http://www.openarchives.org/OAI/2.0/}"
+RAW = "{http://arxiv.org/OAI/arXivRaw/}"
+OAI_TAGS = (f"{OAI}record", f"{OAI}resumptionToken", f"{OAI}responseDate", f"{OAI}error")
+AUTHOR_SEPARATOR = re.compile(r",\s*(?:and\s+)?|\s+and\s+")
+DESCRIPTION_LENGTH = 300
+
+ARXIV_VERSION = re.compile(r"^(.+?)v(\d+)$")
+
+
+def split_arxiv_id(versioned_id):
+    """Split an arXiv id such as 2401.01234v2 into ("2401.01234", 2); unversioned ids are version 1"""
+    match = ARXIV_VERSION.match(versioned_id)
+    if not match:
+        return versioned_id, 1
+    return match.group(1), int(match.group(2))
+
+
+def parse_iso_datetime(value):
+    """Parse an ISO 8601 timestamp such as 2024-01-02T03:04:05Z into a naive UTC datetime
+
+    Uses the C-implemented datetime.fromisoformat rather than strptime, which
+    is several times slower. Returns None if the value cannot be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if value.endswith("Z"):
+            return datetime.fromisoformat(value[:-1])
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+
+def _release(element):
+    """Free a processed element and the siblings already handled before it"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _entry_paper(entry):
+    """Build a paper dict from one Atom entry, or None if it lacks a title, abstract or id"""
+    title = summary = versioned_id = published = None
+    authors = []
+    categories = []
+    primary = None
+    # One pass over the children instead of a namespaced find per field
+    for child in entry:
+        tag = child.tag
+        if tag == f"{ATOM}title":
+            title = child.text
+        elif tag == f"{ATOM}summary":
+            summary = child.text
+        elif tag == f"{ATOM}id":
+            versioned_id = child.text
+        elif tag == f"{ATOM}published":
+            published = child.text
+        elif tag == f"{ATOM}author":
+            for name in child:
+                if name.tag == f"{ATOM}name" and name.text:
+                    authors.append(name.text)
+        elif tag == f"{ARXIV}primary_category":
+            primary = child.get("term")
+        elif tag == f"{ATOM}category":
+            term = child.get("term")
+            if term and term not in categories:
+                categories.append(term)
+
+    if title is None or summary is None or not versioned_id:
+        return None
+    if primary:
+        if primary in categories:
+            categories.remove(primary)
+        categories.insert(0, primary)
+
+    title = title.strip()
+    summary = summary.strip()
+    arxiv_id, arxiv_version = split_arxiv_id(versioned_id.split("/abs/")[-1])
+    return {
+        "title": title,
+        "description": summary[:DESCRIPTION_LENGTH] + "..." if len(summary) > DESCRIPTION_LENGTH else summary,
+        "content": summary,
+        "url": f"https://arxiv.org/abs/{arxiv_id}",
+        "pdf_url": f"https://arxiv.org/pdf/{arxiv_id}.pdf",
+        "arxiv_id": arxiv_id,
+        "arxiv_version": arxiv_version,
+        "source_name": "arXiv",
+        "authors": authors,
+        "categories": categories,
+        "published_at": parse_iso_datetime(published) or datetime.utcnow(),
+        "source_type": "academic"
+    }
+
+
+def iter_atom_papers(source):
+    """Yield normalized paper dicts from an arXiv Atom feed, one entry at a time
+
+    Entries are released as soon as they are converted, so memory stays flat
+    however many results the response holds.
+
+    Args:
+        source: Response bytes or a binary file-like object (e.g. a streamed response body)
+
+    Raises:
+        lxml.etree.XMLSyntaxError: If the feed is not well-formed XML
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    for _, entry in etree.iterparse(source, events=("end",), tag=ENTRY_TAG, huge_tree=True):
+        paper = _entry_paper(entry)
+        _release(entry)
+        if paper is not None:
+            yield paper
+
+
+def _clean_text(value):
+    """Collapse the line breaks and indentation OAI-PMH puts inside titles and abstracts"""
+    return " ".join(value.split()) if value else value
+
+
+def _rfc2822_datetime(value):
+    """Parse an arXivRaw version date such as "Mon, 2 Apr 2007 19:18:42 GMT" into a naive UTC datetime"""
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+
+def _raw_paper(metadata):
+    """Build a paper dict from an arXivRaw metadata element, or None if it is incomplete"""
+    fields = {}
+    version_dates = []
+    for child in metadata:
+        tag = child.tag
+        if tag == f"{RAW}version":
+            for part in child:
+                if part.tag == f"{RAW}date":
+                    version_dates.append(part.text)
+        elif tag.startswith(RAW):
+            fields[tag[len(RAW):]] = child.text
+
+    title = _clean_text(fields.get("title"))
+    summary = _clean_text(fields.get("abstract"))
+    arxiv_id = (fields.get("id") or "").strip()
+    if not title or not summary or not arxiv_id:
+        return None
+
+    authors = [name.strip() for name in AUTHOR_SEPARATOR.split(_clean_text(fields.get("authors")) or "") if name.strip()]
+    return {
+        "title": title,
+        "description": summary[:DESCRIPTION_LENGTH] + "..." if len(summary) > DESCRIPTION_LENGTH else summary,
+        "content": summary,
+        "url": f"https://arxiv.org/abs/{arxiv_id}",
+        "pdf_url": f"https://arxiv.org/pdf/{arxiv_id}.pdf",
+        "arxiv_id": arxiv_id,
+        # Every revision is listed, so the count is the current version number
+        "arxiv_version": max(len(version_dates), 1),
+        "source_name": "arXiv",
+        "authors": authors,
+        "categories": (fields.get("categories") or "").split(),
+        "published_at": (_rfc2822_datetime(version_dates[0]) if version_dates else None) or datetime.utcnow(),
+        "source_type": "academic"
+    }
+
+
+def iter_oai_papers(source, page):
+    """Yield papers from one OAI-PMH ListRecords page in the arXivRaw format
+
+    Records are converted and released as they stream in; deleted records are
+    skipped. Page-level results are written into the page dict as parsing
+    reaches them: "response_date", "resumption_token" (None once the list is
+    complete), "complete_list_size", "records" (records seen, including
+    skipped ones) and "error" ((code, message) for an OAI-PMH error reply).
+
+    Args:
+        source: Response bytes or a binary file-like object
+        page (dict): Receives the page-level results
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    page.update(response_date=None, resumption_token=None, complete_list_size=None, records=0, error=None)
+    for _, element in etree.iterparse(source, events=("end",), tag=OAI_TAGS, huge_tree=True):
+        tag = element.tag
+        if tag == f"{OAI}record":
+            page["records"] += 1
+            header = element.find(f"{OAI}header")
+            metadata = element.find(f"{OAI}metadata/{RAW}arXivRaw")
+            paper = None
+            if header is not None and header.get("status") != "deleted" and metadata is not None:
+                paper = _raw_paper(metadata)
+            _release(element)
+            if paper is not None:
+                yield paper
+        elif tag == f"{OAI}resumptionToken":
+            page["resumption_token"] = (element.text or "").strip() or None
+            size = element.get("completeListSize")
+            page["complete_list_size"] = int(size) if size and size.isdigit() else None
+        elif tag == f"{OAI}responseDate":
+            page["response_date"] = parse_iso_datetime(element.text)
+        elif tag == f"{OAI}error":
+            page["error"] = (element.get("code"), (element.text or "").strip())
@@ -0,0 +1,69 @@
+# Negotiated gzip/brotli compression for API responses
+import gzip
+import logging
+import brotli
+from flask import request
+from config import COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/x-ndjson", "text/html", "text/css",
+    "text/plain", "application/javascript", "text/javascript"
+}
+
+
+def _choose_encoding():
+    """Pick the best encoding the client accepts: brotli, then gzip"""
+    accepted = request.accept_encodings
+    if accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress_response(response):
+    """Compress a response body in place when the client accepts it and it is large enough
+
+    Streamed responses are passed through untouched: compressing them here
+    would buffer the whole stream.
+    """
+    try:
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code >= 300
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        body = response.get_data()
+        if len(body) < COMPRESSION_MIN_BYTES:
+            return response
+
+        encoding = _choose_encoding()
+        if encoding is None:
+            return response
+
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        # The encoded bytes differ from the identity body, so a strong validator no longer applies
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+    except Exception as e:
+        logger.error(f"Error compressing response: {str(e)}")
+        return response
+
+
+def init_compression(app):
+    """Register response compression on a Flask app"""
+    app.after_request(compress_response)
@@ -3,6 +3,7 @@ import pymongo
 from bson.objectid import ObjectId  # Add this import
 from datetime import datetime
 from config import MONGO_URI, MONGO_DB_NAME
+from utils.pagination import BOOKMARK_SORT, keyset_filter
 
 # Create MongoDB connection
 client = pymongo.MongoClient(MONGO_URI)
@@ -17,6 +18,9 @@ bookmarks_collection = db.bookmarks
 starred_modules_collection = db.starred_modules  # New collection for starred modules
 interactions_collection = db.interactions
 tokens_collection = db.tokens
+article_neighbours_collection = db.article_neighbours  # Precomputed "also read" neighbours
+service_state_collection = db.service_state  # Watermarks and other background job state
+job_runs_collection = db.job_runs  # One record per background job run
 
 def create_sample_cs_modules():
     """Create some sample CS modules if none exist"""
@@ -72,6 +76,7 @@ def create_sample_cs_modules():
         ]
         
         modules_collection.insert_many(modules)
+        bump_data_version(MODULES_VERSION)
         print(f"Created {len(modules)} sample modules")
 
 def create_indexes():
@@ -80,7 +85,20 @@ def create_indexes():
     articles_collection.create_index([("url", pymongo.ASCENDING)], unique=True)
     articles_collection.create_index([("title", pymongo.TEXT), ("content", pymongo.TEXT), ("description", pymongo.TEXT)])
     articles_collection.create_index([("published_at", pymongo.DESCENDING)])
+    articles_collection.create_index([("published_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
     articles_collection.create_index([("categories", pymongo.ASCENDING)])
+    # One document per paper: arXiv ids are stored without their version suffix
+    articles_collection.create_index([("arxiv_id", pymongo.ASCENDING)], unique=True, sparse=True)
+    articles_collection.create_index([
+        ("category_facets", pymongo.ASCENDING),
+        ("published_at", pymongo.DESCENDING),
+        ("_id", pymongo.DESCENDING)
+    ])
+    articles_collection.create_index([
+        ("type", pymongo.ASCENDING),
+        ("published_at", pymongo.DESCENDING),
+        ("_id", pymongo.DESCENDING)
+    ])
     
     # Module indexes
     modules_collection.create_index([("code", pymongo.ASCENDING)], unique=True)
@@ -91,6 +109,16 @@ def create_indexes():
         ("article_id", pymongo.ASCENDING)
     ], unique=True)
     relevance_collection.create_index([("relevance_score", pymongo.DESCENDING)])
+    # Best score of one article across modules, looked up while paging articles by date
+    relevance_collection.create_index([
+        ("article_id", pymongo.ASCENDING),
+        ("relevance_score", pymongo.DESCENDING)
+    ])
+    relevance_collection.create_index([
+        ("module_id", pymongo.ASCENDING),
+        ("relevance_score", pymongo.DESCENDING),
+        ("article_id", pymongo.DESCENDING)
+    ])
     
     # Interaction indexes
     interactions_collection.create_index([
@@ -98,6 +126,14 @@ def create_indexes():
         ("article_id", pymongo.ASCENDING),
         ("module_id", pymongo.ASCENDING)
     ])
+    interactions_collection.create_index([("article_id", pymongo.ASCENDING)])
+    
+    # Job run indexes
+    job_runs_collection.create_index([("job", pymongo.ASCENDING), ("started_at", pymongo.DESCENDING)])
+    job_runs_collection.create_index([("started_at", pymongo.DESCENDING)])
+    
+    # Article neighbour indexes
+    article_neighbours_collection.create_index([("article_id", pymongo.ASCENDING)], unique=True)
     
     # User indexes
     users_collection.create_index([("email", pymongo.ASCENDING)], unique=True)
@@ -113,6 +149,11 @@ def create_indexes():
         ("user_id", pymongo.ASCENDING),
         ("article_id", pymongo.ASCENDING)
     ], unique=True)
+    bookmarks_collection.create_index([
+        ("user_id", pymongo.ASCENDING),
+        ("created_at", pymongo.DESCENDING),
+        ("_id", pymongo.DESCENDING)
+    ])
     
     # Starred modules indexes
     starred_modules_collection.create_index([
@@ -246,8 +287,10 @@ def update_user_modules(user_id, modules):
         {
             "$set": {
                 "modules": module_ids,
-                "updated_at": datetime.now()
-            }
+                "updated_at": datetime.now(),
+                "data_updated_at": datetime.now()
+            },
+            "$inc": {"data_version": 1}
         }
     )
     
@@ -292,6 +335,7 @@ def bookmark_article(user_id, article_id, module_id=None):
     
     try:
         result = bookmarks_collection.insert_one(bookmark)
+        bump_user_data_version(user_id)
         return result.inserted_id
     except pymongo.errors.DuplicateKeyError:
         # Already bookmarked
@@ -310,16 +354,27 @@ def remove_bookmark(user_id, article_id):
         "article_id": article_id
     })
     
+    if result.deleted_count:
+        bump_user_data_version(user_id)
     return result.deleted_count > 0
 
-def get_user_bookmarks(user_id, limit=20, skip=0):
-    """Get bookmarks for a user"""
+def get_user_bookmarks(user_id, limit=20, skip=0, cursor=None):
+    """Get bookmarks for a user, newest first
+
+    Pass the ``cursor`` of the previous page to continue after it with an
+    index range scan; ``skip`` is kept for older clients.
+    """
     if isinstance(user_id, str):
         user_id = ObjectId(user_id)  # Changed from pymongo.ObjectId to ObjectId
     
+    match = {"user_id": user_id}
+    if cursor:
+        match.update(keyset_filter(BOOKMARK_SORT, cursor))
+        skip = 0
+    
     pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$sort": {"created_at": -1}},
+        {"$match": match},
+        {"$sort": dict(BOOKMARK_SORT)},
         {"$skip": skip},
         {"$limit": limit},
         {"$lookup": {
@@ -336,14 +391,7 @@ def get_user_bookmarks(user_id, limit=20, skip=0):
         }}
     ]
     
-    bookmarks = list(bookmarks_collection.aggregate(pipeline))
-    
-    # Convert ObjectIds to strings for JSON serialization
-    for bookmark in bookmarks:
-        bookmark["article"]["_id"] = str(bookmark["article"]["_id"])
-        bookmark["bookmark_id"] = str(bookmark["bookmark_id"])
-    
-    return bookmarks
+    return list(bookmarks_collection.aggregate(pipeline))
 
 def is_article_bookmarked(user_id, article_id):
     """Check if an article is bookmarked by a user"""
@@ -383,6 +431,7 @@ def star_module(user_id, module_id):
     
     try:
         result = starred_modules_collection.insert_one(starred)
+        bump_user_data_version(user_id)
         return result.inserted_id
     except pymongo.errors.DuplicateKeyError:
         # Already starred
@@ -401,6 +450,8 @@ def unstar_module(user_id, module_id):
         "module_id": module_id
     })
     
+    if result.deleted_count:
+        bump_user_data_version(user_id)
     return result.deleted_count > 0
 
 def get_starred_modules(user_id):
@@ -421,13 +472,7 @@ def get_starred_modules(user_id):
         {"$replaceRoot": { "newRoot": "$module" }}
     ]
     
-    modules = list(starred_modules_collection.aggregate(pipeline))
-    
-    # Convert ObjectIds to strings for JSON serialization
-    for module in modules:
-        module["_id"] = str(module["_id"])
-    
-    return modules
+    return list(starred_modules_collection.aggregate(pipeline))
 
 def is_module_starred(user_id, module_id):
     """Check if a module is starred by a user"""
@@ -444,6 +489,60 @@ def is_module_starred(user_id, module_id):
     
     return starred is not None
 
+# =========== Data Version Stamps ===========
+
+# Names of the data sets whose writes are stamped
+MODULES_VERSION = "modules"
+CORPUS_VERSION = "corpus"              # Articles and papers
+RELEVANCE_VERSION = "relevance"        # Module-article relevance scores
+
+def get_data_version(name):
+    """Get the current version stamp of a data set (0 if it was never bumped)"""
+    doc = service_state_collection.find_one({"_id": f"version:{name}"}, {"version": 1})
+    return doc.get("version", 0) if doc else 0
+
+def bump_data_version(name):
+    """Advance a data set's version stamp after writing to it, so caches reload"""
+    doc = service_state_collection.find_one_and_update(
+        {"_id": f"version:{name}"},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now()}},
+        upsert=True,
+        return_document=pymongo.ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+def get_data_stamps(names):
+    """Get (version, updated_at) for several data sets in one query"""
+    stamps = {name: (0, None) for name in names}
+    if not names:
+        return stamps
+    docs = service_state_collection.find(
+        {"_id": {"$in": [f"version:{name}" for name in names]}}, {"version": 1, "updated_at": 1}
+    )
+    for doc in docs:
+        stamps[doc["_id"][len("version:"):]] = (doc.get("version", 0), doc.get("updated_at"))
+    return stamps
+
+def bump_user_data_version(user_id):
+    """Advance a user's data version after changing anything their feeds depend on"""
+    if isinstance(user_id, str):
+        user_id = ObjectId(user_id)
+    users_collection.update_one(
+        {"_id": user_id},
+        {"$inc": {"data_version": 1}, "$set": {"data_updated_at": datetime.now()}}
+    )
+
+def get_user_data_stamp(user_id):
+    """Get (data_version, data_updated_at) for a user, or None if the user does not exist"""
+    if isinstance(user_id, str):
+        if not ObjectId.is_valid(user_id):
+            return None
+        user_id = ObjectId(user_id)
+    user = users_collection.find_one({"_id": user_id}, {"data_version": 1, "data_updated_at": 1})
+    if not user:
+        return None
+    return user.get("data_version", 0), user.get("data_updated_at")
+
 def initialize_database():
     """Initialize the database with required data"""
     create_indexes()
@@ -0,0 +1,27 @@
+# Ingest-time facet fields for articles and papers
+
+
+def article_type(source_name):
+    """Return the stored content type for an article ("academic" for arXiv papers, else "news")"""
+    return "academic" if source_name == "arXiv" else "news"
+
+
+def category_facets(categories):
+    """Normalize categories into lower-cased facet tokens
+
+    News categories map to themselves ("Technology" -> ["technology"]). arXiv
+    categories also yield their archive and sub-category tokens, so "cs.AI"
+    becomes ["cs.ai", "cs", "ai"] and a page for "cs", "AI" or "cs.AI" can be
+    answered by an exact match on the facet index.
+    """
+    facets = []
+    for category in categories or []:
+        if not isinstance(category, str) or not category.strip():
+            continue
+        tokens = [category.strip().lower()]
+        if "." in tokens[0]:
+            tokens.extend(part for part in tokens[0].split(".") if part)
+        for token in tokens:
+            if token not in facets:
+                facets.append(token)
+    return facets
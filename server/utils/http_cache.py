@@ -0,0 +1,131 @@
+# Conditional GET support for read endpoints, driven by data version stamps
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, current_app, make_response
+from utils.db_utils import get_data_stamps, get_user_data_stamp
+from config import DATA_VERSION_CHECK_SECONDS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_stamp_cache = {}  # name -> (checked_at, (version, updated_at))
+_stamp_lock = threading.Lock()
+
+
+def data_stamps(names):
+    """Get version stamps for data sets, re-reading MongoDB at most every DATA_VERSION_CHECK_SECONDS"""
+    now = time.monotonic()
+    stamps = {}
+    stale = []
+    for name in names:
+        cached = _stamp_cache.get(name)
+        if cached and now - cached[0] < DATA_VERSION_CHECK_SECONDS:
+            stamps[name] = cached[1]
+        else:
+            stale.append(name)
+
+    if stale:
+        fresh = get_data_stamps(stale)
+        with _stamp_lock:
+            for name, stamp in fresh.items():
+                _stamp_cache[name] = (now, stamp)
+        stamps.update(fresh)
+    return stamps
+
+
+def http_date_ceiling(stamp):
+    """Round a version stamp up to the whole second an HTTP date can express"""
+    whole = stamp.replace(microsecond=0)
+    return whole if whole == stamp else whole + timedelta(seconds=1)
+
+
+def _set_cache_headers(response, etag, last_modified, max_age, private):
+    """Attach validators and Cache-Control to a response"""
+    if etag and not response.get_etag()[0]:
+        response.set_etag(etag)
+    if last_modified and not response.last_modified:
+        response.last_modified = last_modified
+    if "Cache-Control" not in response.headers:
+        if private:
+            response.cache_control.private = True
+        else:
+            response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        if not max_age:
+            response.cache_control.no_cache = True
+    if private:
+        response.vary.add("Authorization")
+    return response
+
+
+def conditional_get(*versions, user=None, max_age=0, private=False, time_bucket=None):
+    """Decorate a JSON GET view with ETag/Last-Modified validation
+
+    The ETag is derived from the request URL and the version stamps of the data
+    the view reads, so a matching If-None-Match (or an If-Modified-Since no
+    older than the newest stamp) is answered with 304 before the view runs.
+
+    Args:
+        versions: Names of the data sets the response depends on (see db_utils)
+        user: Callable taking the view kwargs and returning the user id whose
+            data version also applies, or None if the request is unauthenticated
+        max_age: Cache-Control max-age in seconds (0 means always revalidate)
+        private: Mark responses private and vary them on Authorization
+        time_bucket: Seconds after which the ETag changes even without writes,
+            for responses that depend on the clock (e.g. "last 7 days")
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = None
+            last_modified = None
+            if versions or user or time_bucket:
+                try:
+                    parts = [request.full_path]
+                    stamps = data_stamps(versions)
+                    for name in versions:
+                        parts.append(stamps[name][0])
+                    updated = [stamps[name][1] for name in versions if stamps[name][1]]
+
+                    if user:
+                        user_id = user(**kwargs)
+                        user_stamp = get_user_data_stamp(user_id) if user_id else None
+                        if user_stamp is None:
+                            # Unknown or unauthenticated users get the view's own error response
+                            return view(*args, **kwargs)
+                        parts.extend([str(user_id), user_stamp[0]])
+                        if user_stamp[1]:
+                            updated.append(user_stamp[1])
+
+                    if time_bucket:
+                        parts.append(int(time.time() // time_bucket))
+
+                    etag = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+                    # Rounded up, and only sent once its second is over: a write later in the
+                    # same second would otherwise share the date and be answered with a stale 304
+                    last_modified = http_date_ceiling(max(updated)) if updated and not time_bucket else None
+                    if last_modified is not None and last_modified > datetime.now():
+                        last_modified = None
+                except Exception as e:
+                    logger.error(f"Error computing ETag for {request.path}: {str(e)}")
+                    return view(*args, **kwargs)
+
+                not_modified = request.if_none_match.contains_weak(etag) if request.if_none_match else (
+                    last_modified is not None and request.if_modified_since is not None
+                    and request.if_modified_since >= last_modified.replace(tzinfo=request.if_modified_since.tzinfo)
+                )
+                if not_modified:
+                    response = current_app.response_class(status=304)
+                    return _set_cache_headers(response, etag, last_modified, max_age, private)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            return _set_cache_headers(response, etag, last_modified, max_age, private)
+        return wrapper
+    return decorator
@@ -0,0 +1,193 @@
+# Shared HTTP client: pooled sessions per host, timeouts, retries and circuit breaking
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF_BASE_SECONDS,
+    HTTP_BACKOFF_MAX_SECONDS, HTTP_POOL_SIZE, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN_SECONDS
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Stop calling a host after repeated failures until a cool-down has passed
+
+    After the cool-down one trial request is let through (half-open); its
+    success closes the circuit and its failure opens it for another cool-down.
+    """
+
+    def __init__(self, host, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, cooldown=CIRCUIT_COOLDOWN_SECONDS):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may be sent now"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit for {self.host} closed")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit for {self.host} opened after {self.failures} failures; "
+                                   f"pausing calls for {self.cooldown}s")
+                self.opened_at = time.monotonic()
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt, retry_after=None):
+    """Seconds to wait before retry number attempt + 1: Retry-After if given, else jittered exponential backoff"""
+    if retry_after is not None:
+        return min(retry_after, HTTP_BACKOFF_MAX_SECONDS)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX_SECONDS, HTTP_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class HttpClient:
+    def __init__(self, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), max_retries=HTTP_MAX_RETRIES, pool_size=HTTP_POOL_SIZE):
+        """Initialize the HTTP client
+
+        Args:
+            timeout (tuple): Default (connect, read) timeouts in seconds
+            max_retries (int): Attempts per request, including the first
+            pool_size (int): Keep-alive connections kept per host
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.sessions = {}
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def session(self, host):
+        """Get the keep-alive session for a host, creating it on first use"""
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # Retries are handled here rather than by urllib3 so they share the circuit breaker
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[host] = session
+            return session
+
+    def breaker(self, host):
+        """Get the circuit breaker for a host"""
+        with self.lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker(host)
+            return breaker
+
+    def get(self, url, params=None, timeout=None, max_retries=None, limiter=None, **kwargs):
+        """GET a URL, retrying 429/5xx responses and network errors
+
+        Args:
+            limiter (RateLimiter): Rate limiter every attempt, retries included, must pass
+
+        Returns:
+            requests.Response: The final response, which may still be an error status
+
+        Raises:
+            CircuitOpenError: If the host's circuit is open
+            requests.exceptions.RequestException: If the last attempt failed at the network level
+        """
+        host = urlsplit(url).netloc
+        session = self.session(host)
+        breaker = self.breaker(host)
+        attempts = max_retries or self.max_retries
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {host}; skipping request")
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                response = session.get(url, params=params, timeout=timeout or self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise
+                delay = retry_delay(attempt)
+                logger.warning(f"Network error from {host} (attempt {attempt + 1}/{attempts}): {str(e)}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                return response
+            delay = retry_delay(attempt, retry_after_seconds(response.headers.get("Retry-After")))
+            logger.warning(f"{host} returned {response.status_code} (attempt {attempt + 1}/{attempts}); retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Get the process-wide HTTP client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def http_get(url, params=None, **kwargs):
+    """GET a URL through the shared HTTP client"""
+    return get_http_client().get(url, params=params, **kwargs)
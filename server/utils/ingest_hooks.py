@@ -0,0 +1,34 @@
+# Listeners notified whenever articles or papers are stored
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_listeners = []
+
+
+def register_ingest_listener(listener):
+    """Register a callable invoked with a list of stored article documents (each with its _id)"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def unregister_ingest_listener(listener):
+    """Remove a previously registered listener"""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def notify_ingested(documents):
+    """Pass freshly stored documents to every listener
+
+    A failing listener is logged and skipped so it can never fail the store itself.
+    """
+    if not documents:
+        return
+    for listener in list(_listeners):
+        try:
+            listener(documents)
+        except Exception as e:
+            logger.error(f"Error in ingest listener {getattr(listener, '__name__', listener)}: {str(e)}")
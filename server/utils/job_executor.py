@@ -0,0 +1,269 @@
+# Bounded thread pool for background jobs: one run per job at a time, duplicate triggers coalesced
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import DuplicateKeyError
+from config import SCHEDULER_MAX_WORKERS
+from utils.leader_lease import process_id
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+NOT_LEADER = "not_leader"
+
+
+def state_id(name):
+    """service_state _id holding a job's last successful run and checkpoint"""
+    return f"job:{name}"
+
+
+class JobExecutor:
+    """Run named jobs on a bounded thread pool
+
+    A job never runs twice at once. Triggering a job that is waiting for a
+    worker is a no-op (the queued run will see the latest data); triggering
+    one that is running queues exactly one follow-up run, however many
+    triggers arrive meanwhile. Every run is recorded in the job_runs
+    collection with its start, end, duration, status and items processed,
+    and each job's last successful run and checkpoint are kept in
+    service_state ("job:<name>") so they survive restarts.
+
+    With a lease set, jobs run only while this process holds it, and job
+    state is written fenced by the lease's token, so a deposed leader's late
+    writes cannot overwrite its successor's.
+    """
+
+    def __init__(self, max_workers=SCHEDULER_MAX_WORKERS):
+        """
+        Args:
+            max_workers (int): Jobs that may run at the same time
+        """
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.jobs = {}
+        self.intervals = {}
+        self.states = {}  # Job name -> QUEUED or RUNNING while it has a run in flight
+        self.rerun = set()  # Running jobs triggered again, to run once more when they finish
+        self.last_runs = {}
+        self.lock = threading.Lock()
+        self.owner = process_id()
+        self.lease = None  # LeaderLease this process must hold to run jobs, if any
+
+    def register(self, name, func, interval=None):
+        """
+        Register a job
+
+        Args:
+            name (str): Job name
+            func (callable): Takes no arguments; returns items processed (int), True/None, or False on failure
+            interval (timedelta): How often the job is due, if it runs periodically
+        """
+        self.jobs[name] = func
+        if interval is not None:
+            self.intervals[name] = interval
+
+    def submit(self, name):
+        """
+        Trigger a job
+
+        Returns:
+            str: "started" if a run was queued, "queued" if a follow-up run was
+                scheduled behind the running one, "coalesced" if an
+                equivalent run was already waiting, or "not_leader" if another
+                process holds the lease
+        """
+        if name not in self.jobs:
+            raise KeyError(f"Unknown job: {name}")
+        if self.lease is not None and not self.lease.held():
+            return NOT_LEADER
+        with self.lock:
+            state = self.states.get(name)
+            if state == QUEUED or (state == RUNNING and name in self.rerun):
+                return "coalesced"
+            if state == RUNNING:
+                self.rerun.add(name)
+                return "queued"
+            self.states[name] = QUEUED
+        self.pool.submit(self._run, name)
+        return "started"
+
+    def _run(self, name):
+        """Run a job once, record the run and start the follow-up run if one was triggered"""
+        from utils.db_utils import job_runs_collection
+        token = None
+        if self.lease is not None:
+            # Leadership may have moved while the run waited for a worker
+            token = self.lease.fencing_token()
+            if token is None:
+                logger.warning(f"Skipping job {name}: this process no longer holds the {self.lease.name} lease")
+                with self.lock:
+                    self.states.pop(name, None)
+                    self.rerun.discard(name)
+                return
+        with self.lock:
+            self.states[name] = RUNNING
+        started_at = datetime.now()
+        run_id = None
+        try:
+            run_id = job_runs_collection.insert_one({
+                "job": name, "status": RUNNING, "started_at": started_at, "owner": self.owner, "fencing_token": token
+            }).inserted_id
+        except Exception as e:
+            logger.error(f"Error recording start of job {name}: {str(e)}")
+
+        status = "succeeded"
+        items = None
+        error = None
+        try:
+            result = self.jobs[name]()
+            if result is False:
+                status = "failed"
+            elif isinstance(result, int) and not isinstance(result, bool):
+                items = result
+        except Exception as e:
+            status = "failed"
+            error = str(e)
+            logger.error(f"Error in job {name}: {error}")
+
+        finished_at = datetime.now()
+        run = {
+            "status": status,
+            "finished_at": finished_at,
+            "duration_seconds": round((finished_at - started_at).total_seconds(), 3),
+            "items_processed": items,
+            "error": error
+        }
+        try:
+            if run_id is not None:
+                job_runs_collection.update_one({"_id": run_id}, {"$set": run})
+            if status == "succeeded":
+                self.record_success(name, started_at, items)
+            else:
+                self._update_state(name, {"$set": {"last_run_at": started_at, "last_status": status}})
+        except Exception as e:
+            logger.error(f"Error recording end of job {name}: {str(e)}")
+
+        with self.lock:
+            self.last_runs[name] = dict(run, started_at=started_at)
+            again = name in self.rerun
+            self.rerun.discard(name)
+            if again:
+                self.states[name] = QUEUED
+            else:
+                self.states.pop(name, None)
+        if again:
+            self.pool.submit(self._run, name)
+
+    def _update_state(self, name, update):
+        """
+        Apply an update to a job's persisted state
+
+        With a lease, the update carries this process's fencing token and is
+        refused if a newer leader already wrote the state.
+
+        Returns:
+            bool: False if the update was fenced off
+        """
+        from utils.db_utils import service_state_collection
+        query = {"_id": state_id(name)}
+        if self.lease is not None:
+            token = self.lease.fencing_token()
+            if token is None:
+                logger.warning(f"Not updating state of job {name}: this process no longer holds the lease")
+                return False
+            query["$or"] = [{"fencing_token": {"$exists": False}}, {"fencing_token": {"$lte": token}}]
+            update = dict(update, **{"$set": dict(update.get("$set", {}), fencing_token=token)})
+        try:
+            # A fenced-off update matches nothing and its upsert collides with the existing document
+            service_state_collection.update_one(query, update, upsert=True)
+            return True
+        except DuplicateKeyError:
+            logger.warning(f"Not updating state of job {name}: a newer leader has written it")
+            return False
+
+    def record_success(self, name, started_at, items=None):
+        """Persist a successful run of a job (started at started_at) and drop its checkpoint"""
+        self._update_state(name, {
+            "$set": {
+                "last_run_at": started_at,
+                "last_status": "succeeded",
+                "last_success_at": started_at,
+                "last_items_processed": items
+            },
+            "$unset": {"checkpoint": "", "checkpoint_at": ""}
+        })
+
+    def get_state(self, name):
+        """Persisted state of a job: last run, last success and checkpoint"""
+        try:
+            from utils.db_utils import service_state_collection
+            return service_state_collection.find_one({"_id": state_id(name)}) or {}
+        except Exception as e:
+            logger.error(f"Error getting state of job {name}: {str(e)}")
+            return {}
+
+    def due_in(self, name, now=None):
+        """Time until a periodic job is next due from its last success (zero or less means due now)"""
+        last_success = self.get_state(name).get("last_success_at")
+        if last_success is None:
+            return timedelta(0)
+        return last_success + self.intervals[name] - (now or datetime.now())
+
+    def save_checkpoint(self, name, checkpoint):
+        """Persist the progress of a running job, to resume from if the run is interrupted"""
+        try:
+            self._update_state(name, {"$set": {"checkpoint": checkpoint, "checkpoint_at": datetime.now()}})
+        except Exception as e:
+            logger.error(f"Error saving checkpoint of job {name}: {str(e)}")
+
+    def load_checkpoint(self, name):
+        """
+        Get the checkpoint an interrupted run of a job left behind
+
+        Checkpoints older than the job's interval are ignored, since a fresh
+        run is due by then anyway.
+
+        Returns:
+            dict: The checkpoint, or {} if there is none to resume from
+        """
+        state = self.get_state(name)
+        checkpoint = state.get("checkpoint")
+        if not checkpoint:
+            return {}
+        interval = self.intervals.get(name)
+        if interval is not None and datetime.now() - state["checkpoint_at"] > interval:
+            return {}
+        logger.info(f"Resuming job {name} from its checkpoint of {state['checkpoint_at']}")
+        return checkpoint
+
+    def status(self):
+        """State and last run of every registered job in this process, with its persisted last success"""
+        with self.lock:
+            status = {
+                name: {
+                    "state": self.states.get(name, "idle"),
+                    "rerun_pending": name in self.rerun,
+                    "last_run": self.last_runs.get(name)
+                }
+                for name in sorted(self.jobs)
+            }
+        for name, job in status.items():
+            state = self.get_state(name)
+            job["last_success_at"] = state.get("last_success_at")
+            job["has_checkpoint"] = bool(state.get("checkpoint"))
+            if name in self.intervals:
+                job["interval_seconds"] = self.intervals[name].total_seconds()
+        return status
+
+    def recent_runs(self, job=None, limit=50):
+        """Most recent recorded runs, newest first, optionally of one job"""
+        try:
+            from utils.db_utils import job_runs_collection
+            query = {"job": job} if job else {}
+            return list(job_runs_collection.find(query).sort("started_at", -1).limit(limit))
+        except Exception as e:
+            logger.error(f"Error getting job runs: {str(e)}")
+            return []
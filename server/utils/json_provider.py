@@ -0,0 +1,84 @@
+# Flask JSON provider that encodes MongoDB and NumPy types natively
+import json
+from datetime import date, datetime, timezone
+from bson.objectid import ObjectId
+from flask.json.provider import JSONProvider
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def http_date(value):
+    """Format a date or datetime as RFC 1123, like werkzeug.http.http_date but without its email.utils round trip
+
+    Naive datetimes are treated as UTC, as Flask's default provider does.
+    """
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return (f"{WEEKDAYS[value.weekday()]}, {value.day:02d} {MONTHS[value.month - 1]} {value.year:04d} "
+            f"{value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT")
+
+
+def default(value):
+    """Encode types neither orjson nor the json module handle on their own"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, date):
+        # RFC 1123, as Flask's default provider writes dates
+        return http_date(value)
+    if np is not None:
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """JSON provider backed by orjson, falling back to the json module if it is not installed
+
+    ObjectIds become strings, dates and datetimes RFC 1123 strings (the format
+    of Flask's default provider) and NumPy arrays and scalars plain lists and
+    numbers, so routes can return documents as they
+    come out of MongoDB.
+    """
+
+    if orjson is not None:
+        # Dates go through default() so they keep Flask's format rather than orjson's ISO 8601
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        """Serialize data as a JSON string"""
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=default, option=self.options).decode("utf-8")
+        kwargs.setdefault("default", default)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        """Deserialize data from a JSON string or bytes"""
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """Serialize the arguments as JSON and wrap them in a response without an extra str round trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is not None:
+            body = orjson.dumps(obj, default=default, option=self.options)
+        else:
+            body = json.dumps(obj, default=default)
+        return self._app.response_class(body, mimetype="application/json")
@@ -0,0 +1,152 @@
+# Lease-based leader election over MongoDB, so one process in a deployment runs the scheduler
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from config import SCHEDULER_LEASE_SECONDS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def process_id():
+    """Identify this process across hosts: "<hostname>:<pid>" """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def lease_id(name):
+    """service_state _id of a lease"""
+    return f"lease:{name}"
+
+
+class LeaderLease:
+    """A named lease that at most one process holds at a time
+
+    The lease is a service_state document ("lease:<name>") with its holder
+    and an expiry. The holder renews it with heartbeats well inside the
+    expiry; when the holder dies, the lease expires and the next process to
+    try takes it over. The document is never deleted, so its counter keeps
+    growing. Every takeover increments it and hands out the new value as a
+    fencing token. Writes fenced with the token are refused once a newer
+    leader has written, so a holder that stalled past its expiry cannot
+    clobber its successor's state.
+
+    A holder also stops acting as leader on its own once it has not
+    renewed for the whole lease period (measured on its monotonic clock),
+    even if MongoDB is unreachable and it cannot learn who took over.
+    """
+
+    def __init__(self, name, lease_seconds=SCHEDULER_LEASE_SECONDS):
+        """
+        Args:
+            name (str): Lease name, e.g. "scheduler"
+            lease_seconds (float): How long a lease lasts without a heartbeat
+        """
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.owner = process_id()
+        self.lock = threading.Lock()
+        self.token = None
+        self.valid_until = 0.0  # Monotonic time until which this process may act as leader
+
+    def held(self):
+        """Whether this process holds the lease right now"""
+        with self.lock:
+            return self.token is not None and time.monotonic() < self.valid_until
+
+    def fencing_token(self):
+        """Fencing token of the lease this process holds, or None"""
+        with self.lock:
+            return self.token if self.token is not None and time.monotonic() < self.valid_until else None
+
+    def heartbeat(self):
+        """
+        Renew the lease if this process holds it, otherwise try to take it over
+
+        Returns:
+            bool: True if this process holds the lease afterwards
+        """
+        from utils.db_utils import service_state_collection
+        started = time.monotonic()
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        with self.lock:
+            token = self.token
+        try:
+            if token is not None:
+                doc = service_state_collection.find_one_and_update(
+                    {"_id": lease_id(self.name), "holder": self.owner, "token": token},
+                    {"$set": {"renewed_at": now, "expires_at": expires_at}}
+                )
+                if doc is not None:
+                    with self.lock:
+                        self.valid_until = started + self.lease_seconds
+                    return True
+                logger.warning(f"Lost the {self.name} lease (token {token}) to another process")
+                with self.lock:
+                    self.token = None
+
+            # Take the lease over if it is free or expired; a live holder makes
+            # the upsert collide with the existing document instead
+            doc = service_state_collection.find_one_and_update(
+                {"_id": lease_id(self.name), "$or": [{"holder": None}, {"expires_at": {"$lte": now}}]},
+                {
+                    "$set": {"holder": self.owner, "acquired_at": now, "renewed_at": now, "expires_at": expires_at},
+                    "$inc": {"token": 1}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            with self.lock:
+                self.token = doc["token"]
+                self.valid_until = started + self.lease_seconds
+            logger.info(f"Acquired the {self.name} lease with fencing token {doc['token']}")
+            return True
+        except DuplicateKeyError:
+            return False
+        except Exception as e:
+            # Keep leading until the current lease runs out; a follower cannot take over sooner
+            logger.error(f"Error renewing the {self.name} lease: {str(e)}")
+            return self.held()
+
+    def release(self):
+        """Give the lease up so another process can take over without waiting for it to expire"""
+        with self.lock:
+            token = self.token
+            self.token = None
+        if token is None:
+            return
+        try:
+            from utils.db_utils import service_state_collection
+            service_state_collection.update_one(
+                {"_id": lease_id(self.name), "holder": self.owner, "token": token},
+                {"$set": {"holder": None, "expires_at": datetime.utcnow()}}
+            )
+            logger.info(f"Released the {self.name} lease")
+        except Exception as e:
+            logger.error(f"Error releasing the {self.name} lease: {str(e)}")
+
+    def status(self):
+        """Current holder of the lease, its fencing token and how old the lease and its last heartbeat are"""
+        from utils.db_utils import service_state_collection
+        doc = service_state_collection.find_one({"_id": lease_id(self.name)}) or {}
+        now = datetime.utcnow()
+        expires_at = doc.get("expires_at")
+        live = doc.get("holder") is not None and expires_at is not None and expires_at > now
+        return {
+            "name": self.name,
+            "leader": doc.get("holder") if live else None,
+            "fencing_token": doc.get("token"),
+            "acquired_at": doc.get("acquired_at"),
+            "lease_age_seconds": round((now - doc["acquired_at"]).total_seconds(), 1) if live else None,
+            "heartbeat_age_seconds": round((now - doc["renewed_at"]).total_seconds(), 1) if live else None,
+            "expires_at": expires_at,
+            "lease_seconds": self.lease_seconds,
+            "this_process": self.owner,
+            "is_leader": self.held()
+        }
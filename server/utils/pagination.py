@@ -0,0 +1,100 @@
+# Keyset (cursor) pagination helpers
+import base64
+import json
+from datetime import datetime
+from bson.objectid import ObjectId
+
+# Sort keys used by the paginated list endpoints; the trailing _id makes each key unique
+PUBLISHED_SORT = [("published_at", -1), ("_id", -1)]
+SEARCH_SORT = [("score", -1), ("published_at", -1), ("_id", -1)]
+RELEVANCE_SORT = [("relevance_score", -1), ("_id", -1)]
+SCORE_SORT = [("score", -1), ("_id", -1)]
+BOOKMARK_SORT = [("created_at", -1), ("_id", -1)]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def _encode_value(value):
+    """Tag values JSON cannot represent natively"""
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    """Reverse _encode_value"""
+    if isinstance(value, dict):
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of the last item on a page as an opaque token"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a cursor token back into its list of sort-key values"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list):
+            raise ValueError("cursor payload is not a list")
+        return [_decode_value(v) for v in values]
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {str(e)}")
+
+
+def keyset_filter(sort, cursor):
+    """Build a range filter selecting the items that sort after the cursor
+
+    For a sort of [(a, -1), (b, -1)] and cursor values [x, y] this yields
+    {"$or": [{a: {"$lt": x}}, {a: x, b: {"$lt": y}}]}, which MongoDB can answer
+    with a range scan over a matching compound index.
+
+    Args:
+        sort (list): (field, direction) pairs the query is sorted by
+        cursor (str): Token produced by encode_cursor/next_cursor
+
+    Returns:
+        dict: Filter to merge into the query ({} when no cursor is given)
+    """
+    if not cursor:
+        return {}
+
+    values = decode_cursor(cursor)
+    if len(values) != len(sort):
+        raise InvalidCursorError("Cursor does not match this listing")
+
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {sort[j][0]: values[j] for j in range(i)}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+
+    return {"$or": clauses}
+
+
+def next_cursor(items, sort, limit):
+    """Build the cursor for the page after ``items`` (None when this is the last page)"""
+    if not items or len(items) < limit:
+        return None
+
+    last = items[-1]
+    values = []
+    for field, _ in sort:
+        value = last.get(field)
+        # Some services still stringify ObjectIds before returning items
+        if field == "_id" and isinstance(value, str):
+            value = ObjectId(value)
+        values.append(value)
+
+    return encode_cursor(values)
@@ -0,0 +1,130 @@
+# Shared planning of keyword searches: dedupe terms across topics, pack them
+# into combined OR queries and route the results back to the topics that asked
+import re
+import logging
+from functools import lru_cache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_term(term):
+    """Lowercase a search term and collapse its whitespace"""
+    return " ".join(str(term).lower().split())
+
+
+@lru_cache(maxsize=1024)
+def term_pattern(term):
+    """Match a search term at a word start; short terms (e.g. "ai") must match a whole word"""
+    return re.compile(r"\b" + re.escape(term) + (r"\b" if len(term) < 4 else ""))
+
+
+class QueryPlanner:
+    """Collect the search terms several topics need and share queries between them
+
+    A topic is anything that wants results for a list of terms, e.g. a module
+    or a general keyword. Each distinct term is queried once however many
+    topics ask for it, and each result counts towards every topic whose terms
+    it contains, up to that topic's quota.
+    """
+
+    def __init__(self):
+        self.term_topics = {}  # Term -> topics that asked for it, in insertion order
+        self.quotas = {}
+        self.counts = {}
+        self.groups = {}
+
+    def add(self, topic, terms, quota, group=None):
+        """Register a topic's search terms, how many results it wants and the group it belongs to"""
+        self.quotas[topic] = quota
+        self.groups[topic] = group
+        self.counts.setdefault(topic, 0)
+        for term in terms:
+            term = normalize_term(term)
+            if term:
+                owners = self.term_topics.setdefault(term, [])
+                if topic not in owners:
+                    owners.append(topic)
+        return self
+
+    def exclude(self, terms):
+        """Drop terms that need no query, e.g. ones an interrupted run already searched"""
+        for term in terms:
+            self.term_topics.pop(normalize_term(term), None)
+        return self
+
+    def batches(self, render=None, max_length=None, max_terms=None):
+        """Pack the distinct terms into as few query batches as the limits allow
+
+        Terms keep their insertion order, so the terms of one topic tend to
+        share a query and its results route back to fewer topics.
+
+        Args:
+            render (callable): Builds the query string for a list of terms (needed with max_length)
+            max_length (int): Longest query string the API accepts
+            max_terms (int): Most terms per query
+
+        Returns:
+            list: Lists of terms, one per query
+        """
+        batches = []
+        batch = []
+        for term in self.term_topics:
+            candidate = batch + [term]
+            too_long = max_length is not None and len(render(candidate)) > max_length
+            too_many = max_terms is not None and len(candidate) > max_terms
+            if batch and (too_long or too_many):
+                batches.append(batch)
+                candidate = [term]
+            batch = candidate
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def open_topics(self, terms):
+        """Topics asking for any of these terms that still want results"""
+        topics = {topic for term in terms for topic in self.term_topics[term]}
+        return [topic for topic in topics if self.counts[topic] < self.quotas[topic]]
+
+    def open_groups(self, terms):
+        """Groups of the open topics of a batch"""
+        return {self.groups[topic] for topic in self.open_topics(terms)}
+
+    def wanted(self, terms):
+        """Results still wanted by the open topics of a batch"""
+        return sum(self.quotas[topic] - self.counts[topic] for topic in self.open_topics(terms))
+
+    def route(self, items, terms, text):
+        """Match results of a query to the topics whose terms they contain
+
+        Counts each routed item towards its topics, so later batches skip
+        topics whose quota is full.
+
+        Args:
+            items (list): Query results
+            terms (list): Terms of the query that returned them
+            text (callable): Returns the searchable text of an item
+
+        Returns:
+            list: (item, matched terms) for every item routed to at least one open topic
+        """
+        patterns = [(term, term_pattern(term)) for term in terms]
+        routed = []
+        for item in items:
+            content = text(item).lower()
+            matched_terms = []
+            matched_topics = set()
+            for term, pattern in patterns:
+                if pattern.search(content):
+                    open_owners = [
+                        topic for topic in self.term_topics[term] if self.counts[topic] < self.quotas[topic]
+                    ]
+                    if open_owners:
+                        matched_terms.append(term)
+                        matched_topics.update(open_owners)
+            if matched_topics:
+                for topic in matched_topics:
+                    self.counts[topic] += 1
+                routed.append((item, matched_terms))
+        return routed
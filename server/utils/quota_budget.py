@@ -0,0 +1,157 @@
+# Daily request budgets for upstream APIs with hard quotas (NewsAPI)
+import logging
+import threading
+from datetime import datetime, timedelta
+from config import QUOTA_BUDGETS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QuotaBudget:
+    """Daily request quota of one API, split into reserves per job type
+
+    Spending is counted per UTC day in service_state ("quota:<name>:<date>"),
+    so every process and restart sees the same total. Each job type (e.g.
+    "categories", "modules") is guaranteed its reserve; beyond that it may
+    only use budget no other job has reserved and left unspent, so one job
+    cannot starve the others.
+    """
+
+    def __init__(self, name, daily_limit, reserves):
+        """
+        Args:
+            name (str): API name, used for the state documents and in logs
+            daily_limit (int): Requests the API allows per day
+            reserves (dict): Job type -> share of the daily limit kept for it
+        """
+        self.name = name
+        self.daily_limit = daily_limit
+        self.reserves = {job: int(share * daily_limit) for job, share in reserves.items()}
+        self.lock = threading.Lock()
+        self.denied = {}
+
+    def _state_id(self, day):
+        """service_state _id of one day's spending"""
+        return f"quota:{self.name}:{day.strftime('%Y-%m-%d')}"
+
+    def _allowance(self, job, count):
+        """Query matching a day's spending document only while job may spend count more requests
+
+        The job stays within its reserve, or within the budget no other job has
+        reserved and left unspent, and the day's total stays within the limit.
+        """
+        def spent_by(name):
+            return {"$ifNull": [f"$jobs.{name}", 0]}
+
+        spent_after = {"$add": [{"$ifNull": ["$spent", 0]}, count]}
+        other_unspent = [
+            {"$max": [0, {"$subtract": [reserve, spent_by(other)]}]}
+            for other, reserve in self.reserves.items() if other != job
+        ]
+        return {"$expr": {"$and": [
+            {"$lte": [spent_after, self.daily_limit]},
+            {"$or": [
+                {"$lte": [{"$add": [spent_by(job), count]}, self.reserves.get(job, 0)]},
+                {"$lte": [spent_after, {"$subtract": [self.daily_limit, {"$add": [0, *other_unspent]}]}]}
+            ]}
+        ]}}
+
+    def try_spend(self, job, count=1):
+        """
+        Count requests against the budget if job may still make them
+
+        Args:
+            job (str): Job type spending the requests
+            count (int): Requests about to be made
+
+        Returns:
+            bool: True if the requests may be made (also when the budget cannot be read)
+        """
+        from utils.db_utils import service_state_collection
+        now = datetime.utcnow()
+        state_id = self._state_id(now)
+        query = {"_id": state_id, **self._allowance(job, count)}
+        increment = {"$inc": {"spent": count, f"jobs.{job}": count}}
+        try:
+            # Check and count in one conditional update, so of two spenders racing
+            # for the last request exactly one gets it
+            if service_state_collection.update_one(query, increment).matched_count:
+                return True
+            # The first request of the day creates the day's document
+            created = service_state_collection.update_one(
+                {"_id": state_id}, {"$setOnInsert": {"first_spent_at": now}}, upsert=True
+            )
+            if created.upserted_id is not None and service_state_collection.update_one(query, increment).matched_count:
+                return True
+        except Exception as e:
+            logger.error(f"Error checking the {self.name} quota, allowing the request: {str(e)}")
+            return True
+
+        with self.lock:
+            self.denied[job] = self.denied.get(job, 0) + count
+        logger.warning(f"{self.name} budget for {job} is spent for today; skipping request")
+        return False
+
+    def stats(self):
+        """Today's spending, what is left per job and when the quota will run out at the current rate"""
+        from utils.db_utils import service_state_collection
+        now = datetime.utcnow()
+        state = service_state_collection.find_one({"_id": self._state_id(now)}) or {}
+        spent = state.get("spent", 0)
+        jobs = state.get("jobs", {})
+        remaining = max(0, self.daily_limit - spent)
+
+        # Project exhaustion from today's average rate since the first request
+        day_end = datetime(now.year, now.month, now.day) + timedelta(days=1)
+        first_spent_at = state.get("first_spent_at")
+        rate_per_hour = None
+        projected_exhaustion = None
+        if spent and first_spent_at:
+            hours = max((now - first_spent_at).total_seconds() / 3600, 1 / 60)
+            rate_per_hour = spent / hours
+            exhaustion = now + timedelta(hours=remaining / rate_per_hour)
+            if exhaustion < day_end:
+                projected_exhaustion = exhaustion.isoformat()
+
+        with self.lock:
+            denied = dict(self.denied)
+        return {
+            "name": self.name,
+            "date": now.strftime("%Y-%m-%d"),
+            "daily_limit": self.daily_limit,
+            "spent": spent,
+            "remaining": remaining,
+            "resets_at": day_end.isoformat(),
+            "rate_per_hour": round(rate_per_hour, 2) if rate_per_hour is not None else None,
+            "projected_exhaustion": projected_exhaustion,
+            "jobs": {
+                job: {
+                    "spent": jobs.get(job, 0),
+                    "reserve": self.reserves.get(job, 0),
+                    "reserve_remaining": max(0, self.reserves.get(job, 0) - jobs.get(job, 0)),
+                    "denied": denied.get(job, 0)
+                }
+                for job in sorted(set(self.reserves) | set(jobs) | set(denied))
+            }
+        }
+
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+
+def get_quota_budget(name):
+    """Get the budget configured for an API in QUOTA_BUDGETS, creating it on first use"""
+    with _budgets_lock:
+        budget = _budgets.get(name)
+        if budget is None:
+            settings = QUOTA_BUDGETS[name]
+            budget = _budgets[name] = QuotaBudget(name, settings["daily_limit"], settings["reserves"])
+        return budget
+
+
+def quota_stats():
+    """Budget statistics for every configured API"""
+    return [get_quota_budget(name).stats() for name in QUOTA_BUDGETS]
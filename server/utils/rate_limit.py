@@ -0,0 +1,141 @@
+# Process-wide (optionally cluster-wide) rate limiters for upstream APIs
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from config import RATE_LIMITS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by every caller of an upstream API
+
+    Implemented as a virtual scheduling clock (GCRA): each acquire reserves the
+    next free slot and is told how long to wait for it, so callers queue in
+    arrival order without polling. With burst=1 this is plain request spacing.
+    With shared=True the clock lives in MongoDB (service_state
+    "ratelimit:<name>"), so several server processes share one budget.
+    """
+
+    def __init__(self, name, interval, burst=1, shared=False):
+        """
+        Args:
+            name (str): Upstream name, used for the shared clock and in metrics
+            interval (float): Seconds per request at the sustained rate
+            burst (int): Requests that may go out back to back after an idle period
+            shared (bool): Keep the clock in MongoDB instead of in this process
+        """
+        self.name = name
+        self.interval = interval
+        self.burst = max(1, burst)
+        self.shared = shared
+        self.lock = threading.Lock()
+        self.next_slot = 0.0  # Theoretical arrival time of the next request (monotonic seconds)
+        self.requests = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _reserve_local(self):
+        """Reserve a slot on this process's clock"""
+        with self.lock:
+            now = time.monotonic()
+            self.next_slot = max(self.next_slot, now) + self.interval
+            return max(0.0, self.next_slot - self.burst * self.interval - now)
+
+    def _reserve_shared(self):
+        """Reserve a slot on the clock shared through MongoDB"""
+        from utils.db_utils import service_state_collection
+        now = datetime.utcnow()
+        interval = timedelta(seconds=self.interval)
+        # One atomic update both reads and advances the shared clock
+        doc = service_state_collection.find_one_and_update(
+            {"_id": f"ratelimit:{self.name}"},
+            [{"$set": {"next_slot": {"$add": [{"$max": [{"$ifNull": ["$next_slot", now]}, now]}, int(self.interval * 1000)]}}}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        slot = doc["next_slot"] - interval * self.burst
+        return max(0.0, (slot - now).total_seconds())
+
+    def reserve(self):
+        """Reserve the next request slot and return the seconds to wait for it"""
+        if self.shared:
+            try:
+                wait = self._reserve_shared()
+            except Exception as e:
+                logger.error(f"Error reserving shared {self.name} rate limit slot, using the local clock: {str(e)}")
+                wait = self._reserve_local()
+        else:
+            wait = self._reserve_local()
+        self._record(wait)
+        return wait
+
+    def acquire(self):
+        """Block the calling thread until it may send a request; returns the seconds waited"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        """Wait for a request slot without blocking the event loop; returns the seconds waited"""
+        if self.shared:
+            wait = await asyncio.get_running_loop().run_in_executor(None, self.reserve)
+        else:
+            wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def _record(self, wait):
+        """Add one reservation to the wait-time metrics"""
+        with self.lock:
+            self.requests += 1
+            if wait > 0:
+                self.waited += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+    def stats(self):
+        """Wait-time metrics since the process started"""
+        with self.lock:
+            return {
+                "name": self.name,
+                "interval_seconds": self.interval,
+                "burst": self.burst,
+                "shared": self.shared,
+                "requests": self.requests,
+                "waited_requests": self.waited,
+                "total_wait_seconds": round(self.total_wait, 3),
+                "avg_wait_seconds": round(self.total_wait / self.requests, 3) if self.requests else 0.0,
+                "max_wait_seconds": round(self.max_wait, 3)
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name):
+    """Get the limiter configured for an upstream in RATE_LIMITS, creating it on first use"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limits = RATE_LIMITS[name]
+            limiter = _limiters[name] = RateLimiter(
+                name, limits["interval"], burst=limits.get("burst", 1), shared=limits.get("shared", False)
+            )
+        return limiter
+
+
+def rate_limit_stats():
+    """Metrics for every limiter in use"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
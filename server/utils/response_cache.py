@@ -0,0 +1,230 @@
+# Disk-backed cache of parsed upstream API responses (NewsAPI, arXiv)
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import logging
+import threading
+from config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTLS, RESPONSE_CACHE_STALE_SECONDS
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Parameters that do not change the response (and must not be written to disk)
+IGNORED_PARAMS = {"apiKey"}
+PURGE_INTERVAL_SECONDS = 3600
+
+
+def cache_key(source, params):
+    """Stable key for a request: the source plus its parameters in sorted order"""
+    normalized = {
+        name: str(value) for name, value in (params or {}).items()
+        if name not in IGNORED_PARAMS and value is not None
+    }
+    digest = hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{source}:{digest}"
+
+
+class ResponseCache:
+    """Parsed API results in a local SQLite file, keyed by normalized request parameters
+
+    Entries are fresh for their source's TTL. Older entries are kept until
+    the stale limit and are only served when the upstream call fails
+    (stale-if-error). Values are stored already parsed, so a hit skips both
+    the request and the parsing.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttls=RESPONSE_CACHE_TTLS, stale_seconds=RESPONSE_CACHE_STALE_SECONDS):
+        """
+        Args:
+            path (str): SQLite file
+            ttls (dict): Source name -> seconds an entry is fresh
+            stale_seconds (int): Seconds an entry may still be served after a failed request
+        """
+        self.path = path
+        self.ttls = ttls
+        self.stale_seconds = stale_seconds
+        self.lock = threading.Lock()
+        self.last_purge = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, source TEXT NOT NULL, fetched_at REAL NOT NULL, payload BLOB NOT NULL)"
+        )
+        self.connection.commit()
+        logger.info(f"Opened response cache at {path}")
+
+    def _read(self, key):
+        """Return (value, age in seconds) for a key, or (None, None)"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fetched_at, payload FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return pickle.loads(row[1]), time.time() - row[0]
+
+    def get(self, source, params, allow_stale=False):
+        """Get a cached value, or None if there is no fresh (or, with allow_stale, unexpired) entry"""
+        try:
+            value, age = self._read(cache_key(source, params))
+            if value is None:
+                return None
+            if age <= self.ttls.get(source, 0) or (allow_stale and age <= self.stale_seconds):
+                return value
+            return None
+        except Exception as e:
+            logger.error(f"Error reading response cache: {str(e)}")
+            return None
+
+    def put(self, source, params, value):
+        """Store a value for a request, replacing any previous entry"""
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            with self.lock:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, source, fetched_at, payload) VALUES (?, ?, ?, ?)",
+                    (cache_key(source, params), source, time.time(), payload)
+                )
+                self.connection.commit()
+            self._purge_if_due()
+        except Exception as e:
+            logger.error(f"Error writing response cache: {str(e)}")
+
+    def fetch(self, source, params, loader):
+        """
+        Get a value from the cache or, on a miss, from loader
+
+        Args:
+            source (str): Upstream name, selects the TTL
+            params (dict): Request parameters identifying the response
+            loader (callable): Performs the request and returns the parsed value,
+                or None (or raises) if the request failed
+
+        Returns:
+            The fresh cached value, the loader's value, a stale cached value if
+            the loader failed, or None
+        """
+        value = self._lookup(source, params)
+        if value is not None:
+            return value
+        try:
+            value = loader()
+        except Exception as e:
+            logger.error(f"Error fetching {source}: {str(e)}")
+            value = None
+        return self._settle(source, params, value)
+
+    async def fetch_async(self, source, params, loader):
+        """Like fetch, for a loader that is a coroutine function"""
+        value = self._lookup(source, params)
+        if value is not None:
+            return value
+        try:
+            value = await loader()
+        except Exception as e:
+            logger.error(f"Error fetching {source}: {str(e)}")
+            value = None
+        return self._settle(source, params, value)
+
+    def _lookup(self, source, params):
+        """Get a fresh entry, counting the hit or miss"""
+        value = self.get(source, params)
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def _settle(self, source, params, value):
+        """Cache a loaded value, or fall back to a stale entry if loading failed"""
+        if value is not None:
+            self.put(source, params, value)
+            return value
+        stale = self.get(source, params, allow_stale=True)
+        if stale is not None:
+            self._count("stale_hits")
+            logger.warning(f"Serving a stale cached {source} response after a failed request")
+        return stale
+
+    def _count(self, name):
+        """Increment one of the hit/miss counters"""
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _purge_if_due(self):
+        """Drop entries past the stale limit, at most once per PURGE_INTERVAL_SECONDS"""
+        now = time.time()
+        if now - self.last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self.last_purge = now
+        with self.lock:
+            deleted = self.connection.execute(
+                "DELETE FROM responses WHERE fetched_at < ?", (now - self.stale_seconds,)
+            ).rowcount
+            self.connection.commit()
+        if deleted:
+            logger.info(f"Purged {deleted} expired responses from the cache")
+
+    def clear(self, source=None):
+        """Delete every entry, or only one source's; returns the number deleted"""
+        try:
+            with self.lock:
+                if source:
+                    deleted = self.connection.execute("DELETE FROM responses WHERE source = ?", (source,)).rowcount
+                else:
+                    deleted = self.connection.execute("DELETE FROM responses").rowcount
+                self.connection.commit()
+            return deleted
+        except Exception as e:
+            logger.error(f"Error clearing response cache: {str(e)}")
+            return 0
+
+    def stats(self):
+        """Entry counts per source and hit/miss counts since the process started"""
+        with self.lock:
+            rows = self.connection.execute("SELECT source, COUNT(*) FROM responses GROUP BY source").fetchall()
+            return {
+                "path": self.path,
+                "entries": dict(rows),
+                "ttl_seconds": self.ttls,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits
+            }
+
+
+_cache = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Get the process-wide response cache, or None if caching is disabled or the file cannot be opened"""
+    global _cache, _cache_failed
+    if not RESPONSE_CACHE_ENABLED or _cache_failed:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ResponseCache()
+            except Exception as e:
+                _cache_failed = True
+                logger.error(f"Error opening response cache, continuing without it: {str(e)}")
+                return None
+        return _cache
+
+
+def cached_fetch(source, params, loader):
+    """Fetch through the shared response cache, or call loader directly when caching is off"""
+    cache = get_response_cache()
+    if cache is None:
+        return loader()
+    return cache.fetch(source, params, loader)